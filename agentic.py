@@ -1,16 +1,18 @@
-from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain.agents import create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.tools import ShellTool
-from langchain_experimental.tools import PythonREPLTool
 from langchain_community.agent_toolkits.file_management.toolkit import FileManagementToolkit
 from langchain_community.tools.tavily_search import TavilySearchResults
 # from langchain_community.agent_toolkits import GitToolkit
 # from langchain.tools import HumanInputRun
-from tools.devops_tools import create_git_tool, create_docker_tool
+from tools.devops_tools import create_shell_tool, create_git_tool, create_docker_tool
 from langchain_community.tools import HumanInputRun
 from tools.codebase_qa_tool import CodebaseQATool
+from tools.symbol_tools import create_symbol_tools
+from tools.edit_tools import create_edit_tools
+from tools.python_tool import create_python_tool
 from services.vectorstore_service import VectorStoreService
+from services.llm_cache import create_llm
+from services.agent_runtime import ConcurrentAgentExecutor
 import config
 
 def create_agent_executor(vectorstore_service: VectorStoreService):
@@ -18,20 +20,25 @@ def create_agent_executor(vectorstore_service: VectorStoreService):
     Creates and returns the agent executor.
     """
     # 1. Initialize LLM
-    llm = ChatOpenAI(model=config.AGENT_MODEL, temperature=0)
+    llm = create_llm("single_agent", temperature=0)
 
     # git_toolkit = GitToolkit(repo_path=config.WORKING_DIR)
     # git_tools = git_toolkit.get_tools()
     # 2. Setup Tools
     file_tools = FileManagementToolkit(root_dir=config.WORKING_DIR).get_tools()
-    shell_tool = ShellTool(working_directory=config.WORKING_DIR)
-    python_tool = PythonREPLTool()
+    # Diff-based edits and batched reads/writes, so small changes don't mean rewriting whole files
+    edit_tools = create_edit_tools(config.WORKING_DIR)
+    # The shell, git and docker tools share one persistent session (cwd, env, venv carry over)
+    shell_tool = create_shell_tool("single_agent")
+    # Runs in an isolated worker process with time and memory limits, not in the CLI's process
+    python_tool = create_python_tool("single_agent")
 
-    git_tool = create_git_tool()
-    docker_tool = create_docker_tool()
+    git_tool = create_git_tool("single_agent")
+    docker_tool = create_docker_tool("single_agent")
     
     # Our new custom RAG tool
     codebase_qa_tool = CodebaseQATool(vectorstore_service=vectorstore_service)
+    symbol_tools = create_symbol_tools(vectorstore_service)
 
     web_search_tool = TavilySearchResults(
         name="web_search",
@@ -43,19 +50,7 @@ def create_agent_executor(vectorstore_service: VectorStoreService):
         description="Use this to ask the human user a clarifying question. Use it when the user's request is ambiguous, you are unsure how to proceed, or you need more information to complete the task. The input to this tool should be the exact question you want to ask the user."
     )
 
-    docker_tool = ShellTool(
-        name="docker_tool",
-        description=(
-            "A tool for executing Docker commands. Use this for containerization tasks like:\n"
-            "- `docker build -t <tag> .` to build a Docker image.\n"
-            "- `docker run <image>` to run a container.\n"
-            "- `docker push <tag>` to push an image.\n"
-            "Ensure Docker Desktop or Docker Engine is running."
-        ),
-        working_directory=config.WORKING_DIR
-    )
-
-    tools = file_tools + [shell_tool, python_tool, codebase_qa_tool, web_search_tool, human_input_tool, docker_tool, git_tool]
+    tools = file_tools + edit_tools + symbol_tools + [shell_tool, python_tool, codebase_qa_tool, web_search_tool, human_input_tool, docker_tool, git_tool]
     # 3. Create the Prompt
     # We are enhancing the system prompt to make the agent aware of its new RAG tool.
     system_prompt = """
@@ -83,6 +78,9 @@ def create_agent_executor(vectorstore_service: VectorStoreService):
 
         **TOOL USAGE RULES**
         - `codebase_qa_tool`: Use this first for any questions about existing code.
+        - `find_definition` / `find_references`: Use these instead of grep or reading files when you know a symbol's name.
+        - `apply_patch`: Use this to change existing files; send only the changed lines (a unified diff or SEARCH/REPLACE blocks) instead of rewriting the file with `write_file`.
+        - `read_many_files` / `write_many_files`: Use these to read or create several files in one step.
         - `ask_human_for_clarification`: Use this for ambiguous requests, never for error debugging unless you have already tried to fix it yourself several times.
     """
     prompt = ChatPromptTemplate.from_messages(
@@ -96,6 +94,8 @@ def create_agent_executor(vectorstore_service: VectorStoreService):
 
     # 4. Create the Agent
     agent = create_openai_tools_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(name="Single Dev Agent", agent=agent, tools=tools, verbose=False)
+    # Run through its async API, the tool calls of one turn run concurrently; side-effecting ones one at a time
+    agent_executor = ConcurrentAgentExecutor(name="Single Dev Agent", agent=agent, tools=tools, verbose=False,
+                                             workspace_root=config.WORKING_DIR)
     
     return agent_executor
\ No newline at end of file
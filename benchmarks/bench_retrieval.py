@@ -0,0 +1,102 @@
+# benchmarks/bench_retrieval.py
+"""
+Local retrieval benchmark: latency and recall@k of the lexical (BM25/identifier)
+index, the vector index and their fusion on a synthetic codebase where the
+chunk defining each symbol is known.
+
+The vector side uses the deterministic local HashEmbeddings backend, so its
+recall reflects shared vocabulary rather than semantic quality; it needs faiss installed.
+
+Usage:
+    python benchmarks/bench_retrieval.py --chunks 20000 --queries 500 --k 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from services.lexical_index import LexicalIndex, extract_symbol, reciprocal_rank_fusion
+from services.embedding_pipeline import HashEmbeddings
+
+VERBS = ["create", "load", "parse", "build", "render", "update", "delete", "fetch", "validate", "compute"]
+NOUNS = ["user", "team", "plan", "index", "router", "chunk", "session", "report", "config", "graph"]
+
+
+def build_corpus(n_chunks: int, seed: int = 0):
+    """Each chunk defines one function and calls a few others; returns (docs, {symbol: chunk index})."""
+    rng = random.Random(seed)
+    names = [f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{i}" for i in range(n_chunks)]
+    docs = []
+    for i, name in enumerate(names):
+        calls = "\n".join(f"    {names[rng.randrange(n_chunks)]}(x)" for _ in range(3))
+        body = f"def {name}(x):\n    \"\"\"{name.split('_')[0]} the {name.split('_')[1]}.\"\"\"\n{calls}\n    return x\n"
+        docs.append(Document(page_content=body, metadata={"source": f"pkg/mod{i // 50}.py"}))
+    return docs, {name: i for i, name in enumerate(names)}
+
+
+def measure(search, queries, gold, k):
+    latencies, hits = [], 0
+    for query, symbol in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if any(doc.page_content.startswith(f"def {symbol}(") for doc in results[:k]):
+            hits += 1
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return statistics.median(latencies), p95, hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    docs, gold = build_corpus(args.chunks)
+    rng = random.Random(1)
+    symbols = rng.sample(list(gold), args.queries)
+    queries = [(f"where is `{symbol}` defined", symbol) for symbol in symbols]
+
+    start = time.perf_counter()
+    lexical = LexicalIndex()
+    lexical.update(add=[(str(i), doc) for i, doc in enumerate(docs)])
+    print(f"Lexical index built over {len(docs)} chunks in {time.perf_counter() - start:.2f}s")
+
+    def lexical_search(query):
+        symbol = extract_symbol(query)
+        if symbol and lexical.has_term(symbol):
+            return [doc for doc, _ in lexical.search_symbol(symbol, args.k)]
+        return [doc for doc, _ in lexical.search(query, args.k)]
+
+    rows = [("lexical (symbol path)", measure(lexical_search, queries, gold, args.k))]
+
+    try:
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.from_documents(docs, HashEmbeddings(size=256))
+
+        def vector_search(query):
+            return store.similarity_search(query, k=args.k)
+
+        def hybrid_search(query):
+            lexical_docs = [doc for doc, _ in lexical.search(query, args.k * 2)]
+            return reciprocal_rank_fusion([lexical_docs, store.similarity_search(query, k=args.k * 2)], args.k)
+
+        rows.append(("vector (hash embeddings)", measure(vector_search, queries, gold, args.k)))
+        rows.append(("hybrid RRF", measure(hybrid_search, queries, gold, args.k)))
+    except ImportError as e:
+        print(f"Vector and hybrid runs skipped ({e}).")
+
+    print(f"{'mode':<26}{'p50 ms':>10}{'p95 ms':>10}{f'recall@{args.k}':>12}")
+    for name, (p50, p95, recall) in rows:
+        print(f"{name:<26}{p50:>10.3f}{p95:>10.3f}{recall:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_router.py
+"""
+Offline accuracy and latency benchmark of the local request router on a
+held-out set of labeled requests (none of them are router prompt examples).
+
+Reports how many requests are decided locally (coverage), the accuracy of
+those local decisions, the accuracy if ambiguous requests also took the local
+best guess (no LLM at all), and per-decision latency with and without the
+decision cache. No LLM calls are made.
+
+Usage:
+    python benchmarks/bench_router.py --threshold 1.0 --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.request_router import RequestRouter, SINGLE_AGENT, AI_TEAM
+
+S, T = SINGLE_AGENT, AI_TEAM
+HELD_OUT = [
+    ("How do I reverse a string in Go?", S),
+    ("What does `git rebase -i` do?", S),
+    ("Explain this error: KeyError: 'user_id'", S),
+    ("Write a python function to merge two sorted lists", S),
+    ("Show me the contents of requirements.txt", S),
+    ("What's the difference between a list and a tuple in Python?", S),
+    ("Convert this JSON to YAML: {\"a\": 1}", S),
+    ("Give me a regex that matches email addresses", S),
+    ("Write a bash one-liner to count lines in all .py files", S),
+    ("What is the time now in UTC?", S),
+    ("Read config.py and tell me what WORKING_DIR is", S),
+    ("Write a quick script that prints the first 10 fibonacci numbers", S),
+    ("Which version of numpy supports python 3.12?", S),
+    ("Write the java code for binary search", S),
+    ("Delete the file temp.txt", S),
+    ("Rename hello.py to main.py", S),
+    ("What is a closure in JavaScript?", S),
+    ("Write a SQL query that returns the top 5 customers by revenue", S),
+    ("Run the tests in the workspace", S),
+    ("Summarize what utils.py does", S),
+    ("Build a REST API for a bookstore with SQLite and write pytest tests for it", T),
+    ("Create a React todo app with a FastAPI backend and tests", T),
+    ("Refactor the auth module to use JWT tokens and verify nothing breaks", T),
+    ("Set up a CI pipeline and a Dockerfile for the project and make sure it builds", T),
+    ("Implement a CLI tool that syncs two directories, with unit tests and documentation", T),
+    ("Develop a Discord bot that answers questions from a knowledge base", T),
+    ("Create a Django project with user registration, login and a profile page", T),
+    ("Migrate the whole codebase from unittest to pytest and then run the suite", T),
+    ("Build a web crawler that stores pages in Postgres and add an endpoint to search them", T),
+    ("Write a library for rate limiting with token buckets, then write tests and a README", T),
+    ("Analyse the project structure and draw a diagram of how the modules depend on each other", T),
+    ("Develop a microservice for image thumbnails with a queue worker and integration tests", T),
+    ("Add CRUD endpoints for orders to the Flask app and write tests for each of them", T),
+    ("Split the monolithic app.py into multiple modules and verify the app still works", T),
+    ("Create a data pipeline that downloads CSVs daily, cleans them and loads them into a database", T),
+    ("Build a chat application with websockets, authentication and message history", T),
+    ("Analyse these sorting algorithms and compare their time and space complexity", T),
+    ("Scaffold a Rust CLI project with argument parsing, config loading and tests", T),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=200, help="timing repetitions per request")
+    args = parser.parse_args()
+
+    router = RequestRouter(confidence_threshold=args.threshold, cache_size=0)
+    local = correct_local = correct_guess = 0
+    mistakes = []
+    for text, label in HELD_OUT:
+        route, _ = router.classify_locally(text)
+        guess = AI_TEAM if router.score(text) > 0 else SINGLE_AGENT
+        correct_guess += guess == label
+        if route is not None:
+            local += 1
+            correct_local += route == label
+            if route != label:
+                mistakes.append((text, route))
+
+    latencies = []
+    for text, _ in HELD_OUT:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            router.route(text)
+        latencies.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+    cached = RequestRouter(confidence_threshold=args.threshold)
+    for text, _ in HELD_OUT:
+        cached.route(text)
+    cached_latencies = []
+    for text, _ in HELD_OUT:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            cached.route(text)
+        cached_latencies.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+    n = len(HELD_OUT)
+    print(f"\n{n} held-out requests, confidence threshold {args.threshold}")
+    print(f"Decided locally:            {local}/{n} ({local / n:.0%}); the rest would go to the LLM")
+    print(f"Accuracy of local decisions: {correct_local / max(1, local):.1%}")
+    print(f"Accuracy with no LLM at all: {correct_guess / n:.1%}")
+    for name, values in (("uncached", latencies), ("cached", cached_latencies)):
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"Latency {name:<9} p50 {statistics.median(values):8.1f} us   p95 {p95:8.1f} us")
+    for text, route in mistakes:
+        print(f"  misrouted to {route}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_vector_storage.py
+"""
+Recall-vs-memory benchmark of the vector storage modes: the flat float32 FAISS
+index against the compressed, per-directory sharded stores (fp16, sq8, ivf_sq8,
+ivfpq). Recall@k is measured against exact search over the same vectors.
+
+Vectors are synthetic: a low-rank signal with a decaying spectrum plus noise,
+which roughly mimics real text embeddings, with the dimension of
+text-embedding-3-small by default; no API calls are made.
+
+IVF only pays off (and is only built) for shards of at least IVF_MIN_TRAIN
+vectors; smaller shards of the ivf modes fall back to SQ8, and their rows are
+marked. The defaults give every shard enough vectors to train IVF.
+
+Usage:
+    python benchmarks/bench_vector_storage.py --vectors 40000 --shards 3 --queries 200 --k 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+from services.embedding_pipeline import HashEmbeddings
+from services.sharded_vector_store import IVF_MIN_TRAIN, ShardedVectorStore
+
+MODES = ["fp16", "sq8", "ivf_sq8", "ivfpq"]
+
+
+def synthetic_vectors(n: int, dim: int, rank: int = 96, noise: float = 0.3, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((n, rank)).astype("float32") * np.linspace(1.0, 0.1, rank, dtype="float32")
+    vectors = latent @ rng.standard_normal((rank, dim)).astype("float32")
+    vectors += noise * rng.standard_normal((n, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=40_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--shards", type=int, default=3, help="number of top-level directories")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=32)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors + args.queries, args.dim)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    texts = [f"chunk {i}" for i in range(args.vectors)]
+    metadatas = [{"source": f"dir{i % args.shards}/file{i // 100}.py"} for i in range(args.vectors)]
+    ids = [str(i) for i in range(args.vectors)]
+
+    flat = faiss.IndexFlatL2(args.dim)
+    flat.add(vectors)
+    _, exact = flat.search(queries, args.k)
+    flat_bytes = faiss.serialize_index(flat).nbytes
+
+    rows = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        flat.search(query[None, :], args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    rows.append(("flat", 0.0, flat_bytes, latencies, 1.0, 0))
+
+    for mode in MODES:
+        start = time.perf_counter()
+        store = ShardedVectorStore(HashEmbeddings(args.dim), mode=mode, nprobe=args.nprobe)
+        store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        build_seconds = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, gold in zip(queries, exact):
+            start = time.perf_counter()
+            results = store.similarity_search_by_vector(query, k=args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({doc.page_content for doc in results} & {f"chunk {i}" for i in gold})
+        rows.append((mode, build_seconds, store.memory_bytes(), latencies, hits / (args.k * len(queries)),
+                     len(store.sq8_fallback_shards())))
+
+    print(f"\n{args.vectors} vectors x {args.dim} dims in {args.shards} shards, {args.queries} queries, k={args.k}")
+    print(f"{'mode':<10} {'build s':>8} {'memory MB':>10} {'vs flat':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for mode, build_seconds, size, latencies, recall, fallbacks in rows:
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        note = f"  * {fallbacks} shard(s) fell back to SQ8" if fallbacks else ""
+        print(f"{mode:<10} {build_seconds:>8.1f} {size / 2**20:>10.1f} {flat_bytes / size:>7.1f}x "
+              f"{statistics.median(latencies):>8.2f} {p95:>8.2f} {recall:>9.3f}{note}")
+    if any(row[-1] for row in rows):
+        print(f"* shards with fewer than {IVF_MIN_TRAIN} vectors are stored as SQ8, not IVF; "
+              f"use more --vectors or fewer --shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_workspace_scanner.py
+"""
+Compares the single-pass WorkspaceScanner with the previous loader, which ran
+one DirectoryLoader per entry of config.SUPPORTED_FILE_TYPES, on a synthetic tree.
+
+Usage:
+    python benchmarks/bench_workspace_scanner.py --files 50000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from services.workspace_scanner import WorkspaceScanner
+
+SOURCE_EXTENSIONS = [".py", ".ts", ".go", ".md", ".json", ".txt", ".java", ".rb"]
+
+
+def build_tree(root: str, n_files: int, seed: int = 0):
+    """Creates a tree where ~70% of files are source, ~25% vendored/build output and ~5% binaries."""
+    rng = random.Random(seed)
+    body = "def f(x):\n    return x * 2\n" * 20
+    for i in range(n_files):
+        roll = rng.random()
+        if roll < 0.70:
+            rel_dir = os.path.join("src", f"pkg{i % 200}", f"mod{i % 7}")
+            name = f"file{i}{rng.choice(SOURCE_EXTENSIONS)}"
+            data = body.encode()
+        elif roll < 0.85:
+            rel_dir = os.path.join("node_modules", f"dep{i % 300}", "lib")
+            name = f"index{i}.ts"
+            data = body.encode()
+        elif roll < 0.95:
+            rel_dir = os.path.join("build", f"out{i % 50}")
+            name = f"gen{i}.py"
+            data = body.encode()
+        else:
+            rel_dir = os.path.join("assets", f"bin{i % 20}")
+            name = f"blob{i}.txt"
+            data = b"\0" * 512
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+        with open(os.path.join(root, rel_dir, name), "wb") as f:
+            f.write(data)
+
+
+def run_legacy(root: str):
+    """The loader VectorStoreService used before the scanner (one tree walk per extension)."""
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    docs = []
+    for file_type in config.SUPPORTED_FILE_TYPES + [".txt"]:  # the old list had ".txt" twice
+        loader = DirectoryLoader(root, glob=f"**/*{file_type}", loader_cls=TextLoader,
+                                 show_progress=False, use_multithreading=True, silent_errors=True)
+        docs.extend(loader.load())
+    return len(docs)
+
+
+def run_scanner(root: str):
+    scanner = WorkspaceScanner(root, config.SUPPORTED_FILE_TYPES,
+                               max_file_size=config.MAX_INDEXED_FILE_SIZE, max_workers=config.INDEX_READ_WORKERS)
+    return len(scanner.read_files(scanner.scan()))
+
+
+def timed(fn, root: str):
+    start = time.perf_counter()
+    count = fn(root)
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50_000, help="number of files in the synthetic tree")
+    parser.add_argument("--keep", action="store_true", help="keep the generated tree")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="scanner_bench_")
+    try:
+        print(f"Building a synthetic tree with {args.files} files in {root}...")
+        build_tree(root, args.files)
+
+        elapsed, count = timed(run_scanner, root)
+        print(f"WorkspaceScanner:          {elapsed:8.2f}s  {count:7d} documents")
+
+        try:
+            elapsed, count = timed(run_legacy, root)
+            print(f"DirectoryLoader x {len(config.SUPPORTED_FILE_TYPES) + 1}:    {elapsed:8.2f}s  {count:7d} documents")
+        except ImportError as e:
+            print(f"Legacy loader skipped ({e}).")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,148 @@ import os
 
 WORKING_DIR = os.path.abspath("./ai_workspace")
 
-SUPPORTED_FILE_TYPES = [".py", ".md", ".txt", ".json", ".yml", ".yaml", ".csv", ".jsx", ".ts", ".tsx", ".rs", ".java", ".c", ".cc", ".cpp", ".h", ".htmx", ".vb", ".go", ".sh", ".bash", ".zsh",".txt", ".rb"]
+SUPPORTED_FILE_TYPES = [".py", ".md", ".txt", ".json", ".yml", ".yaml", ".csv", ".jsx", ".ts", ".tsx", ".rs", ".java", ".c", ".cc", ".cpp", ".h", ".htmx", ".vb", ".go", ".sh", ".bash", ".zsh", ".rb"]
 
 AGENT_MODEL = "gpt-4o"
 
 # The OpenAI model to use for creating embeddings for the RAG system.
-EMBEDDINGS_MODEL = "text-embedding-3-small"
\ No newline at end of file
+EMBEDDINGS_MODEL = "text-embedding-3-small"
+
+# Where the persistent vector index, manifest and embedding cache are stored.
+# It lives inside the workspace so each workspace carries its own index.
+INDEX_DIR = os.path.join(WORKING_DIR, ".agent_index")
+
+
+# Files larger than this (in bytes) are not indexed; they are usually generated or data dumps.
+MAX_INDEXED_FILE_SIZE = 1_000_000
+
+# Number of threads used to read workspace files while indexing.
+INDEX_READ_WORKERS = 8
+
+# Keep the codebase index live by watching the workspace in the background.
+WATCH_WORKSPACE = True
+# Quiet period (seconds) that ends a burst of file changes before it is indexed.
+WATCH_DEBOUNCE_SECONDS = 0.5
+# Interval (seconds) of the polling fallback used where inotify is unavailable.
+WATCH_POLL_INTERVAL = 2.0
+
+# Request router: requests whose local (heuristic + nearest-neighbor) score is below this
+# threshold are classified by the LLM instead; decisions are cached per normalized request.
+ROUTER_CONFIDENCE_THRESHOLD = 1.0
+ROUTER_CACHE_SIZE = 512
+
+# Persistent LLM response cache (SQLite), shared by the router, the single agent and the team.
+# Entries expire after the TTL; the least recently used ones are evicted beyond the size limit.
+LLM_CACHE_PATH = os.path.join(INDEX_DIR, "llm_cache.sqlite")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 20_000
+# Opt-in semantic tier: reuse the response of a near-identical prompt (costs one embedding per call).
+LLM_CACHE_SEMANTIC = False
+LLM_CACHE_SEMANTIC_THRESHOLD = 0.97
+# Which roles' LLM calls are cached (cached roles run at temperature 0). Only roles whose answer depends
+# on the prompt alone: the Reviewer's prompt carries the workspace diff and the test results, so a
+# re-run of the same code is served from the cache; the Coder and the Tester act on the workspace's
+# current state, and a cached turn of theirs would replay stale actions on a workspace that has changed.
+LLM_CACHE_ROLES = {
+    "router": True,
+    "single_agent": False,
+    "Architect": True,
+    "Coder": False,
+    "Tester": False,
+    "Reviewer": True,
+    "memory": True,
+}
+
+# Default limits of a team run (0 = unlimited); a run that exhausts them stops and returns
+# its best result so far. Override per run via run_team.create_initial_state(task, budget).
+TEAM_BUDGET = {
+    "max_seconds": 30 * 60,
+    "max_tokens": 500_000,
+    "max_node_iterations": {"Coder": 5, "Tester": 5, "Reviewer": 3},
+}
+
+# Maximum number of Coder agents writing planned files at the same time.
+TEAM_MAX_PARALLEL_CODERS = 4
+
+# Size caps of the batch file tools (read_many_files per file and per call, write_many_files per call).
+TOOL_READ_MAX_FILE_CHARS = 20_000
+TOOL_READ_MAX_TOTAL_CHARS = 60_000
+TOOL_WRITE_MAX_TOTAL_CHARS = 200_000
+
+# Persistent shell sessions of the shell/git/docker tools: per-command timeout, output kept in the
+# tool result (longer output is spilled to a log file), and how many idle sessions stay open.
+SHELL_COMMAND_TIMEOUT_SECONDS = 300
+SHELL_MAX_OUTPUT_CHARS = 10_000
+SHELL_SPILL_DIR = os.path.join(INDEX_DIR, "shell_logs")
+SHELL_MAX_SESSIONS = 16
+
+# Worker processes of the python_repl tool, and the limits of one call: CPU seconds, wall-clock
+# seconds, memory per worker, characters of output returned. Workers without live sessions are
+# replaced after PYTHON_MAX_TASKS_PER_WORKER calls.
+PYTHON_WORKERS = 2
+PYTHON_CPU_SECONDS = 30
+PYTHON_WALL_SECONDS = 60
+PYTHON_MEMORY_MB = 1024
+PYTHON_MAX_OUTPUT_CHARS = 10_000
+PYTHON_MAX_TASKS_PER_WORKER = 200
+
+# Build the single agent in the background right after the first prompt appears, so the first
+# request doesn't wait for it (it is otherwise built on first use).
+STARTUP_PREWARM = True
+
+# Copies of every version of the team's files, by content hash, for showing agents diffs.
+TEAM_BLOBS_DIR = os.path.join(INDEX_DIR, "team_blobs")
+
+# Characters of unified diff an agent is shown per step; larger changes are only listed by path.
+TEAM_DIFF_MAX_CHARS = 12_000
+
+# Wall-clock limit of one test-suite run by the team's Tester.
+TEST_TIMEOUT_SECONDS = 600
+
+# Checkpoints of team runs, so interrupted runs can be resumed or forked.
+TEAM_RUNS_DB = os.path.join(INDEX_DIR, "team_runs.sqlite")
+
+# Chat memory of the REPL: tokens of history sent with each request (older turns are summarized in
+# the background to stay within it), the summary's share of that budget, turns always kept verbatim,
+# and the size cap of one stored message (longer ones, e.g. team results, lose their middle).
+CHAT_MEMORY_TOKEN_BUDGET = 4000
+CHAT_SUMMARY_TOKEN_BUDGET = 800
+CHAT_MEMORY_MIN_RECENT_TURNS = 2
+CHAT_MESSAGE_MAX_TOKENS = 1500
+# Saved chat sessions, one JSON file each; resume one with `python main.py --session <id>`.
+CHAT_SESSIONS_DIR = os.path.join(INDEX_DIR, "chat_sessions")
+
+# codebase_qa_tool: chunks retrieved per question, and the token budget their packed context may use.
+QA_CANDIDATE_CHUNKS = 12
+QA_CONTEXT_TOKEN_BUDGET = 2000
+
+# LRU sizes of the codebase QA caches: retrieval results (invalidated on every index change)
+# and query embeddings.
+QUERY_RESULT_CACHE_SIZE = 256
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# Embedding backend: "openai", or "fake" for deterministic local embeddings (offline tests/benchmarks).
+EMBEDDINGS_BACKEND = os.environ.get("EMBEDDINGS_BACKEND", "openai")
+FAKE_EMBEDDINGS_SIZE = 256
+
+# Embedding pipeline: texts per request, parallel in-flight requests and retries on rate limits/errors.
+EMBEDDING_BATCH_SIZE = 128
+EMBEDDING_MAX_CONCURRENCY = 4
+EMBEDDING_MAX_RETRIES = 6
+
+# Vector storage: "flat" (full float32 vectors, exact search), or a compressed store sharded per
+# top-level directory: "fp16" (2x smaller), "sq8" (4x), "ivf_sq8" / "ivfpq" (4x / ~32x, and large
+# shards only scan VECTOR_STORE_NPROBE inverted lists per query). Changing it rebuilds the index.
+VECTOR_STORE_MODE = "flat"
+VECTOR_STORE_NPROBE = 32
+
+# Telemetry: spans of every LLM call, tool call, team node and request are appended to a JSONL
+# trace file (rotated at TRACE_MAX_BYTES, keeping TRACE_BACKUP_COUNT old files); p50/p95 (the
+# `stats` command) are computed over each series' last TELEMETRY_WINDOW spans.
+TRACE_PATH = os.path.join(INDEX_DIR, "traces", "spans.jsonl")
+TRACE_MAX_BYTES = 10_000_000
+TRACE_BACKUP_COUNT = 5
+TELEMETRY_WINDOW = 1000
+# Prometheus text endpoint (http://METRICS_HOST:METRICS_PORT/metrics); 0 disables it.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
@@ -1,52 +1,200 @@
 # main.py
+# Startup profiling starts with this import; the heavy LangChain/LangGraph/FAISS imports are
+# deferred into the lazily built objects below, so the first prompt appears quickly.
+from services.startup_profile import PROFILER, Lazy
+import argparse
 import os
+from typing import TYPE_CHECKING
 import config
-from agentic import create_agent_executor
-from ui import UI
-from services.vectorstore_service import VectorStoreService
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from run_team import app as team_app
+with PROFILER.stage("ui", "import"):
+    from ui import UI
+from services.request_router import RequestRouter, ROUTER_EXAMPLES, SINGLE_AGENT, AI_TEAM
+if TYPE_CHECKING:
+    from team.runs import TeamRunStore
 
 def create_router_chain():
-    # ... (no changes needed in this function)
+    """The LLM router; `RequestRouter` only falls back to it for requests it can't classify locally."""
     router_prompt_template = """
         You are an expert at analyzing user requests for a software development AI agent.
         Your task is to classify the user's request into one of two categories:
 
         1.  **single_agent**: For simple, direct, and short tasks. These are usually single-file operations, quick questions, or one-off commands.
             Examples:
-            - "What is the capital of France?"
-            - "List the files in the current directory."
-            - "Write 'hello world' to a file named 'hello.py'."
-            - "What does the function `calculate_total` in `utils.py` do?"
-            - "What is the latest version of Flask?"
-            - "Write the cpp code to calculate the factorial of a number"
-            - "Write the simple node.j code to create simple web server"
-            - "Write the python code to create and reverse the linked list"
-            - "Write the algorithm to find the shortest path in a graph"
+{single_agent_examples}
 
         2.  **ai_team**: For complex, multi-step tasks that require planning, creating multiple files, testing, and reviewing. These are typically project-level requests.
             Examples:
-            - "Build a simple blog application using Flask."
-            - "Create a new FastAPI endpoint for user authentication, and then write a pytest file to test it."
-            - "Refactor the entire 'database.py' module to use a connection pool and then verify the changes."
-            - "Develop a web scraper to get data from a website and save it to a CSV file."
-            - "Create a Dockerfile for the current project and write a test to ensure it builds correctly"
-            - "Analyse this code and draw the graph showing how it flows"
-            - "Analyse the following algorithms and give their time complexity and space complexity"
+{ai_team_examples}
             
         Based on the user's request below, respond with ONLY the category name ('single_agent' or 'ai_team') and nothing else.
 
         User Request:
         "{input}"
     """
-    llm = ChatOpenAI(model=config.AGENT_MODEL, temperature=0)
-    prompt = ChatPromptTemplate.from_template(router_prompt_template)
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from services.llm_cache import create_llm
+    llm = create_llm("router", temperature=0)
+    # The examples are shared with the local router's nearest-neighbor classifier
+    def examples_for(label):
+        return "\n".join(f'            - "{text}"' for text, example_label in ROUTER_EXAMPLES if example_label == label)
+    prompt = ChatPromptTemplate.from_template(router_prompt_template).partial(
+        single_agent_examples=examples_for(SINGLE_AGENT),
+        ai_team_examples=examples_for(AI_TEAM),
+    )
     return prompt | llm | StrOutputParser()
 
+def stream_team_run(ui: UI, team_app, run_store: "TeamRunStore", run_id: str, initial_state: dict = None):
+    """
+    Streams a team run: a new one from `initial_state`, or the resumption of
+    run `run_id` from its last completed step when `initial_state` is None.
+    Returns the run's final state, or None if it was interrupted with Ctrl-C.
+    """
+    from services.agent_runtime import cancel_on_interrupt
+    run_config = run_store.config_for(run_id)
+    run_store.set_status(run_id, "running")
+    # Tokens of one LLM call at a time are shown; concurrent calls (parallel coders) only show their step
+    stream, streaming_id = None, None
+    try:
+        # Nodes run on LangGraph's threads: Ctrl-C cancels their agents too, and the run stops right away
+        with cancel_on_interrupt():
+            for mode, payload in team_app.stream(initial_state, run_config, stream_mode=["updates", "messages"]):
+                if mode == "messages":
+                    chunk, metadata = payload
+                    if streaming_id is None and chunk.content:
+                        streaming_id = chunk.id
+                        stream = ui.stream_response(f"Team: {metadata.get('langgraph_node', 'agent')}")
+                    if chunk.id == streaming_id:
+                        stream.add(chunk.content if isinstance(chunk.content, str) else "")
+                        if chunk.response_metadata.get("finish_reason"):
+                            stream.stop()
+                            streaming_id = None
+                    continue
+                if stream is not None:
+                    stream.stop()
+                    streaming_id = None
+                step_name, step_output = list(payload.items())[0]
+                ui.display_langgraph_step(step_name, step_output or {}) # <-- NEW LANGGRAPH DISPLAY
+    except KeyboardInterrupt:
+        if stream is not None:
+            stream.stop()
+        run_store.set_status(run_id, "interrupted")
+        ui.display_system_message(f"⏸️ Team run {run_id} interrupted. Type `resume {run_id}` to continue it.")
+        return None
+    except Exception:
+        if stream is not None:
+            stream.stop()
+        run_store.set_status(run_id, "failed")
+        ui.display_system_message(f"Team run {run_id} failed. Type `resume {run_id}` to retry from its last completed step.", style="red")
+        raise
+    run_store.set_status(run_id, "done")
+    return team_app.get_state(run_config).values
+
+async def stream_single_agent(ui: UI, executor, inputs: dict) -> str:
+    """
+    Runs the single agent through `astream_events`, rendering the model's
+    tokens as they arrive and each tool call as it starts and ends. Returns
+    the final answer.
+    """
+    stream = ui.stream_response("Agent")
+    stream.wait()
+    final_answer = ""
+    try:
+        async for event in executor.astream_events(inputs, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                stream.add(content if isinstance(content, str) else "")
+            elif kind == "on_tool_start":
+                stream.pause()
+                ui.display_tool_start(event["name"], str(event["data"].get("input")))
+                stream.wait()
+            elif kind == "on_tool_end":
+                stream.pause()
+                ui.display_tool_end(str(event["data"].get("output")), event["name"])
+                stream.wait()
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                final_answer = (event["data"].get("output") or {}).get("output", "")
+    finally:
+        stream.stop()
+    if final_answer and not stream.segment.strip():
+        # Nothing was streamed (e.g. a cached response): show the answer in one go
+        ui.display_agent_response(final_answer, "Agent")
+    return final_answer
+
+def summarize_team_result(final_state: dict, include_code: bool = True) -> str:
+    """The team's result as a message; without the code for chat history (the files are named instead)."""
+    final_response = "The AI team has completed the task."
+    if final_state.get('stop_reason'):
+        final_response = f"The AI team stopped early ({final_state['stop_reason']}); this is its best result so far.\n"
+    if final_state.get('review_comments'):
+        final_response += f"- Review: {final_state['review_comments']}\n"
+    if final_state.get('test_results'):
+        final_response += f"- Test Results: {final_state['test_results']}\n"
+    if final_state.get('workspace_files'):
+        final_response += f"- Files: {', '.join(sorted(final_state['workspace_files']))}\n"
+    if final_state.get('code') and include_code:
+        final_response += f"- Final Code Snippet: \n{final_state['code']}"
+    return final_response
+
+def create_lazy_services():
+    """
+    The CLI's heavy objects, each built on first use: the RAG service (and
+    its workspace watcher), the single agent, the team run store and the team
+    graph. Each factory records its imports and constructor in PROFILER.
+    """
+    def build_vectorstore_service():
+        with PROFILER.stage("services.vectorstore_service", "import"):
+            from services.vectorstore_service import VectorStoreService
+        with PROFILER.stage("VectorStoreService"):
+            service = VectorStoreService(
+                working_dir=config.WORKING_DIR,
+                supported_file_types=config.SUPPORTED_FILE_TYPES,
+                embeddings_model=config.EMBEDDINGS_MODEL,
+                index_dir=config.INDEX_DIR
+            )
+            if config.WATCH_WORKSPACE:
+                # Keeps the index in sync with files written by the agents, off the main thread
+                service.start_watching(
+                    debounce=config.WATCH_DEBOUNCE_SECONDS,
+                    poll_interval=config.WATCH_POLL_INTERVAL
+                )
+        return service
+
+    def build_single_agent():
+        with PROFILER.stage("agentic", "import"):
+            from agentic import create_agent_executor
+        service = vectorstore_service.get()
+        with PROFILER.stage("single agent executor"):
+            return create_agent_executor(service)
+
+    def build_run_store():
+        with PROFILER.stage("team.runs", "import"):
+            from team.runs import TeamRunStore
+        with PROFILER.stage("TeamRunStore"):
+            return TeamRunStore(config.TEAM_RUNS_DB)
+
+    def build_team():
+        with PROFILER.stage("run_team", "import"):
+            from run_team import build_team_app
+        service, store = vectorstore_service.get(), run_store.get()
+        with PROFILER.stage("team graph"):
+            # Every completed team step is checkpointed, so runs can be listed, resumed and forked
+            return build_team_app(service, checkpointer=store.checkpointer)
+
+    vectorstore_service = Lazy("vectorstore service", build_vectorstore_service)
+    single_agent = Lazy("single agent", build_single_agent)
+    run_store = Lazy("run store", build_run_store)
+    team_app = Lazy("team graph", build_team)
+    return vectorstore_service, single_agent, run_store, team_app
+
 def main():
+    parser = argparse.ArgumentParser(description="Interactive AI development agent.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print where the time to the first prompt went, then build the deferred objects and report them too")
+    parser.add_argument("--session", metavar="ID",
+                        help="resume a saved chat session (type `sessions` in the REPL to list them)")
+    args = parser.parse_args()
     # Ensure the OpenAI API key is set
     if not os.environ.get("OPENAI_API_KEY"):
         print("🔴 Error: OPENAI_API_KEY environment variable not set.")
@@ -58,93 +206,144 @@ def main():
         return
     # Create the working directory if it doesn't exist
     os.makedirs(config.WORKING_DIR, exist_ok=True)
-    ui = UI()
+    with PROFILER.stage("UI"):
+        ui = UI()
     print(f"✅ Agent working directory set to: {config.WORKING_DIR}")
-    # Initialize our RAG service
-    vectorstore_service = VectorStoreService(
-        working_dir=config.WORKING_DIR,
-        supported_file_types=config.SUPPORTED_FILE_TYPES,
-        embeddings_model=config.EMBEDDINGS_MODEL
-    )
-    single_agent_executor = create_agent_executor(vectorstore_service)
-    router_chain = create_router_chain()
+    from services.chat_memory import create_chat_memory, list_sessions
+    from services.telemetry import get_telemetry
+    telemetry = get_telemetry()
+    try:
+        # Bounded history: recent turns verbatim, older ones summarized in the background
+        chat_memory = create_chat_memory(args.session)
+    except ValueError as e:
+        print(f"🔴 Error: {e}")
+        return
+    vectorstore_service, single_agent, run_store, team_app = create_lazy_services()
+    # Routes confident cases locally in microseconds; only ambiguous requests cost an LLM call
+    with PROFILER.stage("RequestRouter"):
+        router = RequestRouter(
+            fallback=create_router_chain,
+            confidence_threshold=config.ROUTER_CONFIDENCE_THRESHOLD,
+            cache_size=config.ROUTER_CACHE_SIZE
+        )
     ui.display_startup_message()
-    # Create the agent executor
-    chat_history = []
+    PROFILER.first_prompt()
+    if args.profile_startup:
+        # Build everything now, in the foreground, so the deferred costs are measured without overlap
+        single_agent.get()
+        team_app.get()
+        ui.display_system_message(PROFILER.report())
+    elif config.STARTUP_PREWARM:
+        # Most requests go to the single agent: build it while the user types
+        single_agent.warm()
+    if config.METRICS_PORT:
+        port = telemetry.start_metrics_server(config.METRICS_HOST, config.METRICS_PORT)
+        if port:
+            ui.display_system_message(f"📈 Metrics at http://{config.METRICS_HOST}:{port}/metrics", style="dim")
+    if chat_memory.all_turns:
+        ui.display_system_message(f"💬 Resumed chat session {chat_memory.session_id} ({len(chat_memory.all_turns)} turns).")
+    else:
+        ui.display_system_message(f"💬 Chat session {chat_memory.session_id}. Resume it later with `--session {chat_memory.session_id}`.")
 
     while True:
         user_input = input("\n🗣️  You: ")
         if user_input.lower() in ["exit", "quit"]:
             print("👋 Exiting.")
+            # Let a summary in progress be saved; the session's turns already are
+            chat_memory.wait(timeout=10)
+            if vectorstore_service.built:
+                vectorstore_service.get().stop_watching()
             break
         
         # Add a special command to trigger re-indexing
         if user_input.lower() == "reindex":
             ui.display_system_message("🔄 Re-indexing workspace...")
-            vectorstore_service.reindex()
-            ui.display_system_message("✅ Workspace re-indexed successfully.", style="green")
+            report = vectorstore_service.get().reindex()
+            ui.display_system_message(f"✅ Workspace re-indexed successfully: {report.summary()}", style="green")
+            continue
+
+        # Show the codebase QA cache counters
+        if user_input.lower() == "cache":
+            from services.llm_cache import get_llm_cache
+            ui.display_cache_stats({**vectorstore_service.get().cache_stats(), "llm_responses": get_llm_cache().stats()})
+            continue
+
+        # Latency percentiles, errors and tokens per model, tool, team node and request route
+        if user_input.lower() == "stats":
+            ui.display_telemetry_stats(telemetry.stats())
+            continue
+
+        # Chat sessions: `sessions` lists the saved ones, `memory` shows this one's per-turn token counts
+        if user_input.lower() == "sessions":
+            ui.display_chat_sessions(list_sessions())
+            continue
+        if user_input.lower() == "memory":
+            ui.display_chat_memory(chat_memory)
+            continue
+
+        # Team run management: `runs`, `resume <run id>`, `fork <run id>`
+        command, _, run_id = user_input.strip().partition(" ")
+        if command.lower() == "runs":
+            ui.display_team_runs(run_store.get().list_runs())
+            continue
+        if command.lower() in ["resume", "fork"] and run_id:
+            try:
+                run = run_store.get().get_run(run_id.strip())
+                if run and command.lower() == "fork":
+                    run = run_store.get().fork(run.run_id)
+                    ui.display_system_message(f"🍴 Forked into new team run {run.run_id}.")
+                if run is None:
+                    ui.display_error(f"No unique team run matches `{run_id}`. Type `runs` to list them.")
+                elif not run_store.get().next_nodes(team_app.get(), run.run_id):
+                    ui.display_system_message(f"Team run {run.run_id} has already finished.")
+                else:
+                    ui.display_system_message(f"▶️ Resuming team run {run.run_id}: {run.task}")
+                    final_state = stream_team_run(ui, team_app.get(), run_store.get(), run.run_id)
+                    if final_state is not None:
+                        ui.display_agent_response(summarize_team_result(final_state), "AI Team")
+            except Exception as e:
+                ui.display_error(str(e))
             continue
 
         try:
             ui.display_system_message("🤔 Analyzing request and routing to the best system...")
-            route = router_chain.invoke({"input": user_input})
-            # response = router_chain.invoke({
-            #     "input": user_input,
-            #     "chat_history": chat_history
-            # })
-
-            if "ai_team" in route.lower():
-                ui.display_system_message(f"🚀 Request is complex. Deploying the AI Team...")
-                initial_state = {"task": user_input}
-                final_state = None
-                for step in team_app.stream(initial_state):
-                    step_name, step_output = list(step.items())[0]
-                    # trunk-ignore(ruff/F841)
-                    final_state = step_output
-                    ui.display_langgraph_step(step_name, step_output) # <-- NEW LANGGRAPH DISPLAY
-                final_response = "The AI team has completed the task."
-                if final_state.get('review_comments'):
-                    final_response += f"- Review: {final_state['review_comments']}\n"
-                if final_state.get('test_results'):
-                    final_response += f"- Test Results: {final_state['test_results']}\n"
-                if final_state.get('code'):
-                    final_response += f"- Final Code Snippet: \n{final_state['code']}"
-                chat_history.extend([("human", user_input), ("ai", final_response)])
-
-            else:
-                ui.display_system_message(f"⚙️ Request is simple. Using the single agent...")
-                
-                # --- NEW STREAMING LOGIC FOR MODERN AGENTS ---
-                final_answer = ""
-                
-                # Use a with block for the status to ensure it's removed on completion/error
-                with ui.console.status("[bold green]Agent is thinking...", spinner="dots") as status:
-                    for chunk in single_agent_executor.stream({
-                        "input": user_input,
-                        "chat_history": chat_history
-                    }):
-                        # Check for actions (tool calls)
-                        if "actions" in chunk:
-                            status.stop() # Stop the spinner
-                            for action in chunk["actions"]:
-                                ui.display_tool_start(action.tool, str(action.tool_input))
-                            status.start() # Restart the spinner while tool runs
-
-                        # Check for steps (tool outputs)
-                        elif "steps" in chunk:
-                            status.stop() # Stop the spinner
-                            for step in chunk["steps"]:
-                                ui.display_tool_end(str(step.observation), step.action.tool)
-                            status.start() # Restart the spinner
-
-                        # Check for the final answer chunk
-                        elif "output" in chunk:
-                            status.stop() # Stop the spinner permanently
-                            final_answer += chunk["output"]
-                            # The final answer comes in one go, so we display it directly
-                            # instead of streaming token by token.
-                ui.display_agent_response(final_answer, "Agent")
-                chat_history.extend([("human", user_input), ("ai", final_answer)])
+            route = router.route(user_input).route
+
+            # Timed per route; failures are recorded (with the error) before the panel below shows them
+            with telemetry.span("request", route) as request_span:
+                if route == AI_TEAM:
+                    from run_team import create_initial_state
+                    run = run_store.get().create_run(user_input)
+                    ui.display_system_message(f"🚀 Request is complex. Deploying the AI Team (run {run.run_id})...")
+                    final_state = stream_team_run(ui, team_app.get(), run_store.get(), run.run_id, create_initial_state(user_input))
+                    if final_state is None:
+                        request_span.status = "cancelled"
+                        continue
+                    chat_memory.add_turn(user_input, summarize_team_result(final_state, include_code=False),
+                                         total_tokens=final_state.get("tokens_used"))
+                    ui.display_system_message(f"🧮 The team run used {final_state.get('tokens_used', 0):,} tokens.", style="dim")
+
+                else:
+                    ui.display_system_message(f"⚙️ Request is simple. Using the single agent...")
+                    from services.agent_runtime import run_sync
+                    from langchain_community.callbacks import get_openai_callback
+                    try:
+                        # Ctrl-C cancels the run, including its in-flight tool calls, and returns to the prompt
+                        with get_openai_callback() as usage:
+                            final_answer = run_sync(stream_single_agent(ui, single_agent.get(), {
+                                "input": user_input,
+                                "chat_history": chat_memory.messages()
+                            }))
+                    except KeyboardInterrupt:
+                        ui.display_system_message("⏹️ Cancelled.")
+                        request_span.status = "cancelled"
+                        continue
+                    chat_memory.add_turn(user_input, final_answer, usage.prompt_tokens, usage.total_tokens)
+                    ui.display_system_message(
+                        f"🧮 {usage.prompt_tokens:,} prompt tokens over {usage.successful_requests} LLM calls; "
+                        f"history is now {chat_memory.history_tokens():,} of {chat_memory.token_budget:,} tokens.",
+                        style="dim",
+                    )
         except Exception as e:
             # trunk-ignore(git-diff-check/error)
             ui.display_error(str(e)) 
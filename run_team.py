@@ -1,63 +1,257 @@
 # run_team.py
+import argparse
+import asyncio
 import os
+import time
 import config
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_community.tools import ShellTool
+from langgraph.types import Send
+from langchain_community.callbacks import get_openai_callback
 from langchain_community.agent_toolkits.file_management.toolkit import FileManagementToolkit
 from team.state import TeamState
-from team.agents import create_team_supervisor
-# --- 1. SETUP ---
-# Initialize the LLM and tools
-llm = ChatOpenAI(model=config.AGENT_MODEL)
-file_tools = FileManagementToolkit(root_dir=config.WORKING_DIR).get_tools()
-shell_tool = ShellTool(working_directory=config.WORKING_DIR)
-all_tools = file_tools + [shell_tool]
-
-# Create the agents
-agents = create_team_supervisor(llm, all_tools, file_tools)
-
-# --- 2. DEFINE AGENT NODES ---
+from team.budget import TeamBudget, result_score
+from team.plan import parse_planned_files, dependency_order
+from team.changes import WorkspaceChanges, create_workspace_changes, viewed
+from team.agents import create_team_supervisor, TEAM_ROLES
+from tools.symbol_tools import create_symbol_tools
+from tools.edit_tools import create_edit_tools
+from tools.devops_tools import create_shell_tool
+from services.vectorstore_service import VectorStoreService
+from services.llm_cache import create_llm
+from services.test_execution import TestRunner, TestRunResult, run_succeeded
+from services.agent_runtime import run_agent, run_sync
+
+# --- 1. DEFINE AGENT NODES ---
 # Each node in the graph represents an agent performing an action.
-def run_agent_node(state: TeamState, agent_key: str):
+def run_agent_node(state: TeamState, agents: dict, agent_key: str):
     agent = agents[agent_key]
-    result = agent.invoke({"messages": [("user", state['task'])]})
+    result = run_agent(agent, {"messages": [("user", state['task'])]})
     return {"agent_log": [f"Agent {agent_key} completed. Output: {result['output']}"]}
 
-def architect_node(state: TeamState):
+def architect_node(state: TeamState, agents: dict):
     agent = agents["Architect"]
-    result = agent.invoke({"messages": [("user", state['task'])]})
-    return {"plan": result['output'], "agent_log": [f"Architect created a plan: {result['output']}"]}
-
-def coder_node(state: TeamState):
-    agent = agents["Coder"]
-    task_with_plan = f"Here is the plan:\n\n{state['plan']}\n\nPlease write the code."
-    result = agent.invoke({"messages": [("user", task_with_plan)]})
-    # For simplicity, we'll assume the coder mentions the file path in the output.
-    # A more robust solution would parse this.
-    return {"code": result['output'], "agent_log": [f"Coder wrote the code: {result['output']}"]}
-
-def tester_node(state: TeamState):
-    agent = agents["Tester"]
-    task_for_tester = f"Here is the code to test:\n\n{state['code']}\n\nPlease write a pytest file and run it."
-    result = agent.invoke({"messages": [("user", task_for_tester)]})
-    return {"test_results": result['output'], "agent_log": [f"Tester ran tests. Results: {result['output']}"]}
-
-def reviewer_node(state: TeamState):
+    result = run_agent(agent, {"messages": [("user", state['task'])]})
+    planned_files = [f.to_dict() for f in parse_planned_files(result['output'])]
+    return {
+        "plan": result['output'],
+        "planned_files": planned_files,
+        "agent_log": [f"Architect created a plan ({len(planned_files)} files): {result['output']}"],
+    }
+
+async def write_planned_file(agent, plan: str, planned_file: dict) -> str:
+    """One Coder invocation responsible for a single planned file."""
+    depends_on = ", ".join(f"`{dep}`" for dep in planned_file.get("depends_on", [])) or "none"
+    task = (
+        f"Here is the overall plan:\n\n{plan}\n\n"
+        f"Other coders are writing the other files at the same time. You are responsible ONLY for "
+        f"`{planned_file['path']}`: {planned_file.get('responsibility', '')}\n"
+        f"Its dependencies ({depends_on}) have already been written; read them if you need their interfaces. "
+        f"Write only this file."
+    )
+    result = await agent.ainvoke({"messages": [("user", task)]})
+    return result['output']
+
+async def write_planned_files(agent, plan: str, planned_files: list) -> dict:
+    """
+    Runs one Coder per planned file as tasks on one event loop, at most
+    TEAM_MAX_PARALLEL_CODERS at a time. A file starts as soon as the files it
+    depends on are written. Returns each file's Coder output by path.
+    """
+    files = {f["path"]: f for f in planned_files}
+    waiting_for = dependency_order(planned_files)
+    slots = asyncio.Semaphore(config.TEAM_MAX_PARALLEL_CODERS)
+    outputs, running = {}, {}
+
+    async def write(path: str) -> str:
+        async with slots:
+            return await write_planned_file(agent, plan, files[path])
+
+    try:
+        while len(outputs) < len(files):
+            ready = [path for path in files if path not in outputs and path not in running.values()
+                     and all(dep in outputs for dep in waiting_for[path])]
+            if not ready and not running:
+                # A dependency cycle: write the rest without waiting
+                ready = [path for path in files if path not in outputs]
+            for path in ready:
+                running[asyncio.ensure_future(write(path))] = path
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path = running.pop(task)
+                try:
+                    outputs[path] = task.result()
+                except Exception as e:
+                    outputs[path] = f"Failed to write this file: {e}"
+    finally:
+        # Cancelled (e.g. Ctrl-C): stop the coders still running
+        for task in running:
+            task.cancel()
+    return outputs
+
+def parallel_coder_node(state: TeamState, agents: dict):
+    """
+    Fans the planned files out to concurrent Coder invocations (see
+    `write_planned_files`); all of them are joined before the Tester runs.
+    """
+    files = [f["path"] for f in state["planned_files"]]
+    outputs = run_sync(write_planned_files(agents["Coder"], state['plan'], state["planned_files"]))
+    code = "\n\n".join(f"### {path}\n{outputs[path]}" for path in files)
+    return {
+        "code": code,
+        "agent_log": [f"{len(files)} coders wrote the planned files in parallel: {', '.join(files)}"],
+    }
+
+def record_writes(state: TeamState, before: dict, after: dict) -> dict:
+    """State update for the files changed between two snapshots taken around an agent's step."""
+    files = dict(state.get("workspace_files") or {})
+    touched = WorkspaceChanges.changed(before, after)
+    for path in touched:
+        if path in after:
+            files[path] = after[path]
+        else:
+            files.pop(path, None)
+    update = {"workspace_files": files}
+    planned = [f["path"] for f in state.get("planned_files") or [] if f["path"] in files]
+    main_file = planned[0] if planned else next((path for path in touched if path in files), None)
+    if main_file and state.get("code_file_path") not in files:
+        update["code_file_path"] = main_file
+    return update
+
+def coder_node(state: TeamState, agents: dict):
+    changes = create_workspace_changes()
+    before = changes.snapshot()
+    if len(state.get("planned_files") or []) > 1 and not state.get("code"):
+        # First pass over a multi-file plan: one Coder per file
+        update = parallel_coder_node(state, agents)
+    else:
+        agent = agents["Coder"]
+        task_with_plan = f"Here is the plan:\n\n{state['plan']}\n\nPlease write the code."
+        if state.get("workspace_files"):
+            task_with_plan += f"\n\n{changes.briefing(state, 'Coder')}"
+        if state.get("test_run") and not TestRunResult.from_dict(state["test_run"]).no_tests \
+                and not run_succeeded(state["test_run"]):
+            task_with_plan += f"\n\nThe tests are failing. Fix the code so they pass:\n{state['test_results']}"
+        if state.get("review_comments"):
+            task_with_plan += f"\n\nThe Reviewer requested changes. Address them:\n{state['review_comments']}"
+        result = run_agent(agent, {"messages": [("user", task_with_plan)]})
+        update = {"code": result['output'], "agent_log": [f"Coder wrote the code: {result['output']}"]}
+    update.update(record_writes(state, before, changes.snapshot()))
+    update["agent_views"] = viewed({**state, **update}, "Coder")
+    return update
+
+def tester_node(state: TeamState, agents: dict):
+    """
+    Runs the workspace's test suite and records its structured result. The
+    Tester agent is only invoked while there are no tests to run; after that,
+    each pass re-runs just the tests affected by the files changed since the
+    previous run, without an LLM call. In a workspace whose test framework the
+    runner doesn't support (or with nothing to test), the Tester runs the
+    tests itself and its report is the result.
+    """
+    runner = TestRunner(config.WORKING_DIR, timeout=config.TEST_TIMEOUT_SECONDS)
+    previous = state.get("test_run")
+    log, update = [], {}
+    if not previous or TestRunResult.from_dict(previous).no_tests:
+        changes = create_workspace_changes()
+        before = changes.snapshot()
+        task_for_tester = (f"Here is the code to test:\n\n{changes.briefing(state, 'Tester')}\n\n"
+                           "Please write the tests for it, run them and report the results.")
+        result = run_agent(agents["Tester"], {"messages": [("user", task_for_tester)]})
+        tester_report = result['output']
+        log.append(f"Tester wrote tests: {tester_report}")
+        update.update(record_writes(state, before, changes.snapshot()))
+        update["agent_views"] = viewed({**state, **update}, "Tester")
+        changed = None
+    else:
+        changed = TestRunner.changed_files(state.get("test_snapshot"), runner.snapshot())
+    if changed == [] and run_succeeded(previous):
+        # Nothing changed since a passing run: its result still holds
+        run = TestRunResult.from_dict(previous)
+    else:
+        run = runner.run(changed, previous)
+    summary = run.summary()
+    if run.framework is None and changed is None:
+        # No framework the runner can drive: the Tester's own run is all there is
+        summary = f"The test runner supports no test framework of this workspace; the Tester ran the tests.\nThe Tester's report:\n{tester_report}"
+    log.append(f"Tests ran. Results: {summary}")
+    update.update({"test_results": summary, "test_run": run.to_dict(), "test_snapshot": runner.snapshot(), "agent_log": log})
+    return update
+
+def reviewer_node(state: TeamState, agents: dict):
     agent = agents["Reviewer"]
-    task_for_reviewer = f"Here is the code to review:\n\n{state['code']}\n\nAnd here are the test results:\n{state['test_results']}"
-    result = agent.invoke({"messages": [("user", task_for_reviewer)]})
-    return {"review_comments": result['output'], "agent_log": [f"Reviewer provided feedback: {result['output']}"]}
+    briefing = create_workspace_changes().briefing(state, "Reviewer")
+    test_results = state['test_results']
+    if state.get("test_run") and TestRunResult.from_dict(state["test_run"]).framework:
+        # Without timings, the same code and results give the same prompt, so a re-run hits the cache
+        test_results = TestRunResult.from_dict(state["test_run"]).summary(timing=False)
+    task_for_reviewer = f"Here is the code to review:\n\n{briefing}\n\nAnd here are the test results:\n{test_results}"
+    result = run_agent(agent, {"messages": [("user", task_for_reviewer)]})
+    return {
+        "review_comments": result['output'],
+        "agent_views": viewed(state, "Reviewer"),
+        "agent_log": [f"Reviewer provided feedback: {result['output']}"],
+    }
+
+RESULT_FIELDS = ["plan", "code", "code_file_path", "workspace_files", "test_results", "test_run", "review_comments"]
 
-# --- 3. DEFINE GRAPH LOGIC ---
+def governed(node_name: str, node_fn, agents: dict):
+    """
+    Wraps a node so every run of it is charged to the run's budget: its
+    iteration count, the LLM tokens it used and, if it improved on the best
+    result so far, a snapshot of that result.
+    """
+    def run(state: TeamState):
+        start = time.monotonic()
+        with get_openai_callback() as usage:
+            update = node_fn(state, agents)
+        iterations = dict(state.get("node_iterations") or {})
+        iterations[node_name] = iterations.get(node_name, 0) + 1
+        update["node_iterations"] = iterations
+        update["tokens_used"] = state.get("tokens_used", 0) + usage.total_tokens
+        update["elapsed_seconds"] = state.get("elapsed_seconds", 0) + time.monotonic() - start
+        merged = {**state, **update}
+        best = state.get("best_result") or {}
+        if result_score(merged) >= result_score(best):
+            update["best_result"] = {key: merged.get(key) for key in RESULT_FIELDS}
+        return update
+    return run
+
+def finalize_node(state: TeamState):
+    """Terminal node for runs stopped by their budget: returns the best result reached so far."""
+    reason = state.get("stop_reason") or "budget exhausted"
+    best = state.get("best_result") or {}
+    print(f"Stopping the team: {reason}.")
+    return {
+        **{key: value for key, value in best.items() if value},
+        "stop_reason": reason,
+        "agent_log": [f"Run stopped: {reason}. Returning the best result so far."],
+    }
+
+# --- 2. DEFINE GRAPH LOGIC ---
 # This defines how the team collaborates and moves from one step to the next.
+def within_budget(state: TeamState, next_node: str):
+    """Returns `next_node`, or sends the run to "Finalize" (with the reason) if its budget doesn't allow running it."""
+    reason = TeamBudget.from_dict(state.get("budget")).exhausted(state, next_node)
+    if reason:
+        return Send("Finalize", {**state, "stop_reason": reason})
+    return next_node
+
 def decide_after_test(state: TeamState):
-    if "error" in state['test_results'].lower() or "fail" in state['test_results'].lower():
-        print("Tests failed. Returning to Coder.")
-        return "Coder"  # Go back to the coder to fix the code
+    run = TestRunResult.from_dict(state['test_run'])
+    if run.framework is None:
+        # Nothing the runner can run (an unsupported framework, or nothing to test): the
+        # Reviewer judges the Tester's report, as before the runner existed
+        print("No supported test framework found. Proceeding to Reviewer with the Tester's report.")
+        return within_budget(state, "Reviewer")
+    if run.no_tests:
+        print("No tests found. Returning to Tester.")
+        return within_budget(state, "Tester")  # Have the tester write them
+    if not run.succeeded:
+        print(f"Tests failed ({run.failed} failed, {run.errors} errors). Returning to Coder.")
+        return within_budget(state, "Coder")  # Go back to the coder to fix the code
     else:
-        print("Tests passed. Proceeding to Reviewer.")
-        return "Reviewer" # Proceed to the reviewer
+        print(f"Tests passed ({run.passed} passed). Proceeding to Reviewer.")
+        return within_budget(state, "Reviewer") # Proceed to the reviewer
 
 def decide_after_review(state: TeamState):
     if "lgtm" in state['review_comments'].lower():
@@ -65,47 +259,109 @@ def decide_after_review(state: TeamState):
         return END # The project is finished
     else:
         print("Review requires changes. Returning to Coder.")
-        return "Coder" # Go back to the coder with the review feedback
+        return within_budget(state, "Coder") # Go back to the coder with the review feedback
 
-# --- 4. BUILD THE GRAPH ---
-workflow = StateGraph(TeamState)
+def create_initial_state(task: str, budget: dict = None) -> dict:
+    """
+    The starting state of a team run. `budget` overrides the configured
+    TEAM_BUDGET limits for this run only (see team/budget.py).
+    """
+    return {
+        "task": task,
+        "budget": TeamBudget.from_dict(budget).to_dict(),
+        "node_iterations": {},
+        "tokens_used": 0,
+        "elapsed_seconds": 0.0,
+    }
 
-workflow.add_node("Architect", architect_node)
-workflow.add_node("Coder", coder_node)
-workflow.add_node("Tester", tester_node)
-workflow.add_node("Reviewer", reviewer_node)
+# --- 3. BUILD THE GRAPH ---
+def build_team_app(vectorstore_service: VectorStoreService = None, checkpointer=None):
+    """
+    Creates the team's LLM, tools and agents and compiles the LangGraph workflow.
+    When a `vectorstore_service` is given, the Coder and Tester also get the
+    `find_definition` / `find_references` symbol tools backed by its index.
+    With a `checkpointer` (see team/runs.py) every completed step is saved, so
+    runs invoked with a run id in their config can be resumed.
+    """
+    # One model per role, so response caching can be switched on per agent
+    role_llms = {role: create_llm(role) for role in TEAM_ROLES}
+    file_tools = FileManagementToolkit(root_dir=config.WORKING_DIR).get_tools() + create_edit_tools(config.WORKING_DIR)
+    # Only the Tester gets the shell; its session persists across the Tester's steps
+    shell_tool = create_shell_tool("team:Tester")
+    all_tools = file_tools + [shell_tool]
+    code_nav_tools = create_symbol_tools(vectorstore_service) if vectorstore_service else []
 
-workflow.set_entry_point("Architect")
+    # Create the agents
+    agents = create_team_supervisor(role_llms, all_tools, file_tools, code_nav_tools)
 
-workflow.add_edge("Architect", "Coder")
-workflow.add_edge("Coder", "Tester")
+    workflow = StateGraph(TeamState)
 
-workflow.add_conditional_edges(
-    "Tester",
-    decide_after_test,
-    {"Coder": "Coder", "Reviewer": "Reviewer"}
-)
-workflow.add_conditional_edges(
-    "Reviewer",
-    decide_after_review,
-    {"Coder": "Coder", END: END}
-)
+    workflow.add_node("Architect", governed("Architect", architect_node, agents))
+    workflow.add_node("Coder", governed("Coder", coder_node, agents))
+    workflow.add_node("Tester", governed("Tester", tester_node, agents))
+    workflow.add_node("Reviewer", governed("Reviewer", reviewer_node, agents))
+    workflow.add_node("Finalize", finalize_node)
 
-# Compile the graph into a runnable application
-app = workflow.compile()
+    workflow.set_entry_point("Architect")
 
-# --- 5. RUN THE TEAM ---
+    # Every transition to another agent is checked against the run's budget
+    workflow.add_conditional_edges(
+        "Architect",
+        lambda state: within_budget(state, "Coder"),
+        {"Coder": "Coder", "Finalize": "Finalize"}
+    )
+    workflow.add_conditional_edges(
+        "Coder",
+        lambda state: within_budget(state, "Tester"),
+        {"Tester": "Tester", "Finalize": "Finalize"}
+    )
+    workflow.add_conditional_edges(
+        "Tester",
+        decide_after_test,
+        {"Tester": "Tester", "Coder": "Coder", "Reviewer": "Reviewer", "Finalize": "Finalize"}
+    )
+    workflow.add_conditional_edges(
+        "Reviewer",
+        decide_after_review,
+        {"Coder": "Coder", "Finalize": "Finalize", END: END}
+    )
+    workflow.add_edge("Finalize", END)
+
+    # Compile the graph into a runnable application
+    return workflow.compile(checkpointer=checkpointer)
+
+# --- 4. RUN THE TEAM ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AI team on one task.")
+    parser.add_argument("--max-minutes", type=float, help="wall-clock budget of the run")
+    parser.add_argument("--max-tokens", type=int, help="LLM token budget of the run")
+    parser.add_argument("--max-iterations", type=int, help="maximum runs of each of the Coder, Tester and Reviewer")
+    args = parser.parse_args()
+    budget = {}
+    if args.max_minutes is not None:
+        budget["max_seconds"] = args.max_minutes * 60
+    if args.max_tokens is not None:
+        budget["max_tokens"] = args.max_tokens
+    if args.max_iterations is not None:
+        budget["max_node_iterations"] = {role: args.max_iterations for role in ("Coder", "Tester", "Reviewer")}
+
     os.makedirs(config.WORKING_DIR, exist_ok=True)
+    vectorstore_service = VectorStoreService(
+        working_dir=config.WORKING_DIR,
+        supported_file_types=config.SUPPORTED_FILE_TYPES,
+        embeddings_model=config.EMBEDDINGS_MODEL,
+        index_dir=config.INDEX_DIR
+    )
+    app = build_team_app(vectorstore_service)
     print("🤖 AI Team is ready. Enter a complex task for them to complete.")
-    
+
     user_task = input("\n🗣️  You: ")
-    
+
     if user_task:
-        initial_state = {"task": user_task}
+        initial_state = create_initial_state(user_task, budget)
         # The `stream` method lets us see the output from each step as it happens
         for step in app.stream(initial_state):
             step_name, step_output = list(step.items())[0]
             print(f"--- AGENT: {step_name} ---")
             print(f"Log: {step_output.get('agent_log', 'No log entry')[-1]}")
-            print("\n")
\ No newline at end of file
+            print("\n")
@@ -0,0 +1,213 @@
+"""
+Async execution of the agents' tool calls.
+
+When the model asks for several tools in one turn, `AgentExecutor`'s async
+path (`ainvoke`, `astream_events`) runs them concurrently. That is only safe
+for tools that don't change anything, so every call also takes its
+workspace's `WorkspaceLock`: read-only tools share it, and every other tool
+(shell, git, docker, python_repl, file writes and patches, questions to the
+user) holds it alone. Agents working in the same workspace, including
+parallel team coders, are serialized against each other the same way.
+"""
+import asyncio
+import os
+import signal
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Set, Tuple
+from langchain.agents import AgentExecutor
+
+# Tools that only read the workspace (or the web); any tool not listed here is treated as side-effecting
+READ_ONLY_TOOLS = frozenset({
+    "read_file", "list_directory", "file_search", "read_many_files",
+    "codebase_qa_tool", "find_definition", "find_references", "web_search",
+})
+
+
+def is_side_effecting(tool_name: str) -> bool:
+    return tool_name not in READ_ONLY_TOOLS
+
+
+class WorkspaceLock:
+    """
+    A readers-writer lock for one workspace: any number of read-only tool
+    calls at a time, or a single side-effecting one. Waiting writers go first,
+    so a stream of reads can't starve them. Threads wait for it with `hold()`
+    and coroutines with `ahold()`, which waits without tying up a thread (the
+    tool holding the lock may need the executor's threads to finish).
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_take(self, exclusive: bool) -> bool:
+        # Called with self._cond held
+        if exclusive:
+            if self._writer or self._readers:
+                return False
+            self._writers_waiting -= 1
+            self._writer = True
+        else:
+            if self._writer or self._writers_waiting:
+                return False
+            self._readers += 1
+        return True
+
+    def _notify(self):
+        # Called with self._cond held
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=wakeup: f.done() or f.set_result(None))
+            except RuntimeError:
+                pass  # that loop has closed
+
+    def acquire(self, exclusive: bool):
+        with self._cond:
+            if exclusive:
+                self._writers_waiting += 1
+            while not self._try_take(exclusive):
+                self._cond.wait()
+
+    def release(self, exclusive: bool):
+        with self._cond:
+            if exclusive:
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._notify()
+
+    @contextmanager
+    def hold(self, exclusive: bool):
+        self.acquire(exclusive)
+        try:
+            yield
+        finally:
+            self.release(exclusive)
+
+    @asynccontextmanager
+    async def ahold(self, exclusive: bool):
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if exclusive:
+                self._writers_waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    if self._try_take(exclusive):
+                        break
+                    wakeup = loop.create_future()
+                    self._async_waiters.append((loop, wakeup))
+                await wakeup
+        except asyncio.CancelledError:
+            if exclusive:
+                with self._cond:
+                    self._writers_waiting -= 1
+                    self._notify()
+            raise
+        try:
+            yield
+        finally:
+            self.release(exclusive)
+
+
+_workspace_locks: Dict[str, WorkspaceLock] = {}
+_workspace_locks_lock = threading.Lock()
+
+
+def get_workspace_lock(root: str) -> WorkspaceLock:
+    """The process-wide lock of the workspace at `root`."""
+    root = os.path.realpath(root)
+    with _workspace_locks_lock:
+        return _workspace_locks.setdefault(root, WorkspaceLock())
+
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """
+    An AgentExecutor whose tool calls take the workspace lock. Run it through
+    `ainvoke` or `astream_events` to get one turn's tool calls concurrently.
+    A cancelled call also stops the tool's work if the tool has a `cancel()`
+    method (the shell and Python tools do), instead of leaving it running.
+    """
+    workspace_root: str
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        with get_workspace_lock(self.workspace_root).hold(is_side_effecting(agent_action.tool)):
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        async with get_workspace_lock(self.workspace_root).ahold(is_side_effecting(agent_action.tool)):
+            try:
+                return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+            except asyncio.CancelledError:
+                cancel = getattr(name_to_tool_map.get(agent_action.tool), "cancel", None)
+                if cancel is not None:
+                    cancel()
+                raise
+
+
+# --- Running async agents from synchronous code ---
+
+_running: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Task]] = set()
+_running_lock = threading.Lock()
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine to completion on a new event loop and returns its result.
+    On the main thread Ctrl-C cancels it (and raises KeyboardInterrupt); runs
+    on other threads are stopped with `cancel_running()`.
+    """
+    async def tracked():
+        entry = (asyncio.get_running_loop(), asyncio.current_task())
+        with _running_lock:
+            _running.add(entry)
+        try:
+            return await coro
+        finally:
+            with _running_lock:
+                _running.discard(entry)
+    return asyncio.run(tracked())
+
+
+def cancel_running():
+    """Cancels every coroutine currently running under `run_sync`, on any thread."""
+    with _running_lock:
+        entries = list(_running)
+    for loop, task in entries:
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            pass  # finished in the meantime
+
+
+@contextmanager
+def cancel_on_interrupt():
+    """
+    While active, Ctrl-C also cancels the `run_sync` runs on other threads
+    (e.g. graph nodes run by LangGraph's thread pool) before the main thread
+    sees the KeyboardInterrupt, so nothing has to wait for them to finish.
+    Main thread only.
+    """
+    def handler(signum, frame):
+        cancel_running()
+        signal.default_int_handler(signum, frame)
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def run_agent(agent: AgentExecutor, inputs: dict) -> dict:
+    """`agent.invoke(inputs)`, but through the async path so the tool calls of a turn run concurrently."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run_sync(agent.ainvoke(inputs))
+    # asyncio.run() can't be nested inside a running event loop: fall back to the sync path
+    return agent.invoke(inputs)
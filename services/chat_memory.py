@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from typing import Callable, List, Optional, Tuple
+import config
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+
+@dataclass
+class ChatTurn:
+    human: str
+    ai: str
+    tokens: int  # tokens of both messages as stored
+    prompt_tokens: Optional[int] = None  # LLM prompt tokens the request cost, over all its calls (None if unknown)
+    total_tokens: Optional[int] = None  # prompt plus completion tokens
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class ChatSessionInfo:
+    session_id: str
+    turns: int
+    updated_at: float
+    title: str  # the first request of the session
+
+
+Summarizer = Callable[[str, List[ChatTurn], int], str]
+
+
+def _count_tokens(text: str) -> int:
+    from services.context_packer import count_tokens
+    return count_tokens(text, config.AGENT_MODEL)
+
+
+def _truncate(text: str, max_tokens: int) -> Tuple[str, int]:
+    """Cuts the middle out of `text` if it has more than `max_tokens` tokens; returns it with its token count."""
+    tokens = _count_tokens(text)
+    if tokens <= max_tokens:
+        return text, tokens
+    keep = int(len(text) * max_tokens / tokens) // 2
+    text = f"{text[:keep]}\n... [{tokens - max_tokens} tokens omitted] ...\n{text[-keep:]}"
+    return text, _count_tokens(text)
+
+
+def _format_turns(turns: List[ChatTurn]) -> str:
+    return "\n\n".join(f"User: {turn.human}\nAssistant: {turn.ai}" for turn in turns)
+
+
+def extractive_summary(previous: str, turns: List[ChatTurn], max_tokens: int) -> str:
+    """Fallback summary without an LLM: the earlier summary plus the first line of each request."""
+    lines = [previous] if previous else []
+    lines += [f"- The user asked: {turn.human.strip().splitlines()[0][:200]}" for turn in turns if turn.human.strip()]
+    return _truncate("\n".join(lines), max_tokens)[0]
+
+
+def create_summarizer() -> Summarizer:
+    """Summarizes turns with the "memory" model (see services/llm_cache.py), built on first use."""
+    llm = []
+
+    def summarize(previous: str, turns: List[ChatTurn], max_tokens: int) -> str:
+        if not llm:
+            from services.llm_cache import create_llm
+            llm.append(create_llm("memory", temperature=0))
+        messages = [
+            ("system",
+             "You maintain the running summary of a conversation between a developer and a coding assistant. "
+             "Merge the new turns into the summary. Keep what later requests may refer to: goals, decisions, "
+             "file and function names, commands, errors and their fixes, open tasks. Drop pleasantries and code "
+             "that was written to files (name the files instead)."),
+            ("human",
+             f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{_format_turns(turns)}\n\n"
+             f"Write the updated summary in at most {max_tokens * 3 // 4} words."),
+        ]
+        return _truncate(llm[0].invoke(messages).content, max_tokens)[0]
+    return summarize
+
+
+class ChatMemory:
+    """
+    The REPL's conversation history, bounded by a token budget. Recent turns
+    are kept verbatim; once they outgrow the budget, the oldest ones are
+    folded into a rolling summary on a background thread, so a request never
+    waits for it (until it finishes, `messages()` just leaves the oldest
+    turns out). The session is saved to `path` after every change.
+    """
+    def __init__(self, session_id: str, path: str, summarizer: Optional[Summarizer] = None,
+                 token_budget: int = 4000, summary_budget: int = 800, min_recent_turns: int = 2,
+                 max_message_tokens: int = 1500):
+        self.session_id = session_id
+        self.path = path
+        self.summarizer = summarizer or create_summarizer()
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_recent_turns = min_recent_turns
+        self.max_message_tokens = max_message_tokens
+        self.created_at = time.time()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_turns: List[ChatTurn] = []  # folded into the summary; kept for the record
+        self.turns: List[ChatTurn] = []  # verbatim
+        self._lock = threading.RLock()
+        self._compacting: Optional[threading.Thread] = None
+
+    # --- History ---
+
+    def add_turn(self, human: str, ai: str, prompt_tokens: Optional[int] = None,
+                 total_tokens: Optional[int] = None) -> ChatTurn:
+        human, human_tokens = _truncate(human, self.max_message_tokens)
+        ai, ai_tokens = _truncate(ai, self.max_message_tokens)
+        turn = ChatTurn(human, ai, human_tokens + ai_tokens, prompt_tokens, total_tokens)
+        with self._lock:
+            self.turns.append(turn)
+            self.save()
+            self._maybe_compact()
+        return turn
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """The history to send with the next request: the summary, then the newest turns that fit the budget."""
+        with self._lock:
+            budget = self.token_budget - self.summary_tokens
+            recent = []
+            for turn in reversed(self.turns):
+                if recent and budget - turn.tokens < 0:
+                    break
+                recent.insert(0, turn)
+                budget -= turn.tokens
+            history = [("system", f"{SUMMARY_HEADER}\n{self.summary}")] if self.summary else []
+            for turn in recent:
+                history += [("human", turn.human), ("ai", turn.ai)]
+            return history
+
+    def history_tokens(self) -> int:
+        """Tokens of the history `messages()` currently returns."""
+        with self._lock:
+            return sum(_count_tokens(text) for _, text in self.messages())
+
+    @property
+    def all_turns(self) -> List[ChatTurn]:
+        with self._lock:
+            return self.summarized_turns + self.turns
+
+    # --- Summarizing ---
+
+    def _maybe_compact(self):
+        # Called with the lock held
+        if self._compacting is not None:
+            return
+        verbatim = sum(turn.tokens for turn in self.turns)
+        limit = self.token_budget - self.summary_budget
+        fold = 0
+        while verbatim > limit and len(self.turns) - fold > self.min_recent_turns:
+            verbatim -= self.turns[fold].tokens
+            fold += 1
+        if fold:
+            self._compacting = threading.Thread(target=self._compact, args=(self.turns[:fold],),
+                                                name="chat-summary", daemon=True)
+            self._compacting.start()
+
+    def _compact(self, turns: List[ChatTurn]):
+        try:
+            summary = self.summarizer(self.summary, turns, self.summary_budget)
+        except Exception as e:
+            print(f"Summarizing the chat history failed, keeping a plain list of requests instead: {e}")
+            summary = extractive_summary(self.summary, turns, self.summary_budget)
+        with self._lock:
+            self.summary, self.summary_tokens = summary, _count_tokens(summary)
+            self.summarized_turns += turns
+            self.turns = self.turns[len(turns):]
+            self._compacting = None
+            self.save()
+            self._maybe_compact()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Waits for a background summary to finish (e.g. before exiting)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                thread = self._compacting
+            if thread is None:
+                return
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    # --- Persistence ---
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "created_at": self.created_at,
+                "updated_at": time.time(),
+                "summary": self.summary,
+                "summary_tokens": self.summary_tokens,
+                "summarized_turns": [asdict(turn) for turn in self.summarized_turns],
+                "turns": [asdict(turn) for turn in self.turns],
+            }
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "ChatMemory":
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        memory = cls(data["session_id"], path, **kwargs)
+        memory.created_at = data.get("created_at", memory.created_at)
+        memory.summary = data.get("summary", "")
+        memory.summary_tokens = data.get("summary_tokens", 0)
+        memory.summarized_turns = [ChatTurn(**turn) for turn in data.get("summarized_turns", [])]
+        memory.turns = [ChatTurn(**turn) for turn in data.get("turns", [])]
+        with memory._lock:
+            # A summary interrupted by the last exit (or a smaller budget) is picked up again
+            memory._maybe_compact()
+        return memory
+
+
+def _session_path(session_id: str) -> str:
+    return os.path.join(config.CHAT_SESSIONS_DIR, f"{session_id}.json")
+
+
+def list_sessions() -> List[ChatSessionInfo]:
+    """Saved chat sessions, most recently updated first."""
+    sessions = []
+    if not os.path.isdir(config.CHAT_SESSIONS_DIR):
+        return sessions
+    for name in os.listdir(config.CHAT_SESSIONS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(config.CHAT_SESSIONS_DIR, name), encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        turns = data.get("summarized_turns", []) + data.get("turns", [])
+        sessions.append(ChatSessionInfo(data["session_id"], len(turns), data.get("updated_at", 0),
+                                        turns[0]["human"] if turns else ""))
+    return sorted(sessions, key=lambda s: -s.updated_at)
+
+
+def create_chat_memory(session_id: Optional[str] = None) -> ChatMemory:
+    """
+    Reloads saved session `session_id` (a unique prefix is enough), or starts
+    a new session. Raises ValueError if no single saved session matches.
+    """
+    options = dict(
+        token_budget=config.CHAT_MEMORY_TOKEN_BUDGET,
+        summary_budget=config.CHAT_SUMMARY_TOKEN_BUDGET,
+        min_recent_turns=config.CHAT_MEMORY_MIN_RECENT_TURNS,
+        max_message_tokens=config.CHAT_MESSAGE_MAX_TOKENS,
+    )
+    if session_id is None:
+        session_id = uuid.uuid4().hex[:8]
+        return ChatMemory(session_id, _session_path(session_id), **options)
+    matches = [s.session_id for s in list_sessions() if s.session_id.startswith(session_id)]
+    if len(matches) != 1:
+        raise ValueError(f"No unique chat session matches `{session_id}`.")
+    return ChatMemory.load(_session_path(matches[0]), **options)
@@ -0,0 +1,160 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Set
+import tiktoken
+from langchain_core.documents import Document
+
+SHINGLE_SIZE = 5
+# Spans whose token shingles overlap this much with an already packed span are dropped
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Don't bother packing a truncated span smaller than this many tokens
+MIN_PARTIAL_TOKENS = 64
+# Chunks of the same file at most this many characters apart count as adjacent
+# (the splitter strips the blank lines between chunks)
+ADJACENT_GAP = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use; don't break QA when that fails
+        print(f"Tokenizer for {model} unavailable, estimating token counts instead: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Counts tokens with the model's real tokenizer (or a ~4 chars/token estimate if it can't be loaded)."""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class _Span:
+    """A contiguous region of one file assembled from one or more retrieved chunks."""
+    source: str
+    start: Optional[int]  # character offset in the file, None if unknown
+    text: str
+    start_line: Optional[int]
+    rank: int  # best retrieval rank among the merged chunks
+    shingles: Set[int] = field(default_factory=set)
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+    @property
+    def end_line(self) -> Optional[int]:
+        if self.start_line is None:
+            return None
+        return self.start_line + self.text.rstrip("\n").count("\n")
+
+
+def _shingles(text: str) -> Set[int]:
+    tokens = re.findall(r"\w+|[^\w\s]", text)
+    return {hash(tuple(tokens[i:i + SHINGLE_SIZE])) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))}
+
+
+class ContextPacker:
+    """
+    Turns ranked retrieval results into a compact prompt context: overlapping or
+    adjacent chunks of the same file are merged, every span is labelled with its
+    file path and line range, near-identical spans are dropped, and spans are
+    added in rank order until the token budget is spent.
+    """
+    def __init__(self, token_budget: int, model: str):
+        self.token_budget = token_budget
+        self.model = model
+
+    def _merge(self, documents: List[Document]) -> List[_Span]:
+        spans_by_source = {}
+        loose = []
+        for rank, doc in enumerate(documents):
+            source = doc.metadata.get("source", "unknown")
+            start = doc.metadata.get("start_index")
+            span = _Span(source, start, doc.page_content, doc.metadata.get("start_line"), rank)
+            if start is None or start < 0:
+                loose.append(span)
+            else:
+                spans_by_source.setdefault(source, []).append(span)
+
+        merged = []
+        for spans in spans_by_source.values():
+            spans.sort(key=lambda s: s.start)
+            current = spans[0]
+            for span in spans[1:]:
+                if span.start <= current.end + ADJACENT_GAP:
+                    # Overlapping or adjacent: stitch on the part that isn't already covered
+                    if span.start > current.end:
+                        # Re-insert the stripped line breaks so line numbers stay exact
+                        gap_lines = 1
+                        if span.start_line is not None and current.start_line is not None:
+                            gap_lines = max(1, span.start_line - current.end_line)
+                        current.text += "\n" * gap_lines + span.text
+                    elif span.end > current.end:
+                        current.text += span.text[current.end - span.start:]
+                    current.rank = min(current.rank, span.rank)
+                else:
+                    merged.append(current)
+                    current = span
+            merged.append(current)
+        merged.extend(loose)
+        merged.sort(key=lambda s: s.rank)
+        return merged
+
+    def _dedup(self, spans: List[_Span]) -> List[_Span]:
+        kept = []
+        for span in spans:
+            span.shingles = _shingles(span.text)
+            duplicate = False
+            for other in kept:
+                overlap = len(span.shingles & other.shingles) / max(1, min(len(span.shingles), len(other.shingles)))
+                if overlap >= NEAR_DUPLICATE_THRESHOLD:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(span)
+        return kept
+
+    @staticmethod
+    def _header(span: _Span, end_line: Optional[int] = None) -> str:
+        if span.start_line is None:
+            return f"### {span.source}"
+        return f"### {span.source} (lines {span.start_line}-{end_line or span.end_line})"
+
+    def pack(self, documents: List[Document]) -> str:
+        """Returns the packed context, or an empty string if there is nothing to pack."""
+        parts = []
+        used = 0
+        for span in self._dedup(self._merge(documents)):
+            block = f"{self._header(span)}\n{span.text.strip()}\n"
+            cost = count_tokens(block, self.model)
+            if used + cost <= self.token_budget:
+                parts.append(block)
+                used += cost
+                continue
+
+            # Fit the beginning of the span into whatever budget is left, line by line
+            remaining = self.token_budget - used
+            if remaining < MIN_PARTIAL_TOKENS:
+                break
+            kept_lines = []
+            kept_cost = count_tokens(f"{self._header(span)}\n... (truncated)\n", self.model)
+            for line in span.text.strip().split("\n"):
+                line_cost = count_tokens(line + "\n", self.model)
+                if kept_cost + line_cost > remaining:
+                    break
+                kept_lines.append(line)
+                kept_cost += line_cost
+            if kept_lines:
+                end_line = span.start_line + len(kept_lines) - 1 if span.start_line is not None else None
+                parts.append(f"{self._header(span, end_line)}\n" + "\n".join(kept_lines) + "\n... (truncated)\n")
+            break
+        return "\n".join(parts)
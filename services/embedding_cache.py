@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed store of chunk-hash -> embedding vector, so a chunk that
+    has been embedded once is never sent to the embeddings API again.
+    """
+    def __init__(self, db_path: str, model: str):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, chunk_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, chunk_hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(chunk_hashes), 500):
+                batch = chunk_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                    [self.model, *batch],
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        if not vectors:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)",
+                [(self.model, chunk_hash, array("f", vector).tobytes()) for chunk_hash, vector in vectors.items()],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
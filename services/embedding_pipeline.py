@@ -0,0 +1,215 @@
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from services.embedding_cache import EmbeddingCache
+from services.index_manifest import hash_content
+
+
+class RateLimitError(Exception):
+    """Raised by the fake backend to simulate an HTTP 429 from the embeddings API."""
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if _is_rate_limit(error):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and status >= 500:
+        return True
+    name = type(error).__name__.lower()
+    return any(word in name for word in ("timeout", "connection", "apierror", "serviceunavailable"))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _AdaptiveLimiter:
+    """
+    Bounds the number of in-flight requests. The bound is halved on every
+    rate-limit error and creeps back up on success (AIMD), and a rate limit
+    also pauses every worker until its backoff has elapsed.
+    """
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, rate_limited: bool = False, pause: float = 0.0):
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1.0, self.limit / 2)
+                self._resume_at = max(self._resume_at, time.monotonic() + pause)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Streaming embed stage in front of an embeddings backend: texts are
+    deduplicated, served from the chunk-hash cache when possible, and the rest
+    are sent in batches of `batch_size` with at most `max_concurrency` requests
+    in flight, retried with adaptive backoff. Each finished batch is written to
+    the cache immediately, so an interrupted run resumes where it stopped.
+    """
+    def __init__(self, underlying: Embeddings, cache: Optional[EmbeddingCache] = None, batch_size: int = 128,
+                 max_concurrency: int = 4, max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 on_progress: Optional[Callable[[int, int], None]] = None):
+        self.underlying = underlying
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_progress = on_progress
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+
+    def _embed_batch(self, limiter: _AdaptiveLimiter, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    limiter.release()
+                    raise
+                delay = _retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay *= 0.5 + random.random() / 2  # jitter so workers don't retry in lockstep
+                limiter.release(rate_limited=_is_rate_limit(e), pause=delay)
+                with self._stats_lock:
+                    self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+                continue
+            limiter.release()
+            return vectors
+
+    def iter_batches(self, texts: List[str]) -> Iterator[Tuple[List[str], List[List[float]]]]:
+        """
+        Embeds `texts` (deduplicated by content hash) and yields (chunk_hashes, vectors)
+        per batch as soon as each batch finishes; cached texts come first in one batch.
+        """
+        unique: Dict[str, str] = {}
+        for text in texts:
+            unique.setdefault(hash_content(text), text)
+
+        cached = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        with self._stats_lock:
+            self.hits += len(cached)
+            self.misses += len(unique) - len(cached)
+        if cached:
+            yield list(cached.keys()), list(cached.values())
+
+        missing = [(chunk_hash, text) for chunk_hash, text in unique.items() if chunk_hash not in cached]
+        if not missing:
+            return
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        limiter = _AdaptiveLimiter(self.max_concurrency)
+        done = 0
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {pool.submit(self._embed_batch, limiter, [text for _, text in batch]): batch for batch in batches}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    if error is None:
+                        # Stop starting new batches, but keep (and checkpoint) the ones already running
+                        error = future.exception()
+                        for pending in futures:
+                            pending.cancel()
+                    continue
+                batch = futures[future]
+                vectors = future.result()
+                hashes = [chunk_hash for chunk_hash, _ in batch]
+                if self.cache is not None:
+                    # Checkpoint: a rerun after a failure won't pay for this batch again
+                    self.cache.put_many(dict(zip(hashes, vectors)))
+                done += len(batch)
+                if self.on_progress:
+                    self.on_progress(done, len(missing))
+                if error is None:
+                    yield hashes, vectors
+        if error is not None:
+            raise error
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: Dict[str, List[float]] = {}
+        for hashes, batch_vectors in self.iter_batches(texts):
+            vectors.update(zip(hashes, batch_vectors))
+        return [vectors[hash_content(text)] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "retries": self.retries}
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic, local fake embeddings for offline tests and benchmarks:
+    identifier tokens are feature-hashed into a normalized vector, so texts
+    sharing vocabulary end up close. It can simulate per-request latency and
+    periodic rate-limit errors to exercise the pipeline.
+    """
+    def __init__(self, size: int = 256, latency: float = 0.0, rate_limit_every: int = 0):
+        self.size = size
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in re.findall(r"[A-Za-z_][A-Za-z0-9_]*|\d+", text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise RateLimitError("simulated 429 Too Many Requests")
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
@@ -0,0 +1,211 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+# Sentinel meaning "events were lost; everything may have changed"
+FULL_RESCAN = None
+
+
+class _InotifyBackend:
+    """Recursive inotify watches over a directory tree (Linux only)."""
+    def __init__(self, root: str, is_ignored: Callable[[str, bool], bool]):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.is_ignored = is_ignored
+        self._wd_to_dir: Dict[int, str] = {}
+        self._watch_tree("")
+
+    def _watch_tree(self, rel_dir: str) -> Set[str]:
+        """Adds watches for `rel_dir` and every non-ignored directory under it; returns the files found."""
+        files = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            abs_dir = os.path.join(self.root, current) if current else self.root
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(abs_dir), WATCH_MASK)
+            if wd < 0:
+                continue
+            self._wd_to_dir[wd] = current
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{current}/{entry.name}" if current else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not self.is_ignored(rel_path, True):
+                        stack.append(rel_path)
+                else:
+                    files.add(rel_path)
+        return files
+
+    def read_events(self, timeout: float) -> Optional[Set[str]]:
+        """Waits up to `timeout` seconds and returns the changed paths (or FULL_RESCAN)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="surrogateescape")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return FULL_RESCAN
+            if mask & IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                continue
+            parent = self._wd_to_dir.get(wd)
+            if parent is None or not name:
+                continue
+            rel_path = f"{parent}/{name}" if parent else name
+            is_dir = bool(mask & IN_ISDIR)
+            if self.is_ignored(rel_path, is_dir):
+                continue
+            changed.add(rel_path)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in a new directory before its watch exists
+                changed.update(self._watch_tree(rel_path))
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """Portable fallback: diffs periodic (size, mtime) snapshots of the tree."""
+    def __init__(self, snapshot: Callable[[], Dict[str, Tuple[int, float]]], interval: float):
+        self._snapshot = snapshot
+        self.interval = interval
+        self._last = snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def read_events(self, timeout: float) -> Optional[Set[str]]:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_poll = time.monotonic() + self.interval
+        current = self._snapshot()
+        changed = {path for path, stat in current.items() if self._last.get(path) != stat}
+        changed.update(path for path in self._last if path not in current)
+        self._last = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class WorkspaceWatcher:
+    """
+    Watches a workspace in a background thread and reports debounced bursts
+    of changed workspace-relative paths to `on_change`. Uses inotify on Linux
+    and falls back to polling elsewhere (or if inotify is unavailable).
+
+    `on_change` receives a set of paths, or None when events were lost and
+    the whole workspace should be rescanned. It is called on the watcher
+    thread, once right after start (with None) to sync the index.
+    """
+    def __init__(self, root: str, on_change: Callable[[Optional[Set[str]]], None],
+                 is_ignored: Callable[[str, bool], bool],
+                 poll_snapshot: Callable[[], Dict[str, Tuple[int, float]]],
+                 debounce: float = 0.5, max_delay: float = 5.0, poll_interval: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.is_ignored = is_ignored
+        self.poll_snapshot = poll_snapshot
+        self.debounce = debounce
+        # Flush even if changes keep coming, so a long burst can't starve the index
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.backend_name = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _create_backend(self):
+        if sys.platform.startswith("linux"):
+            try:
+                backend = _InotifyBackend(self.root, self.is_ignored)
+                self.backend_name = "inotify"
+                return backend
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, falling back to polling: {e}")
+        self.backend_name = "polling"
+        return _PollingBackend(self.poll_snapshot, self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="workspace-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        # Start watching before the initial sync so nothing written meanwhile is missed
+        backend = self._create_backend()
+        self.on_change(FULL_RESCAN)
+
+        pending: Set[str] = set()
+        rescan = False
+        first_event = last_event = 0.0
+        try:
+            while not self._stop.is_set():
+                events = backend.read_events(timeout=min(self.debounce, 0.25))
+                now = time.monotonic()
+                if events is FULL_RESCAN or events:
+                    if not pending and not rescan:
+                        first_event = now
+                    last_event = now
+                    if events is FULL_RESCAN:
+                        rescan = True
+                    else:
+                        pending.update(events)
+
+                if (pending or rescan) and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                    batch = FULL_RESCAN if rescan else pending
+                    pending, rescan = set(), False
+                    self.on_change(batch)
+        finally:
+            backend.close()
@@ -0,0 +1,78 @@
+import hashlib
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+
+def hash_content(content: str) -> str:
+    """Returns a stable hash for a file's (or chunk's) text content."""
+    return hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+@dataclass
+class FileRecord:
+    """What the index knows about a single workspace file."""
+    path: str
+    size: int
+    mtime: float
+    content_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ReindexReport:
+    """Summary of what a reindex pass did."""
+    files_scanned: int = 0
+    files_unchanged: int = 0
+    files_embedded: int = 0
+    files_removed: int = 0
+    chunks_reused: int = 0
+    chunks_embedded: int = 0
+    chunks_deleted: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files_scanned} files scanned "
+            f"({self.files_unchanged} unchanged, {self.files_embedded} new/changed, {self.files_removed} removed); "
+            f"{self.chunks_reused} chunks reused, {self.chunks_embedded} re-embedded, {self.chunks_deleted} deleted."
+        )
+
+
+class IndexManifest:
+    """
+    Per-file manifest of the vector index: path, size, mtime and content hash
+    mapped to the ids of the chunks that file contributed to the store.
+    Paths are stored relative to the workspace root.
+    """
+    def __init__(self):
+        self.files: Dict[str, FileRecord] = {}
+
+    def get(self, path: str) -> Optional[FileRecord]:
+        return self.files.get(path)
+
+    def set(self, record: FileRecord):
+        self.files[record.path] = record
+
+    def remove(self, path: str) -> Optional[FileRecord]:
+        return self.files.pop(path, None)
+
+    def paths(self) -> List[str]:
+        return list(self.files.keys())
+
+    def chunk_count(self) -> int:
+        return sum(len(record.chunk_ids) for record in self.files.values())
+
+    def clear(self):
+        self.files.clear()
+
+    def copy(self) -> "IndexManifest":
+        return IndexManifest.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {path: asdict(record) for path, record in self.files.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndexManifest":
+        manifest = cls()
+        for path, record in data.items():
+            manifest.files[path] = FileRecord(**record)
+        return manifest
@@ -0,0 +1,167 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Words that carry no signal in questions about code
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "code", "defined", "definition", "do", "does",
+    "file", "find", "for", "from", "how", "i", "in", "is", "it", "of", "on", "or", "show", "that", "the",
+    "this", "to", "what", "where", "which", "who", "with",
+}
+
+# "where is `x` defined", "definition of x", "find usages of x", "x()" ...
+SYMBOL_QUERY_RE = re.compile(
+    r"^\s*(?:where\s+is|where's|find|show(?:\s+me)?|locate|definition\s+of|what\s+is|usages?\s+of|references?\s+to)?"
+    r"\s*(?:the\s+)?(?:function|class|method|variable|constant|symbol)?\s*"
+    r"`?(?P<symbol>[A-Za-z_][A-Za-z0-9_.]*)`?(?:\(\))?"
+    r"\s*(?:defined|declared|implemented|used|called)?\s*\??\s*$",
+    re.IGNORECASE,
+)
+
+# Lines that define a symbol in the languages we index
+DEFINITION_TEMPLATE = (
+    r"(?m)^\s*(?:export\s+)?(?:async\s+)?(?:pub\s+)?(?:def|class|function|func|fn|interface|struct|enum|trait|"
+    r"type|const|let|var|module)\s+{}\b|^\s*{}\s*="
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Identifier-aware tokenizer: every identifier is kept whole (lowercased) and
+    additionally split into its snake_case / camelCase parts.
+    """
+    tokens = []
+    for ident in IDENTIFIER_RE.findall(text):
+        lowered = ident.lower()
+        tokens.append(lowered)
+        parts = [p.lower() for piece in ident.split("_") for p in CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p != lowered)
+    return tokens
+
+
+def _looks_like_identifier(word: str) -> bool:
+    return "_" in word or "." in word or any(c.isupper() for c in word[1:]) or any(c.isdigit() for c in word)
+
+
+def extract_symbol(query: str) -> Optional[str]:
+    """
+    Returns the identifier when the query is clearly a symbol lookup
+    (e.g. "where is `create_team_supervisor` defined"), otherwise None.
+    """
+    backticked = re.findall(r"`([A-Za-z_][A-Za-z0-9_.]*)(?:\(\))?`", query)
+    if len(backticked) == 1:
+        return backticked[0].split(".")[-1]
+    match = SYMBOL_QUERY_RE.match(query)
+    if match:
+        symbol = match.group("symbol")
+        bare = query.strip().strip("`?").rstrip("()")
+        # A single plain English word is not clearly a symbol unless it was asked about by itself
+        if _looks_like_identifier(symbol) or bare == symbol:
+            return symbol.split(".")[-1]
+    return None
+
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index over the same chunks as the vector store.
+    Updates tokenize outside the lock and only hold it briefly to apply changes.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._docs: Dict[str, Document] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def update(self, remove_ids: Iterable[str] = (), add: Iterable[Tuple[str, Document]] = ()):
+        """Removes the given chunk ids and adds (chunk_id, document) pairs."""
+        prepared = [(chunk_id, doc, Counter(tokenize(doc.page_content))) for chunk_id, doc in add]
+        with self._lock:
+            for chunk_id in remove_ids:
+                self._remove(chunk_id)
+            for chunk_id, doc, counts in prepared:
+                self._remove(chunk_id)
+                for term, tf in counts.items():
+                    self._postings.setdefault(term, {})[chunk_id] = tf
+                length = sum(counts.values())
+                self._doc_len[chunk_id] = length
+                self._total_len += length
+                self._docs[chunk_id] = doc
+
+    def _remove(self, chunk_id: str):
+        doc = self._docs.pop(chunk_id, None)
+        if doc is None:
+            return
+        for term in set(tokenize(doc.page_content)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(chunk_id, 0)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_len.clear()
+            self._docs.clear()
+            self._total_len = 0
+
+    def has_term(self, term: str) -> bool:
+        return term.lower() in self._postings
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """Returns the top-k (document, BM25 score) pairs for the query."""
+        return self._search_terms([t for t in tokenize(query) if t not in STOPWORDS], k)
+
+    def search_symbol(self, symbol: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """Searches for one whole identifier, with chunks that define it ranked first."""
+        results = self._search_terms([symbol.lower()], max(k * 4, 20))
+        definition = re.compile(DEFINITION_TEMPLATE.format(re.escape(symbol), re.escape(symbol)))
+        results.sort(key=lambda item: (definition.search(item[0].page_content) is None, -item[1]))
+        return results[:k]
+
+    def _search_terms(self, terms: List[str], k: int) -> List[Tuple[Document, float]]:
+        if not terms:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores: Dict[str, float] = {}
+            for term, query_tf in Counter(terms).items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + query_tf * idf * tf * (self.k1 + 1) / norm
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self._docs[chunk_id], score) for chunk_id, score in top]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """Fuses several ranked lists of documents (deduplicated by content and source)."""
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = (doc.metadata.get("source", ""), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in ranked]
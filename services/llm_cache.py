@@ -0,0 +1,220 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_openai import ChatOpenAI
+import config
+
+# Only the tail of a prompt is embedded for the semantic tier: the system prompt at the
+# head is the same for every call of a role, the request that varies comes last
+SEMANTIC_PROMPT_CHARS = 8000
+# Size-based eviction runs after this many writes rather than after every one
+EVICTION_INTERVAL = 50
+
+
+def _key(prompt: str, llm_string: str) -> Tuple[str, str]:
+    llm_hash = hashlib.sha256(llm_string.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{llm_hash}\x00{prompt}".encode("utf-8")).hexdigest(), llm_hash
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Disk-backed LLM response cache. Entries are keyed on the exact model,
+    parameters (including bound tools) and messages, expire after
+    `ttl_seconds`, and the least recently used ones are evicted beyond
+    `max_entries`.
+
+    With `semantic_embeddings` set, an exact miss falls back to the most
+    similar cached prompt of the same model/parameters if its cosine
+    similarity reaches `semantic_threshold`. That trades exactness for hits on
+    near-identical prompts, so it is opt-in.
+    """
+    def __init__(self, db_path: str, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None,
+                 semantic_embeddings: Optional[Embeddings] = None, semantic_threshold: float = 0.97):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_embeddings = semantic_embeddings
+        self.semantic_threshold = semantic_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._writes = 0
+        # llm hash -> (keys, normalized prompt embeddings), loaded on first semantic lookup
+        self._vectors: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, llm_hash TEXT NOT NULL, response TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL, embedding BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_llm_hash ON llm_responses (llm_hash)")
+        self._conn.commit()
+        self._expire()
+
+    def _expire(self):
+        if self.ttl_seconds is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def _evict(self):
+        # Called with the lock held
+        if self.max_entries is None:
+            return
+        excess = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._vectors.clear()
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        vector = np.array(self.semantic_embeddings.embed_query(prompt[-SEMANTIC_PROMPT_CHARS:]), dtype="float32")
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _semantic_lookup(self, query: np.ndarray, llm_hash: str) -> Optional[str]:
+        # Called with the lock held
+        if llm_hash not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM llm_responses WHERE llm_hash = ? AND embedding IS NOT NULL", (llm_hash,)
+            ).fetchall()
+            vectors = np.array([np.frombuffer(blob, dtype="float32") for _, blob in rows], dtype="float32")
+            self._vectors[llm_hash] = ([key for key, _ in rows], vectors)
+        keys, vectors = self._vectors[llm_hash]
+        if not keys:
+            return None
+        similarities = vectors @ query
+        best = int(np.argmax(similarities))
+        return keys[best] if similarities[best] >= self.semantic_threshold else None
+
+    def _get(self, key: str) -> Optional[str]:
+        # Called with the lock held; returns the serialized response if the entry exists and hasn't expired
+        row = self._conn.execute("SELECT response, created FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl_seconds is not None and row[1] < time.time() - self.ttl_seconds):
+            return None
+        self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return row[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key, llm_hash = _key(prompt, llm_string)
+        with self._lock:
+            response = self._get(key)
+        semantic = False
+        if response is None and self.semantic_embeddings is not None:
+            # Embed outside the lock: it is a network call
+            query = self._embed(prompt)
+            with self._lock:
+                similar_key = self._semantic_lookup(query, llm_hash)
+                if similar_key is not None:
+                    response, semantic = self._get(similar_key), True
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.semantic_hits += semantic
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # `loads` is flagged as beta
+                generations = loads(response)
+        except Exception:
+            # Written by an incompatible langchain version; treat it as a miss
+            return None
+        # Marked so telemetry can tell cached responses (and their stale token usage) from real calls
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.response_metadata["cache_hit"] = "semantic" if semantic else True
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key, llm_hash = _key(prompt, llm_string)
+        embedding = self._embed(prompt) if self.semantic_embeddings is not None else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, llm_hash, response, created, last_used, embedding)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, llm_hash, dumps(return_val), now, now, embedding.tobytes() if embedding is not None else None),
+            )
+            # Cached embedding matrices are rebuilt on the next semantic lookup for this model
+            self._vectors.pop(llm_hash, None)
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self._evict()
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._vectors.clear()
+
+    def size(self) -> int:
+        # Not __len__: langchain checks `if model.cache`, and an empty cache must not read as "no cache"
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": self.size(),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_shared_cache: Optional[SQLiteLLMCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteLLMCache:
+    """The process-wide response cache shared by the router, the single agent and the team."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            semantic_embeddings = None
+            if config.LLM_CACHE_SEMANTIC:
+                from langchain_openai import OpenAIEmbeddings
+                semantic_embeddings = OpenAIEmbeddings(model=config.EMBEDDINGS_MODEL)
+            _shared_cache = SQLiteLLMCache(
+                config.LLM_CACHE_PATH,
+                ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+                max_entries=config.LLM_CACHE_MAX_ENTRIES,
+                semantic_embeddings=semantic_embeddings,
+                semantic_threshold=config.LLM_CACHE_SEMANTIC_THRESHOLD,
+            )
+        return _shared_cache
+
+
+def create_llm(role: str, **kwargs) -> ChatOpenAI:
+    """
+    Creates the chat model for `role` ("router", "single_agent", or a team agent
+    name), using the shared response cache if caching is enabled for that role.
+    Cached roles default to temperature 0, so a replayed answer is the one a
+    fresh call would give. Its calls, and the agent runs and tools around them,
+    are recorded by services/telemetry.py, with `role` attached.
+    """
+    from services.telemetry import install_telemetry
+    install_telemetry()
+    cache = get_llm_cache() if config.LLM_CACHE_ROLES.get(role, False) else None
+    if cache is not None:
+        kwargs.setdefault("temperature", 0)
+    return ChatOpenAI(model=kwargs.pop("model", config.AGENT_MODEL), cache=cache, metadata={"role": role}, **kwargs)
+
@@ -0,0 +1,339 @@
+"""
+Isolated Python execution for the agent's `python_repl` tool.
+
+Code runs in a small pool of pre-started worker processes instead of the
+CLI's own process. Each session (e.g. one agent) keeps its namespace in the
+worker it is pinned to, so variables and imports persist between calls the
+way they do in a REPL. Every call is limited in CPU time, wall-clock time and
+memory; a worker that hangs or dies is killed and replaced by a warm spare,
+taking only its own sessions' state with it.
+
+This file is also the worker's entry point (`python python_workers.py <fds>`),
+so it only imports the standard library at module level.
+"""
+import ast
+import io
+import os
+import signal
+import subprocess
+import sys
+import threading
+import traceback
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional
+
+# Seconds the parent waits past a call's wall-clock limit before killing the worker
+KILL_GRACE_SECONDS = 2
+
+
+@dataclass
+class PythonResult:
+    output: str  # captured stdout/stderr, truncated
+    error: Optional[str] = None  # traceback or limit message, if the code failed
+    session_reset: bool = False  # the session's namespace was lost (its worker was killed or crashed)
+
+    def format(self) -> str:
+        parts = [self.output.rstrip("\n")]
+        if self.error:
+            parts.append(self.error.rstrip("\n"))
+        if self.session_reset:
+            parts.append("(The Python session was restarted: variables and imports from earlier calls are gone.)")
+        return "\n".join(part for part in parts if part) or "(no output)"
+
+
+# --- Worker process side ---
+
+class _LimitExceeded(BaseException):
+    """Raised inside user code when a limit is hit; a BaseException so `except Exception` can't swallow it."""
+
+
+class _CappedWriter(io.TextIOBase):
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.chars = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.max_chars - self.chars
+        if room > 0:
+            self.parts.append(text[:room])
+            self.chars += min(len(text), room)
+        self.dropped += max(len(text) - max(room, 0), 0)
+        return len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            text += f"\n... [{self.dropped} more characters of output truncated]"
+        return text
+
+
+def _raise_limit(message: str):
+    def handler(signum, frame):
+        raise _LimitExceeded(message)
+    return handler
+
+
+def _execute(code: str, namespace: dict, cpu_seconds: float, wall_seconds: float, max_output_chars: int) -> dict:
+    import resource
+    writer = _CappedWriter(max_output_chars)
+    error = None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    cpu_soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = writer
+    try:
+        signal.signal(signal.SIGINT, _raise_limit("interrupted"))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_soft if cpu_hard == resource.RLIM_INFINITY else min(cpu_soft, cpu_hard), cpu_hard))
+        signal.setitimer(signal.ITIMER_REAL, wall_seconds)
+        tree = ast.parse(code, mode="exec")
+        # Like a REPL, echo the value of a trailing expression
+        last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+        exec(compile(tree, "<agent>", "exec"), namespace)
+        if last is not None:
+            value = eval(compile(ast.Expression(last.value), "<agent>", "eval"), namespace)
+            if value is not None:
+                print(repr(value))
+    except _LimitExceeded as e:
+        error = f"Execution stopped: {e}."
+    except MemoryError:
+        error = "Execution stopped: memory limit exceeded (MemoryError)."
+    except BaseException as e:
+        # Report the agent's frames only, not this module's
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != "<agent>":
+            tb = tb.tb_next
+        error = "".join(traceback.format_exception(type(e), e, tb or e.__traceback__))
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+    return {"output": writer.getvalue(), "error": error}
+
+
+def _worker_main(read_fd: int, write_fd: int, root: str, memory_bytes: int):
+    import resource
+    os.chdir(root)
+    # Imports resolve against the workspace, not this file's directory
+    sys.path[0] = root
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    signal.signal(signal.SIGXCPU, _raise_limit("CPU time limit exceeded"))
+    signal.signal(signal.SIGALRM, _raise_limit("wall-clock time limit exceeded"))
+    # SIGINT interrupts running code (see PythonWorkerPool.interrupt) and is ignored in between
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    requests, replies = Connection(read_fd, writable=False), Connection(write_fd, readable=False)
+    namespaces: Dict[str, dict] = {}
+    replies.send({"ready": True})
+    while True:
+        try:
+            message = requests.recv()
+        except (EOFError, OSError):
+            return
+        if message["op"] == "exec":
+            namespace = namespaces.setdefault(message["session"], {"__name__": "__main__", "__builtins__": __builtins__})
+            reply = _execute(message["code"], namespace, message["cpu_seconds"], message["wall_seconds"],
+                             message["max_output_chars"])
+        elif message["op"] == "drop":
+            namespaces.pop(message["session"], None)
+            reply = {}
+        else:
+            return
+        replies.send(reply)
+
+
+# --- Parent side ---
+
+class _Worker:
+    def __init__(self, root: str, memory_bytes: int):
+        to_child_r, to_child_w = os.pipe()
+        from_child_r, from_child_w = os.pipe()
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(to_child_r), str(from_child_w), root, str(memory_bytes)],
+            pass_fds=(to_child_r, from_child_w), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, start_new_session=True,
+        )
+        os.close(to_child_r)
+        os.close(from_child_w)
+        self.requests = Connection(to_child_w, readable=False)
+        self.replies = Connection(from_child_r, writable=False)
+        self.sessions = set()
+        self.tasks = 0
+        self.lock = threading.Lock()
+        self.crashed = False
+        self._ready = False
+
+    def wait_ready(self, timeout: float = 30) -> bool:
+        if not self._ready and self.replies.poll(timeout):
+            self._ready = bool(self.replies.recv().get("ready"))
+        return self._ready
+
+    def call(self, message: dict, timeout: float) -> Optional[dict]:
+        """Sends one request; returns the reply, or None if the worker died or didn't answer in time."""
+        try:
+            if not self.wait_ready():
+                return None
+            self.requests.send(message)
+            if self.replies.poll(timeout):
+                return self.replies.recv()
+        except (EOFError, OSError):
+            self.crashed = True
+        return None
+
+    def kill(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.proc.wait()
+        self.requests.close()
+        self.replies.close()
+
+
+class PythonWorkerPool:
+    """
+    `size` pre-started Python worker processes plus one warm spare. A session
+    is pinned to the least loaded worker on its first call. A worker that
+    exceeds a call's wall-clock limit (plus a grace period) or crashes is
+    killed and replaced by the spare, and a new spare is started in the
+    background. Workers without sessions are also recycled after
+    `max_tasks_per_worker` calls.
+    """
+    def __init__(self, root: str, size: int = 2, cpu_seconds: float = 30, wall_seconds: float = 60,
+                 memory_mb: int = 1024, max_output_chars: int = 10_000, max_tasks_per_worker: int = 200):
+        self.root = os.path.abspath(root)
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.max_output_chars = max_output_chars
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._workers: List[_Worker] = [self._new_worker() for _ in range(size)]
+        self._spare: Optional[_Worker] = self._new_worker()
+        self._assigned: Dict[str, _Worker] = {}
+
+    def _new_worker(self) -> _Worker:
+        return _Worker(self.root, self.memory_bytes)
+
+    def _take_spare(self) -> _Worker:
+        # Called with the pool lock held
+        worker, self._spare = self._spare or self._new_worker(), None
+
+        def refill():
+            spare = self._new_worker()
+            spare.wait_ready()
+            with self._lock:
+                if self._spare is None:
+                    self._spare = spare
+                    return
+            spare.kill()
+        threading.Thread(target=refill, daemon=True).start()
+        return worker
+
+    def _replace(self, worker: _Worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers[self._workers.index(worker)] = self._take_spare()
+            for session in worker.sessions:
+                self._assigned.pop(session, None)
+        worker.kill()
+
+    def _worker_for(self, session: str):
+        """Returns (worker, whether the session was already pinned to it)."""
+        with self._lock:
+            worker = self._assigned.get(session)
+            if worker is not None:
+                return worker, True
+            worker = min(self._workers, key=lambda w: (len(w.sessions), w.tasks))
+            worker.sessions.add(session)
+            self._assigned[session] = worker
+            return worker, False
+
+    def execute(self, session: str, code: str, timeout: Optional[float] = None) -> PythonResult:
+        wall_seconds = min(timeout or self.wall_seconds, self.wall_seconds)
+        worker, _ = self._worker_for(session)
+        with worker.lock:
+            reply = worker.call({
+                "op": "exec", "session": session, "code": code, "cpu_seconds": self.cpu_seconds,
+                "wall_seconds": wall_seconds, "max_output_chars": self.max_output_chars,
+            }, wall_seconds + KILL_GRACE_SECONDS)
+            worker.tasks += 1
+        if reply is None:
+            crashed = worker.crashed or worker.proc.poll() is not None
+            self._replace(worker)
+            reason = "the Python worker crashed (e.g. it ran out of memory)" if crashed else \
+                f"the wall-clock time limit of {wall_seconds:.0f}s was exceeded"
+            return PythonResult("", f"Execution stopped: {reason}.", session_reset=True)
+        self._maybe_recycle(worker)
+        return PythonResult(reply["output"], reply["error"])
+
+    def _maybe_recycle(self, worker: _Worker):
+        with self._lock:
+            if worker.sessions or worker.tasks < self.max_tasks_per_worker or worker not in self._workers:
+                return
+        self._replace(worker)
+
+    def interrupt(self, session: str):
+        """Stops the code a session is running, if any. Its namespace is kept."""
+        with self._lock:
+            worker = self._assigned.get(session)
+        if worker is not None and worker.lock.locked():
+            try:
+                os.kill(worker.proc.pid, signal.SIGINT)
+            except OSError:
+                pass
+
+    def reset(self, session: str):
+        """Forgets a session's namespace; its next call starts fresh (and may land on another worker)."""
+        with self._lock:
+            worker = self._assigned.pop(session, None)
+            if worker is not None:
+                worker.sessions.discard(session)
+        if worker is not None:
+            with worker.lock:
+                worker.call({"op": "drop", "session": session}, KILL_GRACE_SECONDS)
+            self._maybe_recycle(worker)
+
+    def close(self):
+        with self._lock:
+            workers = self._workers + ([self._spare] if self._spare else [])
+            self._workers, self._spare = [], None
+            self._assigned.clear()
+        for worker in workers:
+            worker.kill()
+
+
+_shared_pool: Optional[PythonWorkerPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_python_pool() -> PythonWorkerPool:
+    """The process-wide Python worker pool used by the `python_repl` tool."""
+    global _shared_pool
+    import atexit
+    import config
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = PythonWorkerPool(
+                config.WORKING_DIR,
+                size=config.PYTHON_WORKERS,
+                cpu_seconds=config.PYTHON_CPU_SECONDS,
+                wall_seconds=config.PYTHON_WALL_SECONDS,
+                memory_mb=config.PYTHON_MEMORY_MB,
+                max_output_chars=config.PYTHON_MAX_OUTPUT_CHARS,
+                max_tasks_per_worker=config.PYTHON_MAX_TASKS_PER_WORKER,
+            )
+            atexit.register(_shared_pool.close)
+        return _shared_pool
+
+
+if __name__ == "__main__":
+    _worker_main(int(sys.argv[1]), int(sys.argv[2]), sys.argv[3], int(sys.argv[4]))
@@ -0,0 +1,61 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+def normalize_query(query: str, keep_case: bool = False) -> str:
+    """
+    Collapses trivial differences (whitespace, trailing punctuation and, unless
+    `keep_case`, case) between questions. Keep the case wherever it changes the
+    answer, e.g. for retrieval, where symbol lookups are case-sensitive.
+    """
+    query = re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip()
+    return query if keep_case else query.lower()
+
+
+class LRUCache:
+    """A small thread-safe LRU cache with hit/miss counters."""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,167 @@
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from services.query_cache import LRUCache, normalize_query
+
+SINGLE_AGENT = "single_agent"
+AI_TEAM = "ai_team"
+
+# The labeled examples of the router prompt; they also train the local nearest-neighbor classifier
+ROUTER_EXAMPLES: List[Tuple[str, str]] = [
+    ("What is the capital of France?", SINGLE_AGENT),
+    ("List the files in the current directory.", SINGLE_AGENT),
+    ("Write 'hello world' to a file named 'hello.py'.", SINGLE_AGENT),
+    ("What does the function `calculate_total` in `utils.py` do?", SINGLE_AGENT),
+    ("What is the latest version of Flask?", SINGLE_AGENT),
+    ("Write the cpp code to calculate the factorial of a number", SINGLE_AGENT),
+    ("Write the simple node.j code to create simple web server", SINGLE_AGENT),
+    ("Write the python code to create and reverse the linked list", SINGLE_AGENT),
+    ("Write the algorithm to find the shortest path in a graph", SINGLE_AGENT),
+    ("Build a simple blog application using Flask.", AI_TEAM),
+    ("Create a new FastAPI endpoint for user authentication, and then write a pytest file to test it.", AI_TEAM),
+    ("Refactor the entire 'database.py' module to use a connection pool and then verify the changes.", AI_TEAM),
+    ("Develop a web scraper to get data from a website and save it to a CSV file.", AI_TEAM),
+    ("Create a Dockerfile for the current project and write a test to ensure it builds correctly", AI_TEAM),
+    ("Analyse this code and draw the graph showing how it flows", AI_TEAM),
+    ("Analyse the following algorithms and give their time complexity and space complexity", AI_TEAM),
+]
+
+# Surface cues of each category, with weights (positive: ai_team, negative: single_agent)
+HEURISTIC_CUES: List[Tuple[str, float]] = [
+    (r"\b(build|develop|implement|scaffold)\b.*\b(app|application|service|api|website|project|system|scraper|bot|tool|cli|library|package)\b", 1.5),
+    (r"\brefactor\b", 1.2),
+    (r"\b(and then|then (write|add|run|verify|test))\b", 1.2),
+    (r"\b(write|add|create)\b.*\b(tests?|pytest|unit tests?|test suite)\b", 1.0),
+    (r"\b(with|including|plus) (unit |integration )?(tests|docs|documentation)\b", 1.0),
+    (r"\b(verify|make sure|ensure)\b.*\b(works|passes|builds|changes)\b", 0.8),
+    (r"\b(dockerfile|docker-compose|ci pipeline|github actions)\b", 0.8),
+    (r"\b(endpoints?|authentication|database|migrations?|crud)\b", 0.6),
+    (r"\b(entire|whole|multiple files|across the (codebase|project)|modules)\b", 0.8),
+    (r"\banaly[sz]e\b", 0.8),
+    (r"\b(complexity|draw|diagram|flows?)\b", 0.5),
+    (r"^(what|who|when|where|which|how (do|does|can|much|many)|is|are|does|do|can)\b", -1.2),
+    (r"^(list|show|print|read|open|cat|ls|run|explain|tell|define)\b", -1.0),
+    (r"\b(write|give me)\b.*\b(code|function|snippet|script|algorithm|program)\b", -0.8),
+    (r"\b(latest version|capital of|meaning of|difference between)\b", -1.0),
+    (r"\b(a|one|single|simple|small|quick) (file|function|script|snippet|command)\b", -0.6),
+]
+# Very short requests are almost always one-off tasks, very long ones usually projects
+SHORT_REQUEST_WORDS = 6
+LONG_REQUEST_WORDS = 40
+
+
+@dataclass
+class RouteDecision:
+    route: str  # SINGLE_AGENT or AI_TEAM
+    source: str  # "local", "llm" or "cache"
+    confidence: float  # |score| of the local classifier
+    latency_ms: float
+
+
+def _features(text: str) -> Counter:
+    words = re.findall(r"[a-z0-9_]+", text.lower())
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return features
+
+
+class NearestNeighborClassifier:
+    """TF-IDF weighted word/bigram vectors with cosine k-nearest-neighbor voting."""
+    def __init__(self, examples: List[Tuple[str, str]], k: int = 3):
+        self.k = k
+        doc_freq = Counter()
+        featurized = [(_features(text), label) for text, label in examples]
+        for features, _ in featurized:
+            doc_freq.update(features.keys())
+        self.idf = {term: math.log((1 + len(examples)) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self.examples = [(self._vectorize(features), label) for features, label in featurized]
+
+    def _vectorize(self, features: Counter) -> Dict[str, float]:
+        # Terms never seen in the examples carry no evidence either way
+        vector = {term: count * self.idf[term] for term, count in features.items() if term in self.idf}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {term: v / norm for term, v in vector.items()}
+
+    def score(self, text: str) -> float:
+        """Similarity-weighted vote of the k nearest examples, in [-1, 1] (positive: ai_team)."""
+        vector = self._vectorize(_features(text))
+        if not vector:
+            return 0.0
+        sims = []
+        for example, label in self.examples:
+            sim = sum(weight * example.get(term, 0.0) for term, weight in vector.items())
+            sims.append((sim, 1.0 if label == AI_TEAM else -1.0))
+        sims.sort(reverse=True)
+        top = sims[:self.k]
+        total = sum(sim for sim, _ in top)
+        if total <= 0:
+            return 0.0
+        return sum(sim * sign for sim, sign in top) / total * min(1.0, top[0][0] * 2)
+
+
+class RequestRouter:
+    """
+    Decides whether a request goes to the single agent or the AI team without
+    an LLM round trip when it can: regex cues and a nearest-neighbor vote over
+    the labeled router examples are combined into one score, and only requests
+    scoring below `confidence_threshold` are sent to the LLM `fallback` chain.
+    Decisions are cached per normalized request.
+    """
+    def __init__(self, fallback: Optional[Callable[[], object]] = None, confidence_threshold: float = 1.0,
+                 cache_size: int = 512, examples: Optional[List[Tuple[str, str]]] = None):
+        # `fallback` builds the LLM router chain; it is only created for the first ambiguous request
+        self._fallback_factory = fallback
+        self._fallback_chain = None
+        self.confidence_threshold = confidence_threshold
+        self.classifier = NearestNeighborClassifier(examples or ROUTER_EXAMPLES)
+        self.cues = [(re.compile(pattern), weight) for pattern, weight in HEURISTIC_CUES]
+        self._cache = LRUCache(cache_size)
+        self.counts = Counter()
+
+    def score(self, text: str) -> float:
+        """Combined local score: positive means ai_team, negative single_agent; magnitude is confidence."""
+        normalized = text.strip().lower()
+        score = sum(weight for pattern, weight in self.cues if pattern.search(normalized))
+        words = len(normalized.split())
+        if words <= SHORT_REQUEST_WORDS:
+            score -= 0.5
+        elif words >= LONG_REQUEST_WORDS:
+            score += 0.5
+        return score + 1.5 * self.classifier.score(text)
+
+    def classify_locally(self, text: str) -> Tuple[Optional[str], float]:
+        """Returns (route, confidence); route is None when the request is too ambiguous to call locally."""
+        score = self.score(text)
+        route = AI_TEAM if score > 0 else SINGLE_AGENT
+        return (route if abs(score) >= self.confidence_threshold else None), abs(score)
+
+    def _ask_llm(self, text: str) -> str:
+        if self._fallback_chain is None:
+            self._fallback_chain = self._fallback_factory()
+        answer = self._fallback_chain.invoke({"input": text})
+        return AI_TEAM if AI_TEAM in answer.lower() else SINGLE_AGENT
+
+    def route(self, text: str) -> RouteDecision:
+        start = time.perf_counter()
+        key = normalize_query(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.counts["cache"] += 1
+            return RouteDecision(cached.route, "cache", cached.confidence, (time.perf_counter() - start) * 1000)
+
+        score = self.score(text)
+        route, source = (AI_TEAM if score > 0 else SINGLE_AGENT), "local"
+        # Without an LLM fallback the local best guess is used even when it is ambiguous
+        if abs(score) < self.confidence_threshold and self._fallback_factory is not None:
+            route, source = self._ask_llm(text), "llm"
+        confidence = abs(score)
+        decision = RouteDecision(route, source, confidence, (time.perf_counter() - start) * 1000)
+        self._cache.put(key, decision)
+        self.counts[source] += 1
+        return decision
+
+    def stats(self) -> dict:
+        return dict(self.counts)
@@ -0,0 +1,260 @@
+import math
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# "flat" is the plain langchain FAISS store; the others are handled by ShardedVectorStore
+STORAGE_MODES = ("flat", "fp16", "sq8", "ivf_sq8", "ivfpq")
+# Shards smaller than this are scanned exhaustively (SQ8 codes): IVF/PQ training needs
+# roughly 39 points per centroid, and scanning a few thousand compressed vectors is cheap anyway
+IVF_MIN_TRAIN = 10_000
+# A shard is re-trained on its current vectors once it has grown this much since training
+RETRAIN_GROWTH = 4
+ROOT_SHARD = "."
+
+
+def shard_for(source: str) -> str:
+    """Workspace files are sharded by their top-level directory; files in the root share one shard."""
+    head, sep, _ = source.replace(os.sep, "/").partition("/")
+    return head if sep else ROOT_SHARD
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # 4 dimensions per 4-bit code (1536-d -> 192 bytes, 32x smaller than float32); 4-bit
+    # "fast scan" PQ trains in seconds and keeps noticeably better recall than 8-bit codes
+    # over 16 dimensions at a similar size
+    m = max(1, dim // 4)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _factory_string(mode: str, dim: int, n: int) -> str:
+    if mode == "fp16":
+        return "SQfp16"
+    if mode == "sq8" or n < IVF_MIN_TRAIN:
+        return "SQ8"
+    nlist = max(1, min(int(math.sqrt(n)), n // 39))
+    if mode == "ivf_sq8":
+        return f"IVF{nlist},SQ8"
+    return f"IVF{nlist},PQ{_pq_subquantizers(dim)}x4fs"
+
+
+def build_index(mode: str, vectors: np.ndarray) -> faiss.Index:
+    """Creates (and trains on `vectors`) an empty compressed index for `mode`, with external ids."""
+    index = faiss.index_factory(vectors.shape[1], _factory_string(mode, vectors.shape[1], len(vectors)))
+    if not index.is_trained:
+        index.train(vectors)
+    return faiss.IndexIDMap2(index)
+
+
+@dataclass
+class _Shard:
+    index: faiss.Index
+    chunk_ids: Dict[int, str] = field(default_factory=dict)  # faiss id -> chunk id
+    trained_on: int = 0  # vectors the quantizer was trained on (0: needs no training)
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    A FAISS-backed vector store for large workspaces: vectors are stored
+    compressed (float16, int8 scalar quantization, or IVF with SQ8/PQ codes)
+    in one index per top-level directory, so memory shrinks 2-32x and IVF
+    shards only scan `nprobe` lists per query. Queries search every shard and
+    merge the results by distance.
+
+    Like the flat store it can be cloned cheaply for copy-on-write updates:
+    a clone shares the shard indexes and only copies a shard when it first
+    modifies it, so an update touching one directory copies one shard.
+    """
+    def __init__(self, embedding: Embeddings, mode: str = "sq8", nprobe: int = 32):
+        if mode not in STORAGE_MODES or mode == "flat":
+            raise ValueError(f"Unsupported storage mode for a sharded store: {mode}")
+        self.embedding = embedding
+        self.mode = mode
+        self.nprobe = nprobe
+        self.docstore = InMemoryDocstore({})
+        self._shards: Dict[str, _Shard] = {}
+        self._owned: set = set()  # shards this instance may mutate in place
+        self._locations: Dict[str, Tuple[str, int]] = {}  # chunk id -> (shard, faiss id)
+        self._next_id = 0
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def shard_sizes(self) -> Dict[str, int]:
+        return {name: shard.index.ntotal for name, shard in self._shards.items()}
+
+    def sq8_fallback_shards(self) -> List[str]:
+        """Shards of an IVF mode that are stored as plain SQ8, having fewer than IVF_MIN_TRAIN vectors."""
+        if not self.mode.startswith("ivf"):
+            return []
+        return [name for name, shard in self._shards.items() if faiss.try_extract_index_ivf(shard.index) is None]
+
+    def memory_bytes(self) -> int:
+        """Serialized size of all shard indexes (vectors, codes, ids and quantizers; not the docstore)."""
+        return sum(faiss.serialize_index(shard.index).nbytes for shard in self._shards.values())
+
+    # --- Copy-on-write ---
+    def clone(self) -> "ShardedVectorStore":
+        clone = ShardedVectorStore(self.embedding, self.mode, self.nprobe)
+        clone.docstore = InMemoryDocstore(dict(self.docstore._dict))
+        clone._shards = {name: _Shard(shard.index, dict(shard.chunk_ids), shard.trained_on)
+                         for name, shard in self._shards.items()}
+        clone._locations = dict(self._locations)
+        clone._next_id = self._next_id
+        return clone
+
+    def _writable(self, name: str) -> _Shard:
+        shard = self._shards[name]
+        if name not in self._owned:
+            shard.index = faiss.clone_index(shard.index)
+            self._owned.add(name)
+        return shard
+
+    # --- Writes ---
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, text_embeddings: List[Tuple[str, List[float]]], metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        metadatas = metadatas or [{} for _ in text_embeddings]
+        ids = ids or [f"chunk-{self._next_id + i}" for i in range(len(text_embeddings))]
+        self.delete([chunk_id for chunk_id in ids if chunk_id in self._locations])
+
+        by_shard: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            by_shard.setdefault(shard_for(metadata.get("source", "")), []).append(i)
+
+        for name, positions in by_shard.items():
+            vectors = np.array([text_embeddings[i][1] for i in positions], dtype="float32")
+            if name not in self._shards:
+                self._shards[name] = _Shard(build_index(self.mode, vectors))
+                self._owned.add(name)
+                if self.mode != "fp16":
+                    self._shards[name].trained_on = len(vectors)
+            shard = self._writable(name)
+            faiss_ids = np.arange(self._next_id, self._next_id + len(positions), dtype="int64")
+            self._next_id += len(positions)
+            shard.index.add_with_ids(vectors, faiss_ids)
+            for i, faiss_id in zip(positions, faiss_ids.tolist()):
+                chunk_id = ids[i]
+                shard.chunk_ids[faiss_id] = chunk_id
+                self._locations[chunk_id] = (name, faiss_id)
+                self.docstore._dict[chunk_id] = Document(page_content=text_embeddings[i][0], metadata=metadatas[i])
+            if shard.trained_on and shard.index.ntotal >= RETRAIN_GROWTH * shard.trained_on:
+                self._retrain(name)
+        return ids
+
+    def _retrain(self, name: str):
+        """
+        Rebuilds a shard whose quantizer was trained on a much smaller sample
+        (or which has now grown large enough for IVF). Compressed codes can't be
+        decoded losslessly, so the shard's texts are embedded again; with the
+        persistent embedding cache that is a local lookup, not an API call.
+        """
+        shard = self._shards[name]
+        faiss_ids = list(shard.chunk_ids)
+        texts = [self.docstore._dict[shard.chunk_ids[i]].page_content for i in faiss_ids]
+        vectors = np.array(self.embedding.embed_documents(texts), dtype="float32")
+        index = build_index(self.mode, vectors)
+        index.add_with_ids(vectors, np.array(faiss_ids, dtype="int64"))
+        self._shards[name] = _Shard(index, shard.chunk_ids, len(vectors))
+        self._owned.add(name)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Deletes the given chunk ids; ids that are not in the store are ignored."""
+        by_shard: Dict[str, List[int]] = {}
+        for chunk_id in ids or []:
+            location = self._locations.pop(chunk_id, None)
+            if location is None:
+                continue
+            by_shard.setdefault(location[0], []).append(location[1])
+            self.docstore._dict.pop(chunk_id, None)
+        for name, faiss_ids in by_shard.items():
+            shard = self._writable(name)
+            shard.index.remove_ids(np.array(faiss_ids, dtype="int64"))
+            for faiss_id in faiss_ids:
+                shard.chunk_ids.pop(faiss_id, None)
+            if not shard.chunk_ids:
+                del self._shards[name]
+                self._owned.discard(name)
+        return True
+
+    # --- Search ---
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        query = np.array([embedding], dtype="float32")
+        hits = []
+        for shard in list(self._shards.values()):
+            index = shard.index
+            if index.ntotal == 0:
+                continue
+            ivf = faiss.try_extract_index_ivf(index)
+            if ivf is not None:
+                ivf.nprobe = self.nprobe
+            distances, faiss_ids = index.search(query, min(k, index.ntotal))
+            for distance, faiss_id in zip(distances[0].tolist(), faiss_ids[0].tolist()):
+                chunk_id = shard.chunk_ids.get(faiss_id)
+                if chunk_id is not None:
+                    hits.append((distance, chunk_id))
+        hits.sort(key=lambda hit: hit[0])
+        return [(self.docstore._dict[chunk_id], distance) for distance, chunk_id in hits[:k]]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, mode: str = "sq8", nprobe: int = 32,
+                   **kwargs: Any) -> "ShardedVectorStore":
+        store = cls(embedding, mode=mode, nprobe=nprobe)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    # --- Persistence ---
+    def save_local(self, folder_path: str):
+        os.makedirs(folder_path, exist_ok=True)
+        shards = {}
+        for i, (name, shard) in enumerate(sorted(self._shards.items())):
+            file_name = f"shard_{i}.faiss"
+            faiss.write_index(shard.index, os.path.join(folder_path, file_name))
+            shards[name] = (file_name, shard.chunk_ids, shard.trained_on)
+        with open(os.path.join(folder_path, "store.pkl"), "wb") as f:
+            pickle.dump({"mode": self.mode, "next_id": self._next_id, "shards": shards,
+                         "docstore": self.docstore._dict}, f)
+
+    @classmethod
+    def load_local(cls, folder_path: str, embeddings: Embeddings, mode: str, nprobe: int = 32) -> "ShardedVectorStore":
+        """Loads a store written by `save_local`. Only load folders this application wrote (the docstore is pickled)."""
+        with open(os.path.join(folder_path, "store.pkl"), "rb") as f:
+            data = pickle.load(f)
+        if data["mode"] != mode:
+            raise ValueError(f"Saved store uses storage mode {data['mode']}, expected {mode}")
+        store = cls(embeddings, mode=mode, nprobe=nprobe)
+        store.docstore = InMemoryDocstore(data["docstore"])
+        store._next_id = data["next_id"]
+        for name, (file_name, chunk_ids, trained_on) in data["shards"].items():
+            index = faiss.read_index(os.path.join(folder_path, file_name))
+            store._shards[name] = _Shard(index, chunk_ids, trained_on)
+            store._owned.add(name)
+            for faiss_id, chunk_id in chunk_ids.items():
+                store._locations[chunk_id] = (name, faiss_id)
+        return store
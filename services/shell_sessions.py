@@ -0,0 +1,266 @@
+import atexit
+import os
+import queue
+import re
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+import config
+
+
+@dataclass
+class ShellResult:
+    output: str
+    exit_code: Optional[int]  # None if the command timed out
+    cwd: str
+    timed_out: bool = False
+    spill_path: Optional[str] = None  # where the full output went, if it exceeded the cap
+    notes: str = ""  # session restarts, cwd resets
+
+    def format(self) -> str:
+        if self.exit_code is None:
+            status = "timed out" if self.timed_out else "shell exited"
+        else:
+            status = f"exit code {self.exit_code}"
+        lines = [self.output.rstrip("\n"), f"[{status}; cwd {self.cwd}]"]
+        if self.notes:
+            lines.append(self.notes)
+        return "\n".join(line for line in lines if line)
+
+
+class _CappedOutput:
+    """Collects a command's output, keeping its head and tail and spilling the whole of it to a file past `max_chars`."""
+    def __init__(self, max_chars: int, spill_path: str):
+        self.half = max_chars // 2
+        self.spill_path = spill_path
+        self.head, self.tail = [], []
+        self.head_chars = self.tail_chars = self.total_chars = 0
+        self._spill = None
+
+    def add(self, text: str):
+        self.total_chars += len(text)
+        if self._spill is None and self.head_chars + len(text) <= self.half * 2:
+            self.head.append(text)
+            self.head_chars += len(text)
+            return
+        if self._spill is None:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            self._spill = open(self.spill_path, "w", encoding="utf-8")
+            self._spill.write("".join(self.head))
+            # From here on the head is capped at half the limit; the rest becomes tail
+            head_text = "".join(self.head)
+            self.head, self.head_chars = [head_text[:self.half]], min(len(head_text), self.half)
+            self.tail, self.tail_chars = [head_text[self.half:]], len(head_text) - self.head_chars
+        self._spill.write(text)
+        self.tail.append(text)
+        self.tail_chars += len(text)
+        while len(self.tail) > 1 and self.tail_chars - len(self.tail[0]) >= self.half:
+            self.tail_chars -= len(self.tail.pop(0))
+
+    def result(self):
+        """Returns (text, spill path or None)."""
+        if self._spill is None:
+            return "".join(self.head), None
+        self._spill.close()
+        tail = "".join(self.tail)[-self.half:]
+        omitted = self.total_chars - self.head_chars - len(tail)
+        return (f"{''.join(self.head)}\n... [{omitted} characters omitted; full output in {self.spill_path}] ...\n{tail}",
+                self.spill_path)
+
+
+class ShellSession:
+    """
+    One long-lived bash process. Environment variables, activated virtualenvs
+    and the working directory persist from one command to the next. Commands
+    run one at a time with stdin closed; each is followed by a unique marker
+    line carrying its exit code and the shell's working directory.
+    """
+    def __init__(self, key: str, root: str):
+        self.key = key
+        self.root = root
+        self.cwd = root
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._cancelled = False
+        self._start()
+
+    def _start(self):
+        env = {**os.environ, "PAGER": "cat", "GIT_PAGER": "cat", "TERM": "dumb", "PS1": ""}
+        self.proc = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"], cwd=self.cwd if os.path.isdir(self.cwd) else self.root, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            start_new_session=True,  # its own process group, so a timed-out command can be killed with its children
+        )
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._pump, args=(self.proc, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _pump(proc: subprocess.Popen, lines: queue.Queue):
+        for raw in iter(proc.stdout.readline, b""):
+            lines.put(raw.decode("utf-8", errors="replace"))
+        lines.put(None)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def close(self):
+        if self.alive():
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.proc.wait()
+
+    def cancel(self):
+        """Kills the running command along with the shell; the session restarts for its next command."""
+        self._cancelled = True
+        self.close()
+
+    def _restart(self) -> str:
+        self.close()
+        self._start()
+        return "The shell session was restarted: environment variables and activated environments were reset."
+
+    def run(self, command: str, timeout: float, max_output_chars: int, spill_dir: str) -> ShellResult:
+        notes = []
+        self._cancelled = False
+        if not self.alive():
+            notes.append(self._restart())
+        marker = f"__AGENT_SHELL_DONE_{uuid.uuid4().hex}__"
+        marker_re = re.compile(rf"{marker} (-?\d+) (.*)$")
+        script = f"{{ {command}\n}} < /dev/null 2>&1\nprintf '\\n%s %s %s\\n' '{marker}' \"$?\" \"$PWD\"\n"
+        safe_key = re.sub(r"[^\w.-]", "_", self.key)
+        spill_path = os.path.join(spill_dir, f"{safe_key}-{int(time.time() * 1000)}.log")
+        output = _CappedOutput(max_output_chars, spill_path)
+        self.proc.stdin.write(script.encode("utf-8"))
+        self.proc.stdin.flush()
+        deadline = time.monotonic() + timeout
+        exit_code, pending = None, None
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0)) if remaining > 0 else None
+            except queue.Empty:
+                line = None
+            if line is None:
+                break  # timed out, or the shell exited
+            match = marker_re.search(line)
+            if match:
+                exit_code, self.cwd = int(match.group(1)), match.group(2).strip()
+                break
+            # The marker is printed after a newline; hold each line back so that one isn't shown
+            if pending is not None:
+                output.add(pending)
+            pending = line
+        if pending is not None and not (exit_code is not None and pending == "\n"):
+            output.add(pending)
+        text, spill = output.result()
+        timed_out = exit_code is None and time.monotonic() >= deadline
+        if exit_code is None:
+            if self._cancelled:
+                notes.append("The command was cancelled.")
+            else:
+                notes.append(f"The command timed out after {timeout:.0f}s." if timed_out else "The command ended the shell.")
+            notes.append(self._restart())
+        elif not _inside(self.cwd, self.root):
+            self.run(f"cd {_quote(self.root)}", timeout, max_output_chars, spill_dir)
+            notes.append(f"The working directory left the workspace and was reset to {self.root}.")
+        self.last_used = time.monotonic()
+        return ShellResult(text, exit_code, self.cwd, timed_out, spill, " ".join(notes))
+
+
+def _inside(path: str, root: str) -> bool:
+    path, root = os.path.realpath(path), os.path.realpath(root)
+    return path == root or path.startswith(root + os.sep)
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+class ShellSessionPool:
+    """
+    Long-lived shell sessions keyed by agent or run (e.g. "single_agent",
+    "team:Tester"). Commands in one session run one at a time; different
+    sessions run concurrently. Sessions start in `root` and are moved back to
+    it if a command leaves it (this confines the working directory, it is not
+    a sandbox). The least recently used idle session is closed once there are
+    more than `max_sessions`.
+    """
+    def __init__(self, root: str, timeout: float = 300, max_output_chars: int = 10_000,
+                 spill_dir: Optional[str] = None, max_sessions: int = 16):
+        self.root = os.path.abspath(root)
+        self.timeout = timeout
+        self.max_output_chars = max_output_chars
+        self.spill_dir = spill_dir or os.path.join(self.root, ".shell_logs")
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ShellSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, key: str) -> ShellSession:
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                os.makedirs(self.root, exist_ok=True)
+                session = ShellSession(key, self.root)
+                self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            for old_key in list(self._sessions)[:-1]:
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                old = self._sessions[old_key]
+                if old.lock.acquire(blocking=False):
+                    del self._sessions[old_key]
+                    old.close()
+                    old.lock.release()
+            return session
+
+    def run(self, key: str, command: str, timeout: Optional[float] = None) -> ShellResult:
+        timeout = min(timeout or self.timeout, self.timeout)
+        session = self._session(key)
+        with session.lock:
+            return session.run(command, timeout, self.max_output_chars, self.spill_dir)
+
+    def cancel(self, key: str):
+        """Stops the command running in a session, if there is one."""
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is not None and session.lock.locked():
+            session.cancel()
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def close(self, key: Optional[str] = None):
+        """Closes one session, or all of them."""
+        with self._lock:
+            keys = [key] if key else list(self._sessions)
+            sessions = [self._sessions.pop(k) for k in keys if k in self._sessions]
+        for session in sessions:
+            session.close()
+
+
+_shared_pool: Optional[ShellSessionPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shell_pool() -> ShellSessionPool:
+    """The process-wide shell session pool used by the shell, git and docker tools."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ShellSessionPool(
+                config.WORKING_DIR,
+                timeout=config.SHELL_COMMAND_TIMEOUT_SECONDS,
+                max_output_chars=config.SHELL_MAX_OUTPUT_CHARS,
+                spill_dir=config.SHELL_SPILL_DIR,
+                max_sessions=config.SHELL_MAX_SESSIONS,
+            )
+            atexit.register(_shared_pool.close)
+        return _shared_pool
@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class StartupStage:
+    name: str
+    kind: str  # "import" or "construct"
+    seconds: float
+    modules_loaded: int  # modules added to sys.modules during the stage
+    deferred: bool  # ran after the first prompt (on first use), not before it
+
+
+class StartupProfiler:
+    """
+    Times the stages of CLI startup (imports and constructors) so
+    `--profile-startup` can break time-to-first-prompt down. Stages that run
+    after `first_prompt()` are reported separately as deferred costs.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_prompt_at: Optional[float] = None
+        self.stages: List[StartupStage] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, kind: str = "construct"):
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = StartupStage(name, kind, time.perf_counter() - start, len(sys.modules) - modules_before,
+                                 self.first_prompt_at is not None)
+            with self._lock:
+                self.stages.append(stage)
+
+    def first_prompt(self):
+        if self.first_prompt_at is None:
+            self.first_prompt_at = time.perf_counter()
+
+    @property
+    def time_to_first_prompt(self) -> Optional[float]:
+        return None if self.first_prompt_at is None else self.first_prompt_at - self.started
+
+    def report(self) -> str:
+        lines = []
+        if self.time_to_first_prompt is not None:
+            lines.append(f"Time to first prompt: {self.time_to_first_prompt * 1000:.0f} ms")
+        for deferred, title in ((False, "Before the first prompt"), (True, "Deferred to first use")):
+            stages = sorted((s for s in self.stages if s.deferred == deferred), key=lambda s: -s.seconds)
+            if not stages:
+                continue
+            lines.append(f"{title}:")
+            for s in stages:
+                modules = f", {s.modules_loaded} modules" if s.kind == "import" else ""
+                lines.append(f"  {s.seconds * 1000:8.1f} ms  {s.kind:<9} {s.name}{modules}")
+        return "\n".join(lines)
+
+
+# Started when this module is first imported, i.e. at the top of main.py
+PROFILER = StartupProfiler()
+
+
+class Lazy(Generic[T]):
+    """
+    Builds a value on first `get()` (thread-safe). `warm()` builds it on a
+    background thread instead, so it is usually ready by the time it is first
+    needed. Factories time their own imports and constructors with PROFILER.
+    """
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._value = self._factory()
+                    self._built = True
+        return self._value
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def warm(self):
+        def build():
+            try:
+                self.get()
+            except Exception:
+                pass  # the error surfaces again on first real use
+        threading.Thread(target=build, name=f"warm-{self.name}", daemon=True).start()
@@ -0,0 +1,287 @@
+import ast
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+IDENTIFIER_RE = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]*\b")
+
+# Identifiers that are language keywords or too common to be worth tracking as references
+IGNORED_REFERENCE_NAMES = {
+    "and", "as", "assert", "async", "await", "break", "case", "catch", "class", "const", "continue", "def",
+    "default", "del", "do", "elif", "else", "end", "enum", "except", "export", "extends", "false", "False",
+    "finally", "fn", "for", "from", "func", "function", "go", "if", "impl", "import", "in", "interface",
+    "is", "let", "match", "mod", "module", "mut", "new", "nil", "None", "not", "null", "or", "package",
+    "pass", "private", "protected", "pub", "public", "raise", "require", "return", "self", "static",
+    "struct", "super", "switch", "this", "throw", "trait", "true", "True", "try", "type", "use", "var",
+    "void", "while", "with", "yield", "int", "str", "string", "bool", "float", "char", "long",
+}
+
+
+@dataclass
+class SymbolDef:
+    """One definition of a symbol."""
+    name: str
+    kind: str  # function, class, method, variable, type, macro, ...
+    path: str
+    line: int
+    container: Optional[str] = None  # enclosing class/type for methods
+
+
+@dataclass
+class FileSymbols:
+    """Everything the index extracted from one file."""
+    content_hash: str
+    definitions: List[SymbolDef]
+    references: Dict[str, List[int]]  # name -> line numbers
+    imports: List[Tuple[str, int]]  # (imported module or name, line)
+
+
+# --- Extractors ---
+
+def _extract_python(path: str, text: str) -> Tuple[List[SymbolDef], Dict[str, List[int]], List[Tuple[str, int]]]:
+    tree = ast.parse(text)
+    definitions, references, imports = [], {}, []
+
+    def visit(node, container=None):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if container else "function"
+                definitions.append(SymbolDef(child.name, kind, path, child.lineno, container))
+                visit(child, None)
+            elif isinstance(child, ast.ClassDef):
+                definitions.append(SymbolDef(child.name, "class", path, child.lineno, container))
+                visit(child, child.name)
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)) and isinstance(node, (ast.Module, ast.ClassDef)):
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        definitions.append(SymbolDef(target.id, "variable", path, child.lineno, container))
+                visit(child, container)
+            elif isinstance(child, ast.Import):
+                for alias in child.names:
+                    imports.append((alias.name, child.lineno))
+            elif isinstance(child, ast.ImportFrom):
+                module = "." * child.level + (child.module or "")
+                for alias in child.names:
+                    imports.append((f"{module}.{alias.name}" if module else alias.name, child.lineno))
+                    references.setdefault(alias.name, []).append(child.lineno)
+            else:
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                    references.setdefault(child.id, []).append(child.lineno)
+                elif isinstance(child, ast.Attribute):
+                    references.setdefault(child.attr, []).append(child.lineno)
+                visit(child, container)
+
+    visit(tree)
+    return definitions, references, imports
+
+
+# (regex, kind) pairs per language family; group "name" is the defined symbol
+_C_FAMILY_DEFS = [
+    (r"^\s*(?:typedef\s+)?(?:struct|union|enum|class)\s+(?P<name>[A-Za-z_]\w*)\s*[{:]?", "type"),
+    (r"^\s*#\s*define\s+(?P<name>[A-Za-z_]\w*)", "macro"),
+    (r"^[A-Za-z_][\w\s\*&:<>,]*?[\s\*&](?P<name>[A-Za-z_][\w:]*)\s*\([^;]*$", "function"),
+]
+_JS_DEFS = [
+    (r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[A-Za-z_$][\w$]*)", "function"),
+    (r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>[A-Za-z_$][\w$]*)", "class"),
+    (r"^\s*(?:export\s+)?(?:interface|type|enum)\s+(?P<name>[A-Za-z_$][\w$]*)", "type"),
+    (r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*=", "variable"),
+    (r"^\s+(?:static\s+)?(?:async\s+)?(?P<name>[A-Za-z_$][\w$]*)\s*\([^)]*\)\s*\{", "method"),
+]
+LANGUAGE_DEFINITIONS = {
+    "js": _JS_DEFS,
+    "go": [
+        (r"^\s*func\s+(?:\([^)]*\)\s*)?(?P<name>[A-Za-z_]\w*)", "function"),
+        (r"^\s*type\s+(?P<name>[A-Za-z_]\w*)", "type"),
+        (r"^\s*(?:const|var)\s+(?P<name>[A-Za-z_]\w*)", "variable"),
+    ],
+    "rust": [
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(?P<name>[A-Za-z_]\w*)", "function"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union|type)\s+(?P<name>[A-Za-z_]\w*)", "type"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const|static)\s+(?P<name>[A-Za-z_]\w*)", "variable"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(?P<name>[A-Za-z_]\w*)", "module"),
+    ],
+    "java": [
+        (r"^\s*(?:(?:public|private|protected|static|final|abstract|sealed)\s+)*(?:class|interface|enum|record)\s+(?P<name>[A-Za-z_]\w*)", "class"),
+        (r"^\s*(?:(?:public|private|protected|static|final|abstract|synchronized)\s+)+[\w<>\[\],\s]+?\s(?P<name>[A-Za-z_]\w*)\s*\(", "method"),
+    ],
+    "c": _C_FAMILY_DEFS,
+    "ruby": [
+        (r"^\s*def\s+(?:self\.)?(?P<name>[A-Za-z_]\w*[?!=]?)", "function"),
+        (r"^\s*(?:class|module)\s+(?P<name>[A-Z]\w*)", "class"),
+    ],
+    "shell": [
+        (r"^\s*(?:function\s+)?(?P<name>[A-Za-z_][\w-]*)\s*\(\s*\)", "function"),
+        (r"^\s*function\s+(?P<name>[A-Za-z_][\w-]*)", "function"),
+        (r"^\s*(?:export\s+)?(?P<name>[A-Z_][A-Z0-9_]*)=", "variable"),
+    ],
+    "vb": [
+        (r"^\s*(?:(?:Public|Private|Friend|Protected|Shared|Overrides)\s+)*(?:Sub|Function|Property)\s+(?P<name>[A-Za-z_]\w*)", "function"),
+        (r"^\s*(?:(?:Public|Private|Friend)\s+)*(?:Class|Module|Structure|Interface|Enum)\s+(?P<name>[A-Za-z_]\w*)", "class"),
+    ],
+}
+LANGUAGE_IMPORTS = {
+    "js": r"^\s*import\s+.*?from\s+['\"](?P<name>[^'\"]+)['\"]|require\(\s*['\"](?P<req>[^'\"]+)['\"]\s*\)",
+    "go": r"^\s*(?:import\s+)?(?:\w+\s+)?\"(?P<name>[\w./-]+)\"",
+    "rust": r"^\s*(?:pub\s+)?use\s+(?P<name>[\w:]+)",
+    "java": r"^\s*import\s+(?:static\s+)?(?P<name>[\w.]+)",
+    "c": r"^\s*#\s*include\s+[<\"](?P<name>[^>\"]+)[>\"]",
+    "ruby": r"^\s*require(?:_relative)?\s+['\"](?P<name>[^'\"]+)['\"]",
+    "shell": r"^\s*(?:source|\.)\s+(?P<name>\S+)",
+    "vb": r"^\s*Imports\s+(?P<name>[\w.]+)",
+}
+EXTENSION_LANGUAGES = {
+    ".js": "js", ".jsx": "js", ".ts": "js", ".tsx": "js", ".go": "go", ".rs": "rust", ".java": "java",
+    ".c": "c", ".cc": "c", ".cpp": "c", ".h": "c", ".rb": "ruby", ".sh": "shell", ".bash": "shell",
+    ".zsh": "shell", ".vb": "vb",
+}
+_COMPILED_DEFINITIONS = {
+    lang: [(re.compile(pattern), kind) for pattern, kind in patterns]
+    for lang, patterns in LANGUAGE_DEFINITIONS.items()
+}
+_COMPILED_IMPORTS = {lang: re.compile(pattern) for lang, pattern in LANGUAGE_IMPORTS.items()}
+# Control-flow words the loose C-family/JS method patterns would otherwise pick up
+_NOT_DEFINITIONS = {"if", "for", "while", "switch", "return", "catch", "sizeof", "else", "elif", "do"}
+
+
+def _extract_regex(lang: str, path: str, text: str) -> Tuple[List[SymbolDef], Dict[str, List[int]], List[Tuple[str, int]]]:
+    definitions, references, imports = [], {}, []
+    def_patterns = _COMPILED_DEFINITIONS.get(lang, [])
+    import_pattern = _COMPILED_IMPORTS.get(lang)
+    for lineno, line in enumerate(text.splitlines(), 1):
+        defined_here = set()
+        for pattern, kind in def_patterns:
+            match = pattern.match(line)
+            if match and match.group("name") not in _NOT_DEFINITIONS:
+                name = match.group("name").split("::")[-1]
+                definitions.append(SymbolDef(name, kind, path, lineno))
+                defined_here.add(name)
+                break
+        if import_pattern:
+            match = import_pattern.search(line)
+            if match:
+                imported = next((g for g in match.groups() if g), None)
+                if imported:
+                    imports.append((imported, lineno))
+        for name in IDENTIFIER_RE.findall(line):
+            if name not in defined_here:
+                references.setdefault(name, []).append(lineno)
+    return definitions, references, imports
+
+
+def extract_symbols(path: str, text: str) -> Tuple[List[SymbolDef], Dict[str, List[int]], List[Tuple[str, int]]]:
+    """Extracts (definitions, references, imports) from one file; unknown file types yield nothing."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".py":
+        try:
+            definitions, references, imports = _extract_python(path, text)
+        except (SyntaxError, ValueError, RecursionError):
+            # Half-written files are common while agents work; a regex pass is better than nothing
+            definitions, references, imports = _extract_regex("python", path, text)
+            definitions = [
+                SymbolDef(m.group(2), "class" if m.group(1) == "class" else "function", path, text.count("\n", 0, m.start()) + 1)
+                for m in re.finditer(r"^[ \t]*(?:async[ \t]+)?(def|class)[ \t]+([A-Za-z_]\w*)", text, re.MULTILINE)
+            ]
+    elif ext in EXTENSION_LANGUAGES:
+        definitions, references, imports = _extract_regex(EXTENSION_LANGUAGES[ext], path, text)
+    else:
+        return [], {}, []
+    references = {name: lines for name, lines in references.items() if name not in IGNORED_REFERENCE_NAMES and len(name) > 1}
+    return definitions, references, imports
+
+
+class SymbolIndex:
+    """
+    Definitions, references and imports of every indexed file, with inverted
+    maps so lookups by name take milliseconds. Files are (re)indexed one at a
+    time, so it can be kept up to date incrementally.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files: Dict[str, FileSymbols] = {}
+        self._definitions: Dict[str, List[SymbolDef]] = {}
+        self._references: Dict[str, Dict[str, List[int]]] = {}  # name -> path -> lines
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def content_hash(self, path: str) -> Optional[str]:
+        file_symbols = self._files.get(path)
+        return file_symbols.content_hash if file_symbols else None
+
+    def paths(self) -> List[str]:
+        return list(self._files.keys())
+
+    def update_file(self, path: str, text: str, content_hash: str):
+        definitions, references, imports = extract_symbols(path, text)
+        with self._lock:
+            self._remove(path)
+            self._files[path] = FileSymbols(content_hash, definitions, references, imports)
+            for definition in definitions:
+                self._definitions.setdefault(definition.name, []).append(definition)
+            for name, lines in references.items():
+                self._references.setdefault(name, {})[path] = lines
+
+    def remove_file(self, path: str):
+        with self._lock:
+            self._remove(path)
+
+    def _remove(self, path: str):
+        file_symbols = self._files.pop(path, None)
+        if file_symbols is None:
+            return
+        for definition in file_symbols.definitions:
+            remaining = [d for d in self._definitions.get(definition.name, []) if d.path != path]
+            if remaining:
+                self._definitions[definition.name] = remaining
+            else:
+                self._definitions.pop(definition.name, None)
+        for name in file_symbols.references:
+            by_path = self._references.get(name)
+            if by_path is not None:
+                by_path.pop(path, None)
+                if not by_path:
+                    del self._references[name]
+
+    def find_definition(self, name: str) -> List[SymbolDef]:
+        """All definitions of `name` (a bare name, or `Container.name` for methods)."""
+        container = None
+        if "." in name:
+            container, name = name.rsplit(".", 1)
+            container = container.split(".")[-1]
+        with self._lock:
+            definitions = list(self._definitions.get(name, []))
+        if container:
+            scoped = [d for d in definitions if d.container == container]
+            definitions = scoped or definitions
+        return sorted(definitions, key=lambda d: (d.path, d.line))
+
+    def find_references(self, name: str) -> List[Tuple[str, int]]:
+        """(path, line) of every reference to `name`, excluding the definitions themselves."""
+        name = name.rsplit(".", 1)[-1]
+        with self._lock:
+            by_path = dict(self._references.get(name, {}))
+            defined_at = {(d.path, d.line) for d in self._definitions.get(name, [])}
+        return [
+            (path, line)
+            for path in sorted(by_path)
+            for line in sorted(set(by_path[path]))
+            if (path, line) not in defined_at
+        ]
+
+    def imports_of(self, path: str) -> List[Tuple[str, int]]:
+        file_symbols = self._files.get(path)
+        return list(file_symbols.imports) if file_symbols else []
+
+    def importers_of(self, module: str) -> List[str]:
+        """Paths of files that import `module` (matched on the dotted or path-like name; relative imports without their dots)."""
+        with self._lock:
+            files = list(self._files.items())
+        return sorted(
+            path for path, file_symbols in files
+            if any(imported == module or imported.startswith(module + ".") or imported.endswith("/" + module)
+                   for imported in (name.lstrip(".") for name, _ in file_symbols.imports))
+        )
@@ -0,0 +1,229 @@
+"""
+Latency and token telemetry of the CLI.
+
+Every LLM call, tool call and team graph node is recorded as a span (see
+services/telemetry_callbacks.py, installed by `create_llm`), as are the
+REPL's requests. Spans are appended to a rotating JSONL trace file, counted
+in per-series statistics shown by the REPL's `stats` command, and exported
+in the Prometheus text format on `METRICS_PORT`.
+
+Only the standard library is imported here, so the REPL can use it before
+any LangChain module is loaded.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Deque, Dict, List, Optional, Tuple
+import config
+
+# Prometheus metric and label name of each span kind
+METRIC_NAMES = {
+    "llm": ("agent_llm_call_seconds", "model", "Latency of LLM calls."),
+    "tool": ("agent_tool_call_seconds", "tool", "Run time of tool calls."),
+    "node": ("agent_team_node_seconds", "node", "Duration of team graph nodes."),
+    "request": ("agent_request_seconds", "route", "Duration of REPL requests."),
+}
+
+
+@dataclass
+class Span:
+    kind: str  # "llm", "tool", "node" or "request"
+    name: str  # model, tool, node or route name
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0  # seconds
+    status: str = "ok"  # "ok", "error" or "cancelled"
+    error: Optional[str] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    parent_id: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit: bool = False
+    attributes: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Series:
+    """Totals of one (kind, name) series, plus its most recent durations for quantiles."""
+    def __init__(self, window: int):
+        self.count = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, span: Span):
+        self.count += 1
+        self.seconds += span.duration
+        self.errors += span.status == "error"
+        self.prompt_tokens += span.prompt_tokens
+        self.completion_tokens += span.completion_tokens
+        self.cache_hits += span.cache_hit
+        self.recent.append(span.duration)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """
+    Collects spans. The trace file is written by a background thread (a
+    logging QueueListener), so recording a span never waits on disk.
+    """
+    def __init__(self, trace_path: Optional[str] = None, max_bytes: int = 10_000_000, backup_count: int = 5,
+                 window: int = 1000):
+        self.window = window
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+        self._trace: Optional[logging.Logger] = None
+        self._listener = None
+        self._server = None
+        if trace_path:
+            self._open_trace(trace_path, max_bytes, backup_count)
+
+    def _open_trace(self, path: str, max_bytes: int, backup_count: int):
+        import atexit
+        import queue
+        from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        self._listener = QueueListener(records, file_handler)
+        self._listener.start()
+        atexit.register(self._listener.stop)
+        self._trace = logging.getLogger(f"agent.telemetry.{id(self)}")
+        self._trace.setLevel(logging.INFO)
+        self._trace.propagate = False
+        self._trace.addHandler(QueueHandler(records))
+
+    def record(self, span: Span):
+        with self._lock:
+            series = self._series.get((span.kind, span.name))
+            if series is None:
+                series = self._series[(span.kind, span.name)] = _Series(self.window)
+            series.add(span)
+        if self._trace is not None:
+            self._trace.info(json.dumps(span.to_dict(), default=str))
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes):
+        """Records the enclosed block as a span; the block may set its fields (e.g. `status`) on the yielded Span."""
+        span = Span(kind, name, attributes=attributes)
+        start = time.perf_counter()
+        try:
+            yield span
+        except KeyboardInterrupt:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status, span.error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            self.record(span)
+
+    def stats(self) -> List[dict]:
+        """Per-series counts, p50/p95 latency, errors, tokens and cache hits, by kind and name."""
+        with self._lock:
+            items = sorted(self._series.items())
+            return [{
+                "kind": kind, "name": name, "count": s.count, "p50": s.quantile(0.5), "p95": s.quantile(0.95),
+                "total_seconds": s.seconds, "errors": s.errors, "prompt_tokens": s.prompt_tokens,
+                "completion_tokens": s.completion_tokens, "cache_hits": s.cache_hits,
+            } for (kind, name), s in items]
+
+    def prometheus_text(self) -> str:
+        """All series in the Prometheus text exposition format (latencies as summaries)."""
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+            for kind, (metric, label, help_text) in METRIC_NAMES.items():
+                series = [(name, s) for (k, name), s in items if k == kind]
+                if not series:
+                    continue
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+                for name, s in series:
+                    labels = f'{label}="{_label(name)}"'
+                    for q in (0.5, 0.95):
+                        lines.append(f'{metric}{{{labels},quantile="{q}"}} {s.quantile(q):.6f}')
+                    lines.append(f"{metric}_sum{{{labels}}} {s.seconds:.6f}")
+                    lines.append(f"{metric}_count{{{labels}}} {s.count}")
+            llm = [(name, s) for (k, name), s in items if k == "llm"]
+            for metric, help_text, attr in (
+                ("agent_llm_prompt_tokens_total", "Prompt tokens sent to LLMs.", "prompt_tokens"),
+                ("agent_llm_completion_tokens_total", "Completion tokens received from LLMs.", "completion_tokens"),
+                ("agent_llm_cache_hits_total", "LLM calls answered from the response cache.", "cache_hits"),
+            ):
+                if llm:
+                    lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                    lines += [f'{metric}{{model="{_label(name)}"}} {getattr(s, attr)}' for name, s in llm]
+            if items:
+                lines += ["# HELP agent_errors_total Spans that ended in an error.", "# TYPE agent_errors_total counter"]
+                lines += [f'agent_errors_total{{kind="{kind}",name="{_label(name)}"}} {s.errors}' for (kind, name), s in items]
+        return "\n".join(lines) + "\n"
+
+    def start_metrics_server(self, host: str, port: int) -> Optional[int]:
+        """Serves `prometheus_text()` at http://host:port/metrics on a daemon thread; returns the bound port."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the REPL quiet
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide telemetry, writing its trace to TRACE_PATH."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(config.TRACE_PATH, max_bytes=config.TRACE_MAX_BYTES,
+                                   backup_count=config.TRACE_BACKUP_COUNT, window=config.TELEMETRY_WINDOW)
+        return _telemetry
+
+
+def install_telemetry():
+    """Reports every LangChain/LangGraph run in this process (LLMs, tools, graph nodes) to `get_telemetry()`."""
+    from services.telemetry_callbacks import install
+    install(get_telemetry())
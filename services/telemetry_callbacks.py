@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from services.telemetry import Span, Telemetry
+
+# Runs still open beyond this many (e.g. cancelled before their end callback) are dropped, oldest first
+MAX_OPEN_RUNS = 10_000
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callbacks into telemetry spans: one per LLM call (with
+    its token usage and whether the response cache answered it), per tool
+    call and per LangGraph node. Runs inline, as it only does bookkeeping.
+    """
+    run_inline = True
+
+    def __init__(self, telemetry: Telemetry):
+        self.telemetry = telemetry
+        self._open: "OrderedDict[UUID, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kind: str, name: str, parent_run_id: Optional[UUID], attributes: dict):
+        with self._lock:
+            self._open[run_id] = (kind, name, time.time(), time.perf_counter(), parent_run_id, attributes)
+            while len(self._open) > MAX_OPEN_RUNS:
+                self._open.popitem(last=False)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **fields) -> None:
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        kind, name, started_at, start, parent_run_id, attributes = opened
+        span = Span(kind, name, started_at=started_at, duration=time.perf_counter() - start,
+                    span_id=str(run_id), parent_id=str(parent_run_id) if parent_run_id else None,
+                    attributes=attributes, **fields)
+        if error is not None:
+            cancelled = type(error).__name__ in ("CancelledError", "KeyboardInterrupt")
+            span.status = "cancelled" if cancelled else "error"
+            span.error = f"{type(error).__name__}: {error}"
+        self.telemetry.record(span)
+
+    @staticmethod
+    def _context(metadata: Optional[dict]) -> Dict[str, Any]:
+        metadata = metadata or {}
+        return {key: metadata[key] for key in ("role", "langgraph_node") if key in metadata}
+
+    # --- LLMs ---
+
+    def _llm_start(self, serialized, run_id, parent_run_id, metadata, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = (metadata or {}).get("ls_model_name") or params.get("model_name") or params.get("model") \
+            or (serialized or {}).get("name") or "unknown"
+        self._start(run_id, "llm", model, parent_run_id, self._context(metadata))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._llm_start(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._llm_start(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        messages = [getattr(g, "message", None) for gens in response.generations for g in gens]
+        cache_hit = any(m is not None and m.response_metadata.get("cache_hit") for m in messages)
+        prompt_tokens = completion_tokens = 0
+        if not cache_hit:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            if usage:
+                prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+            else:
+                # Streamed responses report usage on the message instead
+                for m in messages:
+                    usage = getattr(m, "usage_metadata", None) or {}
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cache_hit=cache_hit)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # --- Tools ---
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, "tool", name, parent_run_id, self._context(metadata))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # --- Team graph nodes ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Chains inside a node inherit its metadata; only the node's own run (and the function it
+        # wraps, a child of the same name) has the node's name
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                parent = self._open.get(parent_run_id)
+            if parent is None or parent[:2] != ("node", node):
+                self._start(run_id, "node", node, parent_run_id, {"step": metadata.get("langgraph_step")})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+_handler_var: Optional[ContextVar] = None
+_install_lock = threading.Lock()
+
+
+def install(telemetry: Telemetry):
+    """
+    Adds a TelemetryCallbackHandler to every callback manager LangChain
+    configures in this process, on any thread, with or without explicit
+    callbacks. Only the first call has an effect.
+    """
+    global _handler_var
+    with _install_lock:
+        if _handler_var is None:
+            # The handler is the variable's default, so threads that never set it see it too
+            _handler_var = ContextVar("agent_telemetry_handler", default=TelemetryCallbackHandler(telemetry))
+            register_configure_hook(_handler_var, inheritable=True)
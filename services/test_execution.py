@@ -0,0 +1,434 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import config
+from services.symbol_index import SymbolIndex
+from services.workspace_scanner import WorkspaceScanner
+
+# Source and test files whose changes can affect test results
+SOURCE_EXTENSIONS = [".py", ".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".go", ".rs", ".json", ".toml", ".cfg", ".ini"]
+# A change to any of these can affect every test, so it forces a full run
+PYTEST_GLOBAL_FILES = {"conftest.py", "pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini", "requirements.txt"}
+PYTEST_FILE_RE = re.compile(r"(^|/)(test_[^/]*|[^/]*_test)\.py$")
+# Characters of combined stdout/stderr kept for the Coder when tests fail
+OUTPUT_TAIL_CHARS = 3000
+MAX_REPORTED_FAILURES = 20
+GO_BUILD_FAILED_RE = re.compile(r"^FAIL\s+(\S+)\s+\[(?:build|setup) failed\]")
+# Virtualenv directories looked for in the workspace; its interpreter (and packages) run the workspace's pytest
+VENV_DIRS = [".venv", "venv", "env"]
+
+
+@dataclass
+class TestFailure:
+    __test__ = False  # not a pytest test class, despite the name
+    test_id: str  # e.g. "tests/test_app.py::TestApi::test_get" for pytest
+    file: str
+    message: str
+    package: Optional[str] = None  # Go: the package's directory relative to the workspace root ("" for the root)
+
+
+@dataclass
+class TestRunResult:
+    """Machine-readable outcome of one test run; stored in TeamState as a dict."""
+    __test__ = False
+    framework: Optional[str]  # "pytest", "jest", "go", "cargo", or None if no test setup was found
+    command: str
+    exit_code: Optional[int]  # None if the run timed out or couldn't start
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    skipped: int = 0
+    duration: float = 0.0
+    selection: List[str] = field(default_factory=list)  # tests/files run; empty for a full run
+    failures: List[TestFailure] = field(default_factory=list)
+    output_tail: str = ""
+
+    @property
+    def total(self) -> int:
+        return self.passed + self.failed + self.errors + self.skipped
+
+    @property
+    def no_tests(self) -> bool:
+        """No test setup, or one that collected no tests (pytest exits with 5 then)."""
+        return self.framework is None or (self.total == 0 and self.exit_code in (0, 5))
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exit_code == 0 and self.failed == 0 and self.errors == 0 and self.total > 0
+
+    def summary(self, timing: bool = True) -> str:
+        """
+        Without `timing`, the duration and the output tail (which reports
+        timings too) are left out, so equal results have equal summaries.
+        """
+        if self.framework is None:
+            return "No tests found: no test files or test framework configuration in the workspace."
+        scope = f"{len(self.selection)} affected tests/files" if self.selection else "the full suite"
+        duration = f" in {self.duration:.1f}s" if timing else ""
+        lines = [
+            f"{self.framework}: {self.passed} passed, {self.failed} failed, {self.errors} errors, "
+            f"{self.skipped} skipped (exit code {self.exit_code}; ran {scope}{duration})"
+        ]
+        for failure in self.failures[:MAX_REPORTED_FAILURES]:
+            lines.append(f"FAILED {failure.test_id}: {failure.message.strip()[:500]}")
+        if len(self.failures) > MAX_REPORTED_FAILURES:
+            lines.append(f"... and {len(self.failures) - MAX_REPORTED_FAILURES} more failures.")
+        if timing and not self.succeeded and self.output_tail:
+            lines.append(f"Output (tail):\n{self.output_tail}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TestRunResult":
+        data = dict(data)
+        data["failures"] = [TestFailure(**f) for f in data.get("failures", [])]
+        return cls(**data)
+
+
+def run_succeeded(test_run: Optional[dict]) -> bool:
+    return bool(test_run) and TestRunResult.from_dict(test_run).succeeded
+
+
+def _python_module_names(path: str) -> List[str]:
+    """Names `path` may be imported by: its dotted path and each shorter suffix of it (for src/ layouts and the like)."""
+    parts = os.path.splitext(path)[0].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+class TestRunner:
+    """
+    Runs a workspace's test suite directly (pytest, Jest, `go test`, `cargo
+    test`) and parses its machine-readable report (JUnit XML, Jest JSON, Go
+    JSON events) instead of having an LLM read the console output.
+
+    Given the files changed since the previous run, it re-runs only the
+    affected tests: changed test files, tests that import a changed module,
+    directly or through other modules (Jest's own `--findRelatedTests` for JavaScript) and the tests that failed
+    last time. Changes to shared configuration force a full run.
+    """
+    __test__ = False
+
+    def __init__(self, root: str, timeout: float = 600, max_file_size: int = 1_000_000):
+        self.root = os.path.abspath(root)
+        self.timeout = timeout
+        # The agent's own files (manifest, chat sessions, traces) change every turn; they are not the workspace's
+        extra_ignores = []
+        index_dir = os.path.abspath(config.INDEX_DIR)
+        if index_dir.startswith(self.root + os.sep):
+            extra_ignores.append("/" + os.path.relpath(index_dir, self.root).replace(os.sep, "/") + "/")
+        self.scanner = WorkspaceScanner(self.root, SOURCE_EXTENSIONS, extra_ignore_patterns=extra_ignores,
+                                        max_file_size=max_file_size)
+
+    # --- Change tracking ---
+    def snapshot(self) -> Dict[str, str]:
+        """Content hashes of the workspace's source and test files."""
+        hashes = {}
+        for f in self.scanner.scan():
+            try:
+                with open(f.abs_path, "rb") as fh:
+                    hashes[f.path] = hashlib.sha256(fh.read()).hexdigest()
+            except OSError:
+                continue
+        return hashes
+
+    @staticmethod
+    def changed_files(old: Optional[Dict[str, str]], new: Dict[str, str]) -> List[str]:
+        old = old or {}
+        return sorted(path for path in set(old) | set(new) if old.get(path) != new.get(path))
+
+    # --- Framework detection ---
+    def detect(self) -> Optional[str]:
+        def exists(name):
+            return os.path.exists(os.path.join(self.root, name))
+
+        if exists("package.json"):
+            try:
+                with open(os.path.join(self.root, "package.json"), encoding="utf-8") as f:
+                    package = json.load(f)
+            except (OSError, ValueError):
+                package = {}
+            deps = {**package.get("dependencies", {}), **package.get("devDependencies", {})}
+            if "jest" in deps or "jest" in package.get("scripts", {}).get("test", ""):
+                return "jest"
+        if exists("go.mod"):
+            return "go"
+        if exists("Cargo.toml"):
+            return "cargo"
+        if any(PYTEST_FILE_RE.search(path) for path in self.snapshot()):
+            return "pytest"
+        return None
+
+    # --- Import graph ---
+    def _import_index(self, paths: Iterable[str]) -> Optional[SymbolIndex]:
+        """A SymbolIndex of the imports of `paths`; None if a Python file among them doesn't parse (its imports are unknown)."""
+        index = SymbolIndex()
+        for path in paths:
+            text = WorkspaceScanner.read_text(os.path.join(self.root, path))
+            if text is None:
+                continue
+            if path.endswith(".py"):
+                try:
+                    ast.parse(text)
+                except (SyntaxError, ValueError):
+                    return None
+            index.update_file(path, text, "")
+        return index
+
+    @staticmethod
+    def _affected(index: SymbolIndex, start: Iterable[str], names_of: Callable[[str], List[str]],
+                  node_of: Callable[[str], str] = lambda path: path) -> Set[str]:
+        """
+        `start` and everything that imports it, directly or transitively. Nodes
+        are files, or packages with `node_of` mapping a file to its package;
+        `names_of` gives the names a node is imported by.
+        """
+        affected, queue = set(start), list(start)
+        while queue:
+            for name in names_of(queue.pop()):
+                for importer in map(node_of, index.importers_of(name)):
+                    if importer not in affected:
+                        affected.add(importer)
+                        queue.append(importer)
+        return affected
+
+    # --- Running ---
+    def run(self, changed: Optional[List[str]] = None, previous: Optional[dict] = None) -> TestRunResult:
+        """
+        Runs the tests. With `changed` (files changed since `previous`, the last
+        run's result dict) only the affected tests are run; otherwise the full suite.
+        """
+        framework = self.detect()
+        if framework is None:
+            return TestRunResult(None, "", None)
+        runner = getattr(self, f"_run_{framework}")
+        with tempfile.TemporaryDirectory(prefix="agent-tests-") as report_dir:
+            result = runner(report_dir, changed, TestRunResult.from_dict(previous) if previous else None)
+        if result.exit_code is None:
+            result.errors = max(result.errors, 1)  # timed out or couldn't start
+        return result
+
+    def _execute(self, command: List[str], env: Optional[dict] = None):
+        """Runs `command`; returns (exit code or None, combined output, seconds)."""
+        start = time.monotonic()
+        try:
+            proc = subprocess.run(command, cwd=self.root, capture_output=True, text=True, timeout=self.timeout,
+                                  env={**os.environ, **(env or {})})
+        except subprocess.TimeoutExpired as e:
+            output = (e.stdout or "") if isinstance(e.stdout, str) else ""
+            return None, f"Timed out after {self.timeout:.0f}s.\n{output}", time.monotonic() - start
+        except OSError as e:
+            return None, f"Could not start {command[0]}: {e}", time.monotonic() - start
+        return proc.returncode, (proc.stdout or "") + (proc.stderr or ""), time.monotonic() - start
+
+    # pytest
+    def _python(self) -> str:
+        """The interpreter of the workspace's virtualenv, or the agent's own if it has none."""
+        for venv in VENV_DIRS:
+            for python in ("bin/python", "Scripts/python.exe"):
+                path = os.path.join(self.root, venv, python)
+                if os.path.exists(path):
+                    return path
+        return sys.executable
+
+    def _pytest_selection(self, changed: Optional[List[str]], previous: Optional[TestRunResult]) -> List[str]:
+        if changed is None or previous is None or previous.framework != "pytest":
+            return []
+        if any(os.path.basename(path) in PYTEST_GLOBAL_FILES for path in changed):
+            return []
+        index = self._import_index(f.path for f in self.scanner.scan() if f.path.endswith(".py"))
+        if index is None:
+            return []  # the import graph is unknown: run the full suite
+        # Deleted modules count too: whatever still imports them needs to run
+        affected = self._affected(index, [path for path in changed if path.endswith(".py")], _python_module_names)
+        selected = {failure.test_id for failure in previous.failures}
+        selected |= {path for path in affected if PYTEST_FILE_RE.search(path)}
+        selected = {s for s in selected if os.path.exists(os.path.join(self.root, s.split("::")[0]))}
+        # Test ids inside a selected file are covered by the file itself
+        files = {s for s in selected if "::" not in s}
+        return sorted(s for s in selected if s in files or s.split("::")[0] not in files)
+
+    def _run_pytest(self, report_dir: str, changed, previous) -> TestRunResult:
+        report = os.path.join(report_dir, "junit.xml")
+        selection = self._pytest_selection(changed, previous)
+        command = [self._python(), "-m", "pytest", "-q", "-p", "no:cacheprovider", f"--junitxml={report}",
+                   "-o", "junit_family=xunit1", *selection]
+        exit_code, output, duration = self._execute(command)
+        result = TestRunResult("pytest", " ".join(command[2:]), exit_code, duration=duration,
+                               selection=selection, output_tail=output[-OUTPUT_TAIL_CHARS:])
+        self._parse_junit(report, result)
+        if result.total == 0 and exit_code != 5:
+            # No report, or one without test cases: a collection/usage error or pytest
+            # missing from the interpreter, not a pass (pytest exits with 5 when there are no tests)
+            result.errors = max(result.errors, 1)
+        return result
+
+    def _parse_junit(self, report: str, result: TestRunResult):
+        try:
+            tree = ET.parse(report)
+        except (OSError, ET.ParseError):
+            return
+        for case in tree.iter("testcase"):
+            file = case.get("file") or ""
+            name = case.get("name", "")
+            classname = case.get("classname", "")
+            module = file[:-3].replace("/", ".") if file.endswith(".py") else ""
+            owner = classname[len(module) + 1:] if module and classname.startswith(module + ".") else ""
+            test_id = "::".join(part for part in (file or classname, owner, name) if part)
+            outcome = next((child for child in case if child.tag in ("failure", "error", "skipped")), None)
+            if outcome is None:
+                result.passed += 1
+            elif outcome.tag == "skipped":
+                result.skipped += 1
+            else:
+                if outcome.tag == "failure":
+                    result.failed += 1
+                else:
+                    result.errors += 1
+                message = outcome.get("message") or (outcome.text or "")
+                result.failures.append(TestFailure(test_id, file, message))
+
+    # Jest
+    def _run_jest(self, report_dir: str, changed, previous) -> TestRunResult:
+        report = os.path.join(report_dir, "jest.json")
+        npx = shutil.which("npx") or "npx"
+        selection = []
+        if changed is not None and previous is not None and previous.framework == "jest":
+            selection = [path for path in changed if os.path.exists(os.path.join(self.root, path))
+                         and path.endswith((".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"))]
+            selection += [failure.file for failure in previous.failures if failure.file not in selection]
+        command = [npx, "--no-install", "jest", "--ci", "--json", f"--outputFile={report}"]
+        if selection:
+            command += ["--findRelatedTests", *selection]
+        exit_code, output, duration = self._execute(command, env={"CI": "true"})
+        result = TestRunResult("jest", " ".join(command[1:]), exit_code, duration=duration,
+                               selection=selection, output_tail=output[-OUTPUT_TAIL_CHARS:])
+        if not self._parse_jest(report, result):
+            result.errors = 1 if exit_code != 0 else 0
+        return result
+
+    def _parse_jest(self, report: str, result: TestRunResult) -> bool:
+        """Adds Jest's JSON report to `result`; False if there is no readable report."""
+        try:
+            with open(report, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        result.passed = data.get("numPassedTests", 0)
+        result.failed = data.get("numFailedTests", 0)
+        result.skipped = data.get("numPendingTests", 0) + data.get("numTodoTests", 0)
+        result.errors = data.get("numRuntimeErrorTestSuites", 0)
+        for suite in data.get("testResults", []):
+            file = os.path.relpath(suite.get("name", ""), self.root).replace(os.sep, "/")
+            failed_cases = [case for case in suite.get("assertionResults", []) if case.get("status") == "failed"]
+            for case in failed_cases:
+                result.failures.append(TestFailure(f"{file} > {case.get('fullName', '')}", file,
+                                                   "\n".join(case.get("failureMessages", []))))
+            if suite.get("status") == "failed" and not failed_cases:
+                result.failures.append(TestFailure(file, file, suite.get("message", "")))
+        return True
+
+    # Go
+    def _go_module(self) -> Optional[str]:
+        text = WorkspaceScanner.read_text(os.path.join(self.root, "go.mod")) or ""
+        match = re.search(r"^module\s+(\S+)", text, re.MULTILINE)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _go_package_dir(module: Optional[str], package: str) -> Optional[str]:
+        """The directory of `package` relative to the root; None for a package outside `module`."""
+        if package == module:
+            return ""
+        return package[len(module) + 1:] if module and package.startswith(module + "/") else None
+
+    def _run_go(self, report_dir: str, changed, previous) -> TestRunResult:
+        module = self._go_module()
+
+        def import_path(package_dir: str) -> str:
+            return f"{module}/{package_dir}" if package_dir else module
+
+        packages = ["./..."]
+        if (changed is not None and previous is not None and previous.framework == "go" and module
+                and "go.mod" not in changed):
+            dirs = {os.path.dirname(path) for path in changed if path.endswith(".go")}
+            # Packages importing a changed package, directly or transitively, are affected too
+            index = self._import_index(f.path for f in self.scanner.scan() if f.path.endswith(".go"))
+            dirs = self._affected(index, dirs, lambda d: [import_path(d)], os.path.dirname)
+            dirs |= {failure.package for failure in previous.failures if failure.package is not None}
+            if dirs:
+                packages = sorted("./" + d if d else "." for d in dirs)
+        command = ["go", "test", "-json", *packages]
+        exit_code, proc_output, duration = self._execute(command)
+        result = TestRunResult("go", " ".join(command), exit_code, duration=duration,
+                               selection=packages if packages != ["./..."] else [])
+        self._parse_go(proc_output, result, module)
+        result.output_tail = proc_output[-OUTPUT_TAIL_CHARS:]
+        return result
+
+    def _parse_go(self, output: str, result: TestRunResult, module: Optional[str]):
+        """Adds the events of `go test -json` output to `result`."""
+        outputs: Dict[str, List[str]] = {}
+        failed_packages: Dict[str, str] = {}  # package -> package-level output, for failures outside any test
+        for line in output.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # Before Go 1.24, build failures are only reported as text
+                match = GO_BUILD_FAILED_RE.match(line)
+                if match:
+                    failed_packages[match.group(1)] = line
+                continue
+            package, test = event.get("Package", ""), event.get("Test")
+            key = f"{package}::{test}" if test else package
+            if event.get("Action") == "output":
+                outputs.setdefault(key, []).append(event.get("Output", ""))
+            elif not test:
+                if event.get("Action") == "fail":
+                    failed_packages[package] = "".join(outputs.get(key, []))[-1000:]
+            elif event.get("Action") == "pass":
+                result.passed += 1
+            elif event.get("Action") == "skip":
+                result.skipped += 1
+            elif event.get("Action") == "fail":
+                result.failed += 1
+                result.failures.append(TestFailure(key, "", "".join(outputs.get(key, []))[-1000:], self._go_package_dir(module, package)))
+        # A package can fail without a failing test (e.g. it doesn't build); keep it so it is re-run next time
+        failed_tests = {failure.test_id.split("::")[0] for failure in result.failures}
+        for package, message in failed_packages.items():
+            if package not in failed_tests:
+                result.errors += 1
+                result.failures.append(TestFailure(package, "", message, self._go_package_dir(module, package)))
+
+    # Rust
+    def _run_cargo(self, report_dir: str, changed, previous) -> TestRunResult:
+        command = ["cargo", "test", "--color", "never"]
+        exit_code, output, duration = self._execute(command)
+        result = TestRunResult("cargo", " ".join(command), exit_code, duration=duration,
+                               output_tail=output[-OUTPUT_TAIL_CHARS:])
+        self._parse_cargo(output, result)
+        if exit_code not in (0, None) and result.failed == 0:
+            result.errors = 1  # e.g. a compile error
+        return result
+
+    @staticmethod
+    def _parse_cargo(output: str, result: TestRunResult):
+        """Adds the counts and failed tests of `cargo test`'s console output to `result`."""
+        for passed, failed, ignored in re.findall(r"test result: \w+\. (\d+) passed; (\d+) failed; (\d+) ignored", output):
+            result.passed += int(passed)
+            result.failed += int(failed)
+            result.skipped += int(ignored)
+        for name in re.findall(r"^test (\S+) \.\.\. FAILED$", output, re.MULTILINE):
+            result.failures.append(TestFailure(name, "", "see output"))
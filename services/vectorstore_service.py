@@ -1,77 +1,525 @@
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+import os
+import json
+import shutil
+import threading
+from typing import List, Optional
+import faiss
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from services.index_manifest import IndexManifest, FileRecord, ReindexReport, hash_content
+from services.embedding_cache import EmbeddingCache
+from services.embedding_pipeline import BatchedEmbeddings, HashEmbeddings
+from services.workspace_scanner import WorkspaceScanner
+from services.file_watcher import WorkspaceWatcher
+from services.lexical_index import LexicalIndex, extract_symbol, reciprocal_rank_fusion
+from services.symbol_index import SymbolIndex
+from services.query_cache import LRUCache, normalize_query
+from services.sharded_vector_store import ShardedVectorStore
+import config
+
+# Bumped whenever the stored chunks change shape (2: chunks carry start_index/start_line)
+MANIFEST_VERSION = 2
 
 class VectorStoreService:
     """
     Manages the creation and retrieval of the vector store for the codebase.
     """
-    def __init__(self, working_dir: str, supported_file_types: list, embeddings_model: str):
+    def __init__(self, working_dir: str, supported_file_types: list, embeddings_model: str, index_dir: Optional[str] = None):
         self.working_dir = working_dir
         self.supported_file_types = supported_file_types
-        self.embeddings = OpenAIEmbeddings(model=embeddings_model)
+        if config.EMBEDDINGS_BACKEND == "fake":
+            # Deterministic local embeddings for offline runs; cached under their own model name
+            backend = HashEmbeddings(size=config.FAKE_EMBEDDINGS_SIZE)
+            embeddings_model = f"hash-{config.FAKE_EMBEDDINGS_SIZE}"
+        else:
+            backend = OpenAIEmbeddings(model=embeddings_model)
+        self.embeddings_model = embeddings_model
         self.vector_store = None
+        # "flat" keeps full float32 vectors in one FAISS index; the other modes use a
+        # compressed ShardedVectorStore (one index per top-level directory)
+        self.storage_mode = config.VECTOR_STORE_MODE
+        # Tracks which chunks in the store came from which version of which file
+        self.manifest = IndexManifest()
+        # BM25 / identifier index over the same chunks, for exact-symbol and hybrid retrieval
+        self.lexical_index = LexicalIndex()
+        # Definitions / references / imports per file; built on first lookup, then kept incremental
+        self.symbol_index = SymbolIndex()
+        self._symbols_synced = False
+        # Bumped whenever the index content changes; part of every retrieval cache key
+        self.generation = 0
+        self._results_cache = LRUCache(config.QUERY_RESULT_CACHE_SIZE)
+        self._query_embedding_cache = LRUCache(config.QUERY_EMBEDDING_CACHE_SIZE)
+        # Optional on-disk persistence: FAISS index + manifest + chunk-hash -> embedding cache.
+        # The index is loaded lazily on first use so startup stays fast.
+        self.index_dir = os.path.abspath(index_dir) if index_dir else None
+        self._loaded = self.index_dir is None
+        self._load_lock = threading.Lock()
+        cache = None
+        if self.index_dir:
+            cache = EmbeddingCache(os.path.join(self.index_dir, "embeddings.sqlite"), embeddings_model)
+        # Batched, concurrent, rate-limit-aware embedding; finished batches are checkpointed in the cache
+        self.embeddings = BatchedEmbeddings(
+            backend,
+            cache=cache,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            max_concurrency=config.EMBEDDING_MAX_CONCURRENCY,
+            max_retries=config.EMBEDDING_MAX_RETRIES,
+            on_progress=self._report_embedding_progress,
+        )
+        # Serializes index updates (manual reindex and the background watcher)
+        self._write_lock = threading.RLock()
+        self.watcher = None
+        # A single-pass scanner replaces one directory walk per file type
+        extra_ignores = []
+        if self.index_dir and self.index_dir.startswith(os.path.abspath(working_dir) + os.sep):
+            extra_ignores.append("/" + os.path.relpath(self.index_dir, working_dir).replace(os.sep, "/") + "/")
+        self.scanner = WorkspaceScanner(
+            working_dir,
+            supported_file_types,
+            extra_ignore_patterns=extra_ignores,
+            max_file_size=config.MAX_INDEXED_FILE_SIZE,
+            max_workers=config.INDEX_READ_WORKERS,
+        )
         # Use a robust splitter for code
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+        # Chunks remember where they start so QA results can be merged and cite line ranges
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, add_start_index=True)
         print("VectorStoreService initialized.")
 
-    def _load_documents(self):
-        """Loads all supported files from the working directory."""
-        print("Loading documents from workspace...")
-        loaders = []
-        for file_type in self.supported_file_types:
-            # Use glob to find all files with the supported extension
-            loader = DirectoryLoader(
-                self.working_dir,
-                glob=f"**/*{file_type}",
-                loader_cls=TextLoader,
-                show_progress=False,
-                use_multithreading=True,
-                silent_errors=True # Ignore files that can't be read
-            )
-            loaders.append(loader)
-
-        docs = []
-        for loader in loaders:
+    @staticmethod
+    def _report_embedding_progress(done: int, total: int):
+        step = max(1, total // 10)
+        if done == total or done // step != (done - 1) // step:
+            print(f"Embedded {done}/{total} new chunks...")
+
+    def _scan_workspace(self):
+        """Finds all indexable files in the working directory in a single pass."""
+        print("Scanning workspace...")
+        files = self.scanner.scan()
+        if not files:
+            print("No documents found to load.")
+        else:
+            print(f"Found {len(files)} documents.")
+        return files
+
+    # --- Persistence ---
+    def _faiss_dir(self) -> str:
+        return os.path.join(self.index_dir, "faiss")
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def _ensure_loaded(self):
+        """Loads the persisted index on first use and validates it against the workspace."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
             try:
-                loaded_docs = loader.load()
-                if loaded_docs:
-                    docs.extend(loaded_docs)
+                self._load_index()
             except Exception as e:
-                print(f"Error loading files with a loader: {e}")
-        
-        if not docs:
-            print("No documents found to load.")
+                print(f"Could not load the saved vector index, it will be rebuilt: {e}")
+                self.vector_store = None
+                self.manifest = IndexManifest()
+                self.lexical_index.clear()
+            self._bump_generation()
+            self._loaded = True
+
+    def _load_index(self):
+        if not os.path.exists(self._manifest_path()):
+            return
+        with open(self._manifest_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if (data.get("version") != MANIFEST_VERSION or data.get("embeddings_model") != self.embeddings_model
+                or data.get("storage_mode", "flat") != self.storage_mode):
+            print("Saved vector index was built with a different format, model or storage mode; ignoring it.")
+            return
+
+        manifest = IndexManifest.from_dict(data.get("files", {}))
+        vector_store = None
+        if manifest.chunk_count():
+            # The index was written by this service, so deserializing its docstore is safe
+            if self.storage_mode == "flat":
+                vector_store = FAISS.load_local(self._faiss_dir(), self.embeddings, allow_dangerous_deserialization=True)
+            else:
+                vector_store = ShardedVectorStore.load_local(
+                    self._faiss_dir(), self.embeddings, mode=self.storage_mode, nprobe=config.VECTOR_STORE_NPROBE)
+            stored_ids = set(vector_store.docstore._dict)
+            expected_ids = {chunk_id for record in manifest.files.values() for chunk_id in record.chunk_ids}
+            if stored_ids != expected_ids:
+                print("Saved vector index does not match its manifest; ignoring it.")
+                return
+
+        self.manifest = manifest
+        self.vector_store = vector_store
+        # The lexical index is cheap to rebuild from the stored chunks, so it is not persisted
+        if vector_store is not None:
+            self.lexical_index.update(add=list(vector_store.docstore._dict.items()))
+        stale = self._stale_paths()
+        print(f"Loaded saved vector index with {manifest.chunk_count()} chunks from {len(manifest.files)} files.")
+        if stale:
+            print(f"{len(stale)} indexed files changed since the last index; run `reindex` to refresh them.")
+
+    def _stale_paths(self) -> list:
+        """Paths whose size or mtime on disk no longer matches the manifest (or which are gone)."""
+        stale = []
+        for rel_path, record in self.manifest.files.items():
+            try:
+                stat = os.stat(os.path.join(self.working_dir, rel_path))
+            except OSError:
+                stale.append(rel_path)
+                continue
+            if stat.st_size != record.size or stat.st_mtime != record.mtime:
+                stale.append(rel_path)
+        return stale
+
+    def _save_index(self):
+        if not self.index_dir:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        faiss_dir = self._faiss_dir()
+        if self.vector_store is not None:
+            tmp_dir = faiss_dir + ".tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            self.vector_store.save_local(tmp_dir)
+            shutil.rmtree(faiss_dir, ignore_errors=True)
+            os.rename(tmp_dir, faiss_dir)
         else:
-            print(f"Loaded {len(docs)} documents.")
-        return docs
-
-    def reindex(self):
-        """Re-indexes all files in the workspace and creates the vector store."""
-        documents = self._load_documents()
-        if not documents:
-            self.vector_store = None
-            print("Workspace is empty. No vector store created.")
+            shutil.rmtree(faiss_dir, ignore_errors=True)
+        self._save_manifest()
+
+    def _save_manifest(self):
+        if not self.index_dir:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "embeddings_model": self.embeddings_model,
+            "storage_mode": self.storage_mode,
+            "files": self.manifest.to_dict(),
+        }
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    # --- Index updates ---
+    # Updates never mutate the live store: they work on a copy and swap it in at the
+    # end, so readers of get_retriever() are never blocked by (or see half of) an update.
+    def _clone_store(self):
+        if self.vector_store is None:
+            return None
+        store = self.vector_store
+        if isinstance(store, ShardedVectorStore):
+            # Shards are copied lazily, only when the update actually touches them
+            return store.clone()
+        return FAISS(
+            embedding_function=store.embedding_function,
+            index=faiss.clone_index(store.index),
+            docstore=InMemoryDocstore(dict(store.docstore._dict)),
+            index_to_docstore_id=dict(store.index_to_docstore_id),
+        )
+
+    def _new_store(self, documents: List[Document], ids: List[str]):
+        if self.storage_mode == "flat":
+            return FAISS.from_documents(documents, self.embeddings, ids=ids)
+        return ShardedVectorStore.from_documents(
+            documents, self.embeddings, ids=ids, mode=self.storage_mode, nprobe=config.VECTOR_STORE_NPROBE)
+
+    @staticmethod
+    def _delete_chunks(store, chunk_ids: list):
+        if store is None or not chunk_ids:
             return
+        try:
+            store.delete(chunk_ids)
+        except ValueError as e:
+            # Ids that are already gone from the store are not an error here
+            print(f"Some chunks were already missing from the vector store: {e}")
+
+    def _apply_changes(self, files: list, removed_paths: list, report: ReindexReport) -> ReindexReport:
+        """
+        Re-indexes `files` (ScannedFile candidates) and drops `removed_paths`.
+        Must be called with the write lock held.
+        """
+        manifest = self.manifest.copy()
+
+        # 1. Files which no longer exist
+        gone = [rel_path for rel_path in removed_paths if manifest.get(rel_path)]
+
+        # 2. Files whose size and mtime are unchanged are reused without being read
+        to_read = []
+        for f in files:
+            record = manifest.get(f.path)
+            if record and record.size == f.size and record.mtime == f.mtime:
+                report.files_unchanged += 1
+                report.chunks_reused += len(record.chunk_ids)
+            else:
+                to_read.append(f)
+
+        # 3. Read the rest; only the ones whose content actually changed need re-splitting
+        changed_files = []
+        touched = False
+        read_paths = set()
+        for f, text in self.scanner.read_files(to_read):
+            read_paths.add(f.path)
+            content_hash = hash_content(text)
+            record = manifest.get(f.path)
+            if record and record.content_hash == content_hash:
+                record.size, record.mtime = f.size, f.mtime
+                touched = True
+                report.files_unchanged += 1
+                report.chunks_reused += len(record.chunk_ids)
+            else:
+                changed_files.append((f, text, content_hash))
+        # Files that turned out to be binary or undecodable are no longer indexable
+        gone += [f.path for f in to_read if f.path not in read_paths and manifest.get(f.path)]
+
+        if not gone and not changed_files:
+            # Nothing to add or remove (e.g. a save that kept the content): leave the store
+            # alone rather than copying and rewriting all of it
+            if touched:
+                self.manifest = manifest
+                self._save_manifest()
+            return report
+
+        store = self._clone_store()
+        removed_chunk_ids = []
+        changed_texts = {}
 
-        print("Splitting and embedding documents...")
-        texts = self.text_splitter.split_documents(documents)
-        
-        if not texts:
-            print("No text chunks to index after splitting.")
-            self.vector_store = None
+        for rel_path in gone:
+            record = manifest.remove(rel_path)
+            changed_texts[rel_path] = None
+            self._delete_chunks(store, record.chunk_ids)
+            removed_chunk_ids.extend(record.chunk_ids)
+            report.files_removed += 1
+            report.chunks_deleted += len(record.chunk_ids)
+
+        new_texts, new_ids = [], []
+        for f, text, content_hash in changed_files:
+            record = manifest.get(f.path)
+            if record:
+                self._delete_chunks(store, record.chunk_ids)
+                removed_chunk_ids.extend(record.chunk_ids)
+                report.chunks_deleted += len(record.chunk_ids)
+
+            changed_texts[f.path] = (text, content_hash)
+            chunks = self.text_splitter.create_documents([text], metadatas=[{"source": f.path}])
+            for chunk in chunks:
+                start = chunk.metadata.get("start_index", -1)
+                if start >= 0:
+                    chunk.metadata["start_line"] = text.count("\n", 0, start) + 1
+            chunk_ids = [f"{f.path}#{content_hash[:12]}#{i}" for i in range(len(chunks))]
+            new_texts.extend(chunks)
+            new_ids.extend(chunk_ids)
+            manifest.set(FileRecord(f.path, f.size, f.mtime, content_hash, chunk_ids))
+            report.files_embedded += 1
+            report.chunks_embedded += len(chunks)
+
+        # 4. Embed only the new chunks
+        if new_texts:
+            print(f"Splitting and embedding {report.files_embedded} new or changed documents...")
+            if store is None:
+                store = self._new_store(new_texts, new_ids)
+            else:
+                store.add_documents(new_texts, ids=new_ids)
+
+        if manifest.chunk_count() == 0:
+            store = None
+
+        # 5. Bring the lexical and symbol indexes up to date first, so no search (or cached
+        # result) of the new generation combines the new vectors with old BM25 scores
+        self.lexical_index.update(removed_chunk_ids, zip(new_ids, new_texts))
+        for rel_path, changed in changed_texts.items():
+            if changed is None:
+                self.symbol_index.remove_file(rel_path)
+            else:
+                self.symbol_index.update_file(rel_path, *changed)
+
+        # 6. Publish the new index in one step
+        self.manifest, self.vector_store = manifest, store
+        self._bump_generation()
+        self._save_index()
+        return report
+
+    def reindex(self) -> ReindexReport:
+        """
+        Brings the vector store up to date with the workspace.
+        Only new or changed files are re-split and re-embedded; chunks of
+        unchanged files are reused and chunks of removed files are deleted.
+        """
+        self._ensure_loaded()
+        with self._write_lock:
+            report = ReindexReport()
+            files = self._scan_workspace()
+            report.files_scanned = len(files)
+            current_paths = {f.path for f in files}
+            removed_paths = [p for p in self.manifest.paths() if p not in current_paths]
+            self._apply_changes(files, removed_paths, report)
+
+        if self.vector_store is None:
+            print("Workspace is empty. No vector store created.")
+        else:
+            print(f"Vector store updated: {report.summary()}")
+        return report
+
+    def update_paths(self, paths) -> ReindexReport:
+        """
+        Incrementally re-indexes only the given paths (files or directories,
+        absolute or workspace-relative), e.g. the ones reported by the file watcher.
+        """
+        self._ensure_loaded()
+        with self._write_lock:
+            report = ReindexReport()
+            files, removed_paths = {}, set()
+            for path in paths:
+                rel_path = os.path.relpath(os.path.join(self.working_dir, path), self.working_dir).replace(os.sep, "/")
+                abs_path = os.path.join(self.working_dir, rel_path)
+                if os.path.isdir(abs_path):
+                    # A directory was created or moved in: index everything under it
+                    for f in self.scanner.scan(rel_path):
+                        files[f.path] = f
+                    continue
+                candidate = self.scanner.check(rel_path)
+                if candidate:
+                    files[candidate.path] = candidate
+                else:
+                    # Deleted (or now ignored) file, or a directory that went away
+                    removed_paths.add(rel_path)
+                    removed_paths.update(p for p in self.manifest.paths() if p.startswith(rel_path + "/"))
+            report.files_scanned = len(files)
+            self._apply_changes(list(files.values()), sorted(removed_paths), report)
+        return report
+
+    # --- Background watching ---
+    def start_watching(self, debounce: float = 0.5, poll_interval: float = 2.0):
+        """
+        Starts a background watcher that keeps the index in sync with the workspace.
+        The index is first brought up to date, then every burst of changes is
+        applied incrementally off the main thread.
+        """
+        if self.watcher is not None:
             return
+        self.watcher = WorkspaceWatcher(
+            self.working_dir,
+            on_change=self._on_workspace_change,
+            is_ignored=self.scanner.is_ignored,
+            debounce=debounce,
+            poll_interval=poll_interval,
+            poll_snapshot=self.scanner.snapshot,
+        )
+        self.watcher.start()
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _on_workspace_change(self, paths):
+        # `None` means the watcher lost track of events and everything may have changed
+        try:
+            if paths is None:
+                self.reindex()
+            else:
+                self.update_paths(paths)
+        except Exception as e:
+            print(f"Background re-indexing failed: {e}")
+
+    def get_symbol_index(self) -> SymbolIndex:
+        """
+        Returns the symbol index, building it on first use from the indexed
+        files; afterwards every index update keeps it current.
+        """
+        self._ensure_loaded()
+        if not self._symbols_synced:
+            with self._write_lock:
+                if not self._symbols_synced:
+                    self._sync_symbols()
+                    self._symbols_synced = True
+        return self.symbol_index
+
+    def _sync_symbols(self):
+        indexed = self.manifest.files
+        for rel_path in self.symbol_index.paths():
+            if rel_path not in indexed:
+                self.symbol_index.remove_file(rel_path)
+        to_read = [
+            self.scanner.check(rel_path) for rel_path, record in indexed.items()
+            if self.symbol_index.content_hash(rel_path) != record.content_hash
+        ]
+        for f, text in self.scanner.read_files([f for f in to_read if f is not None]):
+            self.symbol_index.update_file(f.path, text, hash_content(text))
+
+    def has_index(self) -> bool:
+        self._ensure_loaded()
+        return self.vector_store is not None or len(self.lexical_index) > 0
+
+    # --- Retrieval ---
+    def _bump_generation(self):
+        self.generation += 1
+        # Entries for older generations can never be hit again
+        self._results_cache.clear()
+
+    def _embed_query(self, query: str) -> List[float]:
+        # A query's embedding doesn't depend on the index, so this cache survives index updates
+        key = normalize_query(query, keep_case=True)
+        embedding = self._query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+            self._query_embedding_cache.put(key, embedding)
+        return embedding
+
+    def search(self, query: str, k: int = 5) -> List[Document]:
+        """
+        Hybrid retrieval. Queries that are clearly symbol lookups are answered
+        from the lexical index alone, with no embedding call; everything else
+        fuses the lexical and vector rankings with reciprocal rank fusion.
+        Results are cached per (normalized query, k, index generation); the
+        query keeps its case, as symbol lookups are case-sensitive.
+        """
+        self._ensure_loaded()
+        key = (normalize_query(query, keep_case=True), k, self.generation)
+        cached = self._results_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        results = self._search_uncached(query, k)
+        self._results_cache.put(key, results)
+        return list(results)
+
+    def _search_uncached(self, query: str, k: int) -> List[Document]:
+        symbol = extract_symbol(query)
+        if symbol and self.lexical_index.has_term(symbol):
+            return [doc for doc, _ in self.lexical_index.search_symbol(symbol, k)]
+
+        lexical = [doc for doc, _ in self.lexical_index.search(query, k * 2)]
+        vector_store = self.vector_store
+        if vector_store is None:
+            return lexical[:k]
+        vector = vector_store.similarity_search_by_vector(self._embed_query(query), k=k * 2)
+        return reciprocal_rank_fusion([lexical, vector], k)
 
-        # Create the FAISS vector store from the texts
-        self.vector_store = FAISS.from_documents(texts, self.embeddings)
-        print(f"Vector store created successfully with {len(texts)} text chunks.")
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the retrieval caches (and the chunk embedding cache, if persistent)."""
+        stats = {
+            "index_generation": self.generation,
+            "results": self._results_cache.stats(),
+            "query_embeddings": self._query_embedding_cache.stats(),
+        }
+        if self.embeddings.cache is not None:
+            stats["chunk_embeddings"] = self.embeddings.stats()
+        return stats
 
     def get_retriever(self, k: int = 5):
         """
         Returns a retriever for the vector store.
         If the store doesn't exist, it returns None.
         """
-        if self.vector_store:
-            return self.vector_store.as_retriever(search_kwargs={"k": k})
-        return None
\ No newline at end of file
+        self._ensure_loaded()
+        # Take one reference: a concurrent update swaps in a new store rather than mutating this one
+        vector_store = self.vector_store
+        if vector_store:
+            return vector_store.as_retriever(search_kwargs={"k": k})
+        return None
@@ -0,0 +1,269 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Directories that never contain source worth indexing
+DEFAULT_IGNORED_DIRS = [
+    ".git", ".hg", ".svn", "node_modules", "venv", ".venv", "env", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", ".idea", ".vscode",
+    "build", "dist", "target", "out", ".next", ".gradle", "*.egg-info",
+]
+
+# How much of a file to sniff when deciding whether it is binary
+BINARY_SNIFF_BYTES = 8192
+
+
+@dataclass
+class ScannedFile:
+    """A candidate file found by the scanner (not read yet)."""
+    path: str  # relative to the scan root, '/'-separated
+    abs_path: str
+    size: int
+    mtime: float
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translates one gitignore glob into a regex fragment."""
+    i, n, out = 0, len(pattern), []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 3] == "**/":
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern[i:i + 2] == "**":
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """
+    A small gitignore-style matcher: supports comments, negation (`!`),
+    directory-only patterns (trailing `/`), anchored patterns and `**`.
+    Later rules override earlier ones, as in git.
+    """
+    def __init__(self, patterns: Iterable[str] = ()):
+        # (base_dir, compiled regex, negate, dir_only)
+        self.rules: List[Tuple[str, "re.Pattern", bool, bool]] = []
+        self.add_patterns(patterns)
+
+    def add_patterns(self, patterns: Iterable[str], base_dir: str = ""):
+        self.rules.extend(self.parse(patterns, base_dir))
+
+    @staticmethod
+    def parse(patterns: Iterable[str], base_dir: str = "") -> List[Tuple[str, "re.Pattern", bool, bool]]:
+        rules = []
+        for line in patterns:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            prefix = "^" if anchored else "^(?:.*/)?"
+            regex = re.compile(prefix + _glob_to_regex(line) + "$")
+            rules.append((base_dir, regex, negate, dir_only))
+        return rules
+
+    def add_file(self, gitignore_path: str, base_dir: str = ""):
+        try:
+            with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
+                self.add_patterns(f.readlines(), base_dir)
+        except OSError:
+            pass
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for base_dir, regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base_dir:
+                if not rel_path.startswith(base_dir + "/"):
+                    continue
+                candidate = rel_path[len(base_dir) + 1:]
+            else:
+                candidate = rel_path
+            if regex.match(candidate):
+                ignored = not negate
+        return ignored
+
+
+class WorkspaceScanner:
+    """
+    Walks the workspace once with `os.scandir`, honoring `.gitignore` files
+    and default ignores, and reads candidate files through a bounded thread pool.
+    """
+    def __init__(self, root: str, extensions: Iterable[str], ignored_dirs: Optional[Iterable[str]] = None,
+                 extra_ignore_patterns: Iterable[str] = (), max_file_size: int = 1_000_000, max_workers: int = 8):
+        self.root = os.path.abspath(root)
+        # Deduplicate and normalize the extension list
+        self.extensions = {ext.lower() for ext in extensions}
+        self.ignored_dirs = list(DEFAULT_IGNORED_DIRS if ignored_dirs is None else ignored_dirs)
+        self.extra_ignore_patterns = list(extra_ignore_patterns)
+        self.max_file_size = max_file_size
+        self.max_workers = max_workers
+        self._default_rules = IgnoreRules.parse([f"{d}/" for d in self.ignored_dirs] + self.extra_ignore_patterns)
+        # base_dir -> (stat signature of its .gitignore or None, parsed rules); see _gitignore_rules
+        self._gitignore_cache: Dict[str, Tuple[Optional[tuple], list]] = {}
+
+    def _has_supported_extension(self, name: str) -> bool:
+        _, ext = os.path.splitext(name)
+        return ext.lower() in self.extensions
+
+    def _base_rules(self) -> IgnoreRules:
+        rules = IgnoreRules()
+        rules.rules = list(self._default_rules)
+        return rules
+
+    def _gitignore_rules(self, base_dir: str) -> list:
+        """
+        The parsed rules of `base_dir`'s `.gitignore` (none if it has none).
+        They are cached until the file changes, so checking a path costs a stat
+        per ancestor directory rather than reading and parsing each `.gitignore`.
+        """
+        path = os.path.join(self.root, base_dir, ".gitignore")
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            signature = None
+        cached = self._gitignore_cache.get(base_dir)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        rules = IgnoreRules()
+        if signature is not None:
+            rules.add_file(path, base_dir)
+        # Scanner threads (e.g. the file watcher's) may race here; both would store the same rules
+        self._gitignore_cache[base_dir] = (signature, rules.rules)
+        return rules.rules
+
+    def _rules_for(self, rel_dir: str) -> IgnoreRules:
+        """Ignore rules in effect inside `rel_dir`, including every ancestor's `.gitignore`."""
+        rules = self._base_rules()
+        parts = rel_dir.split("/") if rel_dir else []
+        for depth in range(len(parts) + 1):
+            rules.rules.extend(self._gitignore_rules("/".join(parts[:depth])))
+        return rules
+
+    @staticmethod
+    def _normalize(rel_path: str) -> str:
+        rel_path = rel_path.replace(os.sep, "/").strip("/")
+        return "" if rel_path == "." else rel_path
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether a single workspace-relative path (or any of its parent directories) is ignored."""
+        rel_path = self._normalize(rel_path)
+        if not rel_path:
+            return False
+        rules = self._rules_for(os.path.dirname(rel_path).replace(os.sep, "/"))
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if rules.is_ignored("/".join(parts[:depth]), is_dir=True):
+                return True
+        return rules.is_ignored(rel_path, is_dir)
+
+    def check(self, rel_path: str) -> Optional[ScannedFile]:
+        """Returns the path as a ScannedFile if it is an indexable file, otherwise None."""
+        rel_path = self._normalize(rel_path)
+        abs_path = os.path.join(self.root, rel_path)
+        if not self._has_supported_extension(rel_path) or not os.path.isfile(abs_path):
+            return None
+        if self.is_ignored(rel_path, is_dir=False):
+            return None
+        try:
+            stat = os.stat(abs_path)
+        except OSError:
+            return None
+        if stat.st_size > self.max_file_size:
+            return None
+        return ScannedFile(rel_path, abs_path, stat.st_size, stat.st_mtime)
+
+    def scan(self, rel_dir: str = "") -> List[ScannedFile]:
+        """Returns every indexable file under the root (or under `rel_dir`), without reading any of them."""
+        rel_dir = self._normalize(rel_dir)
+        if rel_dir and self.is_ignored(rel_dir, is_dir=True):
+            return []
+        # The loop below adds each directory's own .gitignore when it enters it
+        parent = os.path.dirname(rel_dir)
+        rules = self._rules_for(parent) if rel_dir else self._base_rules()
+        found = []
+        stack = [(os.path.join(self.root, rel_dir) if rel_dir else self.root, rel_dir)]
+        while stack:
+            abs_dir, rel_dir = stack.pop()
+            rules.rules.extend(self._gitignore_rules(rel_dir))
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not rules.is_ignored(rel_path, is_dir=True):
+                            stack.append((entry.path, rel_path))
+                        continue
+                    if not entry.is_file() or not self._has_supported_extension(entry.name):
+                        continue
+                    if rules.is_ignored(rel_path, is_dir=False):
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if stat.st_size > self.max_file_size:
+                    continue
+                found.append(ScannedFile(rel_path, entry.path, stat.st_size, stat.st_mtime))
+        return found
+
+    def snapshot(self) -> Dict[str, Tuple[int, float]]:
+        """Maps every indexable file to its (size, mtime); used for change detection by polling."""
+        return {f.path: (f.size, f.mtime) for f in self.scan()}
+
+    @staticmethod
+    def read_text(abs_path: str) -> Optional[str]:
+        """Reads a file as UTF-8 text; returns None for binaries and unreadable files."""
+        try:
+            with open(abs_path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if b"\0" in raw[:BINARY_SNIFF_BYTES]:
+            return None
+        try:
+            return raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    def read_files(self, files: List[ScannedFile]) -> List[Tuple[ScannedFile, str]]:
+        """Reads the given files concurrently, dropping binaries and undecodable files."""
+        if not files:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            contents = list(pool.map(lambda f: self.read_text(f.abs_path), files))
+        return [(f, text) for f, text in zip(files, contents) if text is not None]
@@ -1,7 +1,13 @@
 # team/agents.py
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import config
+from team.plan import PLAN_FORMAT_INSTRUCTIONS
+from services.agent_runtime import ConcurrentAgentExecutor
+
+TEAM_ROLES = ["Architect", "Coder", "Tester", "Reviewer"]
 
 CORE_AGENT_CONSTITUTION = """
     **Core Directives:**
@@ -15,32 +21,42 @@ CORE_AGENT_CONSTITUTION = """
     """
 
 def create_agent(llm: ChatOpenAI, tools: list, system_prompt: str, agent_name: str) -> AgentExecutor:
-    """Helper function to create an agent executor."""
+    """Helper function to create an agent executor (run it with `run_agent` to get concurrent tool calls)."""
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        # A message, not a template: the prompts contain literal braces (e.g. the plan's JSON format)
+        SystemMessage(content=system_prompt),
         MessagesPlaceholder(variable_name="messages"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
     agent = create_openai_tools_agent(llm, tools, prompt)
-    return AgentExecutor(name=agent_name, agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+    return ConcurrentAgentExecutor(name=agent_name, agent=agent, tools=tools, verbose=True, handle_parsing_errors=True,
+                                   workspace_root=config.WORKING_DIR)
 
-def create_team_supervisor(llm: ChatOpenAI, all_tools: list, file_tools: list):
+def create_team_supervisor(llm, all_tools: list, file_tools: list, code_nav_tools: list = None):
     """
     Creates the supervisor and all specialized agents for the team.
+    `file_tools` should include the editing tools of tools/edit_tools.py (apply_patch, read_many_files, write_many_files).
+    `llm` is either one model shared by all agents or a dict of models keyed by role (see TEAM_ROLES).
+    `code_nav_tools` (e.g. find_definition / find_references) are given to the Coder and Tester.
     """
+    code_nav_tools = code_nav_tools or []
+    role_llms = llm if isinstance(llm, dict) else {role: llm for role in TEAM_ROLES}
     # Define system prompts for each agent
     architect_prompt = (
         "You are an expert software architect. Your role is to take a high-level development task "
         "and create a detailed, step-by-step technical plan. "
         "**Crucially, you must first decide on the best programming language and technologies for the task** and specify them in the plan. "
         "The plan must be clear, concise, and cover all necessary files, functions, and logic. "
-        "You do not write code or test. Your only output is the plan."
+        "You do not write code or test. Your only output is the plan.\n\n"
+        + PLAN_FORMAT_INSTRUCTIONS
     )
     
     coder_prompt = (
         "**Your Role**: You are an expert **polyglot programmer**, fluent in all programming languages. "
         "Your task is to take a technical plan and write the code in the **exact language and framework specified in the plan**. "
-        "You must follow the plan precisely. Use the file management tools to write the code to the specified files. "
+        "You must follow the plan precisely. Use the file management tools to write the code to the specified files: "
+        "`write_many_files` to create several files in one step, and `apply_patch` (a unified diff or SEARCH/REPLACE blocks) "
+        "to change existing files instead of rewriting them. Use `read_many_files` to read several files at once. "
         "Ensure the code is clean, efficient, and well-commented.\n\n"
         + CORE_AGENT_CONSTITUTION
     )
@@ -49,9 +65,10 @@ def create_team_supervisor(llm: ChatOpenAI, all_tools: list, file_tools: list):
         "**Your Role**: You are a meticulous Quality Assurance (QA) engineer. Your task is to test the code written by the Coder. "
         "1. Identify the programming language from the plan or the code files. "
         "2. Write a comprehensive test file using the **standard testing framework for that language** (e.g., `pytest` for Python, `Jest` for JavaScript/TypeScript, `JUnit` for Java, etc.). "
-        "3. Use the `shell` tool to install any needed dependencies and run the tests. "
-        "4. Report the test results. If there are failures, provide the full error output. "
-        "Do not proceed to the Reviewer if tests are failing.\n\n"
+        "Put it where that framework discovers tests (e.g. `test_*.py` for pytest, `*.test.js` with `jest` in package.json's devDependencies). "
+        "3. Use the `shell` tool to install any needed dependencies. "
+        "You do not need to report results: after you finish, the test suite is run automatically and its results "
+        "are passed on to the Coder and the Reviewer.\n\n"
         + CORE_AGENT_CONSTITUTION
     )
 
@@ -63,10 +80,10 @@ def create_team_supervisor(llm: ChatOpenAI, all_tools: list, file_tools: list):
     )
     
     # Create the agents
-    architect_agent = create_agent(llm, [], architect_prompt, "Architect")
-    coder_agent = create_agent(llm, file_tools, coder_prompt, "Coder")
-    tester_agent = create_agent(llm, all_tools, tester_prompt, "Tester")
-    reviewer_agent = create_agent(llm, file_tools, reviewer_prompt, "Reviewer")
+    architect_agent = create_agent(role_llms["Architect"], [], architect_prompt, "Architect")
+    coder_agent = create_agent(role_llms["Coder"], file_tools + code_nav_tools, coder_prompt, "Coder")
+    tester_agent = create_agent(role_llms["Tester"], all_tools + code_nav_tools, tester_prompt, "Tester")
+    reviewer_agent = create_agent(role_llms["Reviewer"], file_tools, reviewer_prompt, "Reviewer")
 
     return {
         "Architect": architect_agent,
@@ -0,0 +1,57 @@
+# team/budget.py
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional
+import config
+from services.test_execution import run_succeeded
+
+
+@dataclass
+class TeamBudget:
+    """
+    Limits of one team run. A run is stopped (and its best result so far
+    returned) once its steps have taken `max_seconds` of wall-clock time
+    (time between an interruption and a resume doesn't count) or
+    `max_tokens` LLM tokens, or when the next step would run an agent more
+    often than its entry in `max_node_iterations`. A limit of 0 means unlimited.
+    """
+    max_seconds: float = 0
+    max_tokens: int = 0
+    max_node_iterations: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "TeamBudget":
+        """Builds a budget from the configured defaults, overridden by `data` (e.g. a run's own limits)."""
+        merged = {**config.TEAM_BUDGET, **(data or {})}
+        iterations = {**config.TEAM_BUDGET.get("max_node_iterations", {}), **merged.get("max_node_iterations", {})}
+        return cls(merged.get("max_seconds", 0), merged.get("max_tokens", 0), iterations)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def exhausted(self, state: dict, next_node: Optional[str] = None) -> Optional[str]:
+        """Returns why the run must stop before `next_node`, or None if it may continue."""
+        elapsed = state.get("elapsed_seconds", 0)
+        if self.max_seconds and elapsed >= self.max_seconds:
+            return f"time budget of {self.max_seconds:.0f}s exhausted ({elapsed:.0f}s elapsed)"
+        tokens = state.get("tokens_used", 0)
+        if self.max_tokens and tokens >= self.max_tokens:
+            return f"token budget of {self.max_tokens} exhausted ({tokens} used)"
+        iterations = state.get("node_iterations") or {}
+        nodes = [next_node] if next_node else list(iterations)
+        for node in nodes:
+            limit = self.max_node_iterations.get(node, 0)
+            if limit and iterations.get(node, 0) >= limit:
+                return f"{node} reached its limit of {limit} iterations"
+        return None
+
+
+def result_score(state: dict) -> int:
+    """How far a state got: 0 nothing, 1 code written, 2 tests passed, 3 tests passed and review approved."""
+    if not state.get("code"):
+        return 0
+    if not run_succeeded(state.get("test_run")):
+        return 1
+    if state.get("review_comments") and "lgtm" in state["review_comments"].lower():
+        return 3
+    return 2
+
@@ -0,0 +1,115 @@
+# team/changes.py
+import difflib
+import hashlib
+import os
+from typing import Dict, List, Optional
+import config
+from services.workspace_scanner import WorkspaceScanner
+
+# Files the team's agents may write; anything else in the workspace is not tracked
+TRACKED_EXTENSIONS = sorted(set(config.SUPPORTED_FILE_TYPES) | {
+    ".js", ".mjs", ".cjs", ".html", ".css", ".scss", ".toml", ".cfg", ".ini", ".sql", ".kt", ".swift", ".php", ".cs",
+})
+
+
+class WorkspaceChanges:
+    """
+    Tracks the workspace files the team writes by content hash. Every
+    snapshot also keeps a copy of each text file's content under its hash, so
+    later agents can be shown unified diffs against the version they last saw
+    instead of the full text of every file.
+    """
+    def __init__(self, root: str, blob_dir: str, max_file_size: int = 1_000_000):
+        self.root = os.path.abspath(root)
+        self.blob_dir = os.path.abspath(blob_dir)
+        extra_ignores = []
+        for inside in (self.blob_dir, os.path.abspath(config.INDEX_DIR)):
+            if inside.startswith(self.root + os.sep):
+                extra_ignores.append("/" + os.path.relpath(inside, self.root).replace(os.sep, "/") + "/")
+        self.scanner = WorkspaceScanner(self.root, TRACKED_EXTENSIONS, extra_ignore_patterns=extra_ignores,
+                                        max_file_size=max_file_size)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def snapshot(self) -> Dict[str, str]:
+        """Maps every tracked file to the hash of its content, storing the content of new versions."""
+        hashes = {}
+        for f in self.scanner.scan():
+            try:
+                with open(f.abs_path, "rb") as fh:
+                    raw = fh.read()
+            except OSError:
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            hashes[f.path] = digest
+            blob = self._blob_path(digest)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                with open(blob, "wb") as fh:
+                    fh.write(raw)
+        return hashes
+
+    @staticmethod
+    def changed(before: Dict[str, str], after: Dict[str, str]) -> List[str]:
+        """Paths added, modified or deleted between two snapshots."""
+        return sorted(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+
+    def read(self, digest: Optional[str]) -> List[str]:
+        """The lines of a stored version; empty for a missing file or a binary one."""
+        if not digest:
+            return []
+        text = WorkspaceScanner.read_text(self._blob_path(digest))
+        return [line + "\n" for line in text.splitlines()] if text is not None else []
+
+    def manifest(self, files: Dict[str, str]) -> str:
+        """One line per tracked file: path, line count and short hash."""
+        if not files:
+            return "(no files written yet)"
+        return "\n".join(f"- {path} ({len(self.read(digest))} lines, {digest[:8]})"
+                         for path, digest in sorted(files.items()))
+
+    def diff(self, seen: Dict[str, str], current: Dict[str, str], max_chars: int) -> str:
+        """
+        Unified diffs of every file in `current` that differs from the version in
+        `seen`. Once `max_chars` is used up, the remaining files are only named,
+        so the agent reads them with its file tools if it needs to.
+        """
+        parts, omitted, used = [], [], 0
+        for path in self.changed(seen, current):
+            old, new = self.read(seen.get(path)), self.read(current.get(path))
+            diff = "".join(difflib.unified_diff(old, new, f"a/{path}" if path in seen else "/dev/null",
+                                                f"b/{path}" if path in current else "/dev/null"))
+            if not diff:
+                continue
+            if used + len(diff) > max_chars:
+                omitted.append(path)
+                continue
+            parts.append(diff)
+            used += len(diff)
+        if not parts and not omitted:
+            return "(no changes since you last looked)"
+        if omitted:
+            parts.append(f"Diffs omitted for size (read these files directly): {', '.join(omitted)}\n")
+        return "".join(parts)
+
+    def briefing(self, state: dict, agent: str) -> str:
+        """The manifest of the team's files plus the diffs since `agent` last looked at them."""
+        files = state.get("workspace_files") or {}
+        seen = (state.get("agent_views") or {}).get(agent, {})
+        scope = "since you last looked" if seen else "(all new to you)"
+        return (
+            f"Files written by the team:\n{self.manifest(files)}\n\n"
+            f"Changes {scope}:\n{self.diff(seen, files, config.TEAM_DIFF_MAX_CHARS)}"
+        )
+
+
+def viewed(state: dict, agent: str) -> Dict[str, Dict[str, str]]:
+    """`agent_views` updated to record that `agent` has now seen the current files."""
+    views = dict(state.get("agent_views") or {})
+    views[agent] = dict(state.get("workspace_files") or {})
+    return views
+
+
+def create_workspace_changes() -> WorkspaceChanges:
+    return WorkspaceChanges(config.WORKING_DIR, config.TEAM_BLOBS_DIR)
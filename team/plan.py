@@ -0,0 +1,59 @@
+# team/plan.py
+import json
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List
+
+# Appended to the Architect's prompt so the plan ends with a machine-readable file list
+PLAN_FORMAT_INSTRUCTIONS = (
+    "End the plan with a JSON code block listing every file to create, in this exact shape:\n"
+    "```json\n"
+    '{"files": [{"path": "app/models.py", "responsibility": "what this file contains", '
+    '"depends_on": ["paths of other planned files it imports"]}]}\n'
+    "```\n"
+    "Keep files independent where you can: coders write files in parallel, and a file only waits for its dependencies."
+)
+
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+@dataclass
+class PlannedFile:
+    path: str
+    responsibility: str
+    depends_on: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_planned_files(plan: str) -> List[PlannedFile]:
+    """
+    Extracts the file list from the Architect's plan (its last JSON block).
+    Returns an empty list if the plan has none or it is malformed, in which
+    case the team falls back to a single Coder.
+    """
+    for block in reversed(_JSON_BLOCK_RE.findall(plan)):
+        try:
+            data = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        files = []
+        for entry in data.get("files", []) if isinstance(data, dict) else []:
+            if not isinstance(entry, dict) or not entry.get("path"):
+                continue
+            depends_on = entry.get("depends_on") or []
+            files.append(PlannedFile(
+                str(entry["path"]).strip(),
+                str(entry.get("responsibility", "")).strip(),
+                [str(dep).strip() for dep in depends_on if isinstance(dep, str)],
+            ))
+        if files:
+            return files
+    return []
+
+
+def dependency_order(files: List[dict]) -> Dict[str, List[str]]:
+    """Maps each planned path to the planned paths it waits for (unknown and self dependencies dropped)."""
+    paths = {f["path"] for f in files}
+    return {f["path"]: [dep for dep in f.get("depends_on", []) if dep in paths and dep != f["path"]] for f in files}
@@ -0,0 +1,107 @@
+# team/runs.py
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+@dataclass
+class TeamRun:
+    run_id: str
+    task: str
+    status: str  # "running", "interrupted", "failed" or "done"
+    created_at: float
+    updated_at: float
+    parent_run_id: Optional[str] = None
+
+
+class TeamRunStore:
+    """
+    Persists team runs: a SQLite LangGraph checkpointer (one thread per run,
+    a checkpoint after every completed node) plus a table of run ids, tasks
+    and statuses. A run interrupted by a crash, Ctrl-C or an API error can be
+    resumed from its last completed node, or forked into a new run.
+    """
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS team_runs ("
+            " run_id TEXT PRIMARY KEY, task TEXT NOT NULL, status TEXT NOT NULL,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL, parent_run_id TEXT)"
+        )
+        self._conn.commit()
+        self.checkpointer = SqliteSaver(self._conn)
+
+    @staticmethod
+    def config_for(run_id: str) -> dict:
+        return {"configurable": {"thread_id": run_id}}
+
+    def create_run(self, task: str, parent_run_id: Optional[str] = None) -> TeamRun:
+        now = time.time()
+        run = TeamRun(uuid.uuid4().hex[:8], task, "running", now, now, parent_run_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO team_runs (run_id, task, status, created_at, updated_at, parent_run_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (run.run_id, run.task, run.status, run.created_at, run.updated_at, run.parent_run_id),
+            )
+            self._conn.commit()
+        return run
+
+    def set_status(self, run_id: str, status: str):
+        with self._lock:
+            self._conn.execute("UPDATE team_runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                               (status, time.time(), run_id))
+            self._conn.commit()
+
+    def get_run(self, run_id: str) -> Optional[TeamRun]:
+        """Looks a run up by its id or a unique prefix of it."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, task, status, created_at, updated_at, parent_run_id FROM team_runs WHERE run_id LIKE ?",
+                (run_id + "%",),
+            ).fetchall()
+        return TeamRun(*rows[0]) if len(rows) == 1 else None
+
+    def list_runs(self, limit: int = 20) -> List[TeamRun]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, task, status, created_at, updated_at, parent_run_id FROM team_runs"
+                " ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [TeamRun(*row) for row in rows]
+
+    def next_nodes(self, app, run_id: str) -> tuple:
+        """The nodes a resumed run would execute next; empty if the run has finished."""
+        return app.get_state(self.config_for(run_id)).next
+
+    def fork(self, run_id: str) -> Optional[TeamRun]:
+        """
+        Starts a new run from the latest checkpoint of `run_id`: the fork gets a
+        copy of that checkpoint (and any writes of nodes that had already
+        finished in the interrupted step), so resuming it continues from the
+        same point while the original run stays untouched.
+        """
+        source = self.get_run(run_id)
+        if source is None:
+            return None
+        latest = self.checkpointer.get_tuple(self.config_for(source.run_id))
+        fork = self.create_run(source.task, parent_run_id=source.run_id)
+        if latest is not None:
+            target = {"configurable": {"thread_id": fork.run_id, "checkpoint_ns": ""}}
+            saved = self.checkpointer.put(target, latest.checkpoint, latest.metadata,
+                                          latest.checkpoint["channel_versions"])
+            pending = {}
+            for task_id, channel, value in latest.pending_writes or []:
+                pending.setdefault(task_id, []).append((channel, value))
+            for task_id, writes in pending.items():
+                self.checkpointer.put_writes(saved, writes, task_id)
+        self.set_status(fork.run_id, "interrupted")
+        return self.get_run(fork.run_id)
@@ -1,5 +1,5 @@
 # team/state.py
-from typing import TypedDict, List
+from typing import TypedDict, List, Dict
 class TeamState(TypedDict):
     """
     Represents the shared state of the AI development team.
@@ -10,17 +10,43 @@ class TeamState(TypedDict):
     # The detailed plan created by the Architect
     plan: str
     
+    # The files of the plan (path, responsibility, depends_on), parsed from its JSON block
+    planned_files: List[dict]
+
     # The code generated by the Coder
     code: str
     
-    # The file path for the generated code
+    # The file path for the generated code (the main file the Coder wrote)
     code_file_path: str
+
+    # The workspace files the team has written, mapped to the hash of their current content
+    workspace_files: Dict[str, str]
+
+    # Per agent, the file hashes it was last shown, so it next gets only the diffs since then
+    agent_views: Dict[str, Dict[str, str]]
     
-    # The results from the Tester
+    # The results from the Tester: a readable summary, and the structured result of the
+    # last test run (services/test_execution.TestRunResult as a dict)
     test_results: str
+    test_run: dict
+
+    # Content hashes of the workspace files at the last test run, to select affected tests
+    test_snapshot: Dict[str, str]
     
     # The review comments from the Code Reviewer
     review_comments: str
     
     # A log of actions taken by the team to show progress
-    agent_log: List[str]
\ No newline at end of file
+    agent_log: List[str]
+
+    # The run's budget (see team/budget.py) and what has been spent against it
+    budget: dict
+    node_iterations: Dict[str, int]
+    tokens_used: int
+    elapsed_seconds: float
+
+    # The best result reached so far, returned if the budget runs out
+    best_result: dict
+
+    # Why the run was stopped early, if it was
+    stop_reason: str
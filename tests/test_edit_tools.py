@@ -0,0 +1,44 @@
+import pytest
+from tools.edit_tools import PatchError, apply_patch
+
+
+def _workspace(tmp_path, text):
+    (tmp_path / "f.txt").write_text(text)
+    return str(tmp_path)
+
+
+def test_hunk_with_unmatched_context_fails(tmp_path):
+    root = _workspace(tmp_path, "x\ny\nz\n")
+    with pytest.raises(PatchError):
+        apply_patch(root, "--- a/f.txt\n+++ b/f.txt\n@@ -2,1 +2,2 @@\n WRONG\n+new\n")
+    assert (tmp_path / "f.txt").read_text() == "x\ny\nz\n"
+
+
+def test_hunk_with_matching_context_applies(tmp_path):
+    root = _workspace(tmp_path, "x\ny\nz\n")
+    apply_patch(root, "--- a/f.txt\n+++ b/f.txt\n@@ -2,1 +2,2 @@\n y\n+new\n")
+    assert (tmp_path / "f.txt").read_text() == "x\ny\nnew\nz\n"
+
+
+def test_pure_insertion_without_line_numbers_appends(tmp_path):
+    root = _workspace(tmp_path, "x\ny\nz\n")
+    apply_patch(root, "--- a/f.txt\n+++ b/f.txt\n@@ @@\n+new\n")
+    assert (tmp_path / "f.txt").read_text() == "x\ny\nz\nnew\n"
+
+
+def test_zero_context_insertion_goes_after_old_start(tmp_path):
+    root = _workspace(tmp_path, "a\nb\nc\n")
+    # As generated by `diff -U0`
+    apply_patch(root, "--- a/f.txt\n+++ b/f.txt\n@@ -2,0 +3 @@\n+NEW\n")
+    assert (tmp_path / "f.txt").read_text() == "a\nb\nNEW\nc\n"
+
+
+def test_insertion_at_line_zero_creates_new_file(tmp_path):
+    apply_patch(str(tmp_path), "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n")
+    assert (tmp_path / "new.txt").read_text() == "hello\n"
+
+
+def test_insertion_at_line_zero_goes_at_the_top(tmp_path):
+    root = _workspace(tmp_path, "a\nb\n")
+    apply_patch(root, "--- a/f.txt\n+++ b/f.txt\n@@ -0,0 +1 @@\n+TOP\n")
+    assert (tmp_path / "f.txt").read_text() == "TOP\na\nb\n"
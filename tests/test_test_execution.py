@@ -0,0 +1,139 @@
+import os
+from services.test_execution import TestFailure, TestRunner, TestRunResult, _python_module_names
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "test_execution")
+
+
+def _fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+def _write(root, files):
+    for path, text in files.items():
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(text)
+
+
+# --- Report parsers ---
+
+def test_parse_junit_counts_outcomes_and_ids():
+    result = TestRunResult("pytest", "", 1)
+    TestRunner("/workspace")._parse_junit(_fixture("junit.xml"), result)
+    assert (result.passed, result.failed, result.errors, result.skipped) == (2, 1, 1, 1)
+    assert [f.test_id for f in result.failures] == ["tests/test_sample.py::test_fails", "tests/test_sample.py::test_errors"]
+    assert result.failures[0].file == "tests/test_sample.py"
+    assert "assert 1 == 2" in result.failures[0].message
+
+
+def test_parse_junit_without_report_adds_nothing():
+    result = TestRunResult("pytest", "", 1)
+    TestRunner("/workspace")._parse_junit(_fixture("missing.xml"), result)
+    assert result.total == 0
+
+
+def test_run_pytest_without_report_is_an_error(tmp_path, monkeypatch):
+    runner = TestRunner(str(tmp_path))
+    # e.g. pytest is not installed in the interpreter: exit code 1, no report
+    monkeypatch.setattr(runner, "_execute", lambda command, env=None: (1, "No module named pytest", 0.1))
+    result = runner._run_pytest(str(tmp_path), None, None)
+    assert result.errors == 1 and not result.no_tests and not result.succeeded
+
+
+def test_parse_jest_counts_outcomes_and_suite_failures():
+    result = TestRunResult("jest", "", 1)
+    assert TestRunner("/workspace")._parse_jest(_fixture("jest.json"), result)
+    assert (result.passed, result.failed, result.errors, result.skipped) == (3, 1, 1, 2)
+    assert [(f.test_id, f.file) for f in result.failures] == [
+        ("src/sum.test.js > sum handles negatives", "src/sum.test.js"),
+        ("src/broken.test.js", "src/broken.test.js"),
+    ]
+
+
+def test_parse_go_records_failing_packages():
+    result = TestRunResult("go", "", 1)
+    with open(_fixture("go_test.jsonl"), encoding="utf-8") as f:
+        TestRunner("/workspace")._parse_go(f.read(), result, "example.com/m")
+    assert (result.passed, result.failed, result.errors, result.skipped) == (0, 1, 1, 1)
+    # A failing test, and a package that failed to build (reported as text only)
+    assert [(f.test_id, f.package) for f in result.failures] == [("example.com/m/c::TestC", "c"), ("example.com/m/b", "b")]
+
+
+def test_go_package_dir():
+    assert TestRunner._go_package_dir("example.com/m", "example.com/m") == ""
+    assert TestRunner._go_package_dir("example.com/m", "example.com/m/a/b") == "a/b"
+    assert TestRunner._go_package_dir("example.com/m", "example.com/other") is None
+
+
+def test_parse_cargo_sums_test_binaries():
+    result = TestRunResult("cargo", "", 101)
+    with open(_fixture("cargo.txt"), encoding="utf-8") as f:
+        TestRunner._parse_cargo(f.read(), result)
+    assert (result.passed, result.failed, result.skipped) == (3, 1, 1)
+    assert [f.test_id for f in result.failures] == ["tests::subtracts"]
+
+
+def test_summary_without_timing_is_stable():
+    failure = TestFailure("t.py::x", "t.py", "assert 1 == 2")
+    runs = [TestRunResult("pytest", "", 1, failed=1, duration=duration, failures=[failure],
+                          output_tail=f"1 failed in {duration}s") for duration in (0.4, 2.7)]
+    assert runs[0].summary() != runs[1].summary()
+    assert runs[0].summary(timing=False) == runs[1].summary(timing=False)
+    assert "FAILED t.py::x: assert 1 == 2" in runs[0].summary(timing=False)
+
+
+def test_failures_without_package_load_from_older_state():
+    data = TestRunResult("pytest", "", 1, failures=[TestFailure("t.py::x", "t.py", "boom")]).to_dict()
+    del data["failures"][0]["package"]
+    assert TestRunResult.from_dict(data).failures[0].package is None
+
+
+# --- Selection ---
+
+PYTHON_TREE = {
+    "app/__init__.py": "",
+    "app/core.py": "def f():\n    return 1\n",
+    "app/service.py": "from .core import f\n\ndef g():\n    return f()\n",
+    "app/api.py": "import app.service\n",
+    "app/other.py": "X = 1\n",
+    "tests/test_api.py": "from app import api\n",
+    "tests/test_other.py": "from app.other import X\n",
+}
+
+
+def test_affected_follows_imports_transitively(tmp_path):
+    _write(tmp_path, PYTHON_TREE)
+    runner = TestRunner(str(tmp_path))
+    index = runner._import_index(path for path in PYTHON_TREE)
+    affected = TestRunner._affected(index, ["app/core.py"], _python_module_names)
+    assert affected == {"app/core.py", "app/service.py", "app/api.py", "tests/test_api.py"}
+
+
+def test_pytest_selection_keeps_previous_failures_and_indirect_importers(tmp_path):
+    _write(tmp_path, PYTHON_TREE)
+    previous = TestRunResult("pytest", "", 1, failed=1,
+                             failures=[TestFailure("tests/test_other.py::test_x", "tests/test_other.py", "")])
+    selection = TestRunner(str(tmp_path))._pytest_selection(["app/core.py"], previous)
+    assert selection == ["tests/test_api.py", "tests/test_other.py::test_x"]
+
+
+def test_pytest_selection_runs_everything_when_imports_are_unknown(tmp_path):
+    _write(tmp_path, {**PYTHON_TREE, "app/half_written.py": "def (\n"})
+    previous = TestRunResult("pytest", "", 0, passed=2)
+    assert TestRunner(str(tmp_path))._pytest_selection(["app/core.py"], previous) == []
+
+
+def test_affected_go_packages(tmp_path):
+    tree = {
+        "go.mod": "module example.com/m\n",
+        "a/a.go": "package a\n",
+        "b/b.go": 'package b\n\nimport "example.com/m/a"\n',
+        "c/c.go": 'package c\n\nimport (\n\t"fmt"\n\t"example.com/m/b"\n)\n',
+        "d/d.go": "package d\n",
+    }
+    _write(tmp_path, tree)
+    runner = TestRunner(str(tmp_path))
+    index = runner._import_index(path for path in tree if path.endswith(".go"))
+    affected = TestRunner._affected(index, {"a"}, lambda d: [f"example.com/m/{d}" if d else "example.com/m"],
+                                    os.path.dirname)
+    assert affected == {"a", "b", "c"}
@@ -0,0 +1,49 @@
+import os
+import time
+import config
+from services.vectorstore_service import VectorStoreService
+
+
+def _service(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDINGS_BACKEND", "fake")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("def alpha():\n    return 1\n")
+    service = VectorStoreService(str(tmp_path), config.SUPPORTED_FILE_TYPES, "test",
+                                 index_dir=str(tmp_path / ".idx"))
+    service.reindex()
+    return service
+
+
+def _count_store_writes(service, monkeypatch):
+    calls = []
+    for name in ("_clone_store", "_save_index"):
+        original = getattr(service, name)
+        monkeypatch.setattr(service, name, lambda original=original, name=name: calls.append(name) or original())
+    return calls
+
+
+def test_update_without_indexable_change_leaves_the_store_alone(tmp_path, monkeypatch):
+    service = _service(tmp_path, monkeypatch)
+    calls = _count_store_writes(service, monkeypatch)
+    generation = service.generation
+    (tmp_path / "notes.bin").write_bytes(b"\0")
+    service.update_paths(["notes.bin"])
+    # Same content, new mtime: only the manifest's record is refreshed
+    later = time.time() + 5
+    os.utime(tmp_path / "src" / "a.py", (later, later))
+    report = service.update_paths(["src/a.py"])
+    assert calls == [] and service.generation == generation
+    assert report.files_unchanged == 1
+    assert service.manifest.get("src/a.py").mtime == os.stat(tmp_path / "src" / "a.py").st_mtime
+
+
+def test_update_with_changed_content_publishes_a_new_generation(tmp_path, monkeypatch):
+    service = _service(tmp_path, monkeypatch)
+    calls = _count_store_writes(service, monkeypatch)
+    generation = service.generation
+    with open(tmp_path / "src" / "a.py", "a") as f:
+        f.write("def beta():\n    return 2\n")
+    report = service.update_paths(["src/a.py"])
+    assert calls == ["_clone_store", "_save_index"] and service.generation == generation + 1
+    assert report.files_embedded == 1
+    assert [d.name for d in service.get_symbol_index().find_definition("beta")] == ["beta"]
@@ -1,5 +1,7 @@
 from langchain.tools import BaseTool
 from services.vectorstore_service import VectorStoreService
+from services.context_packer import ContextPacker
+import config
 from typing import Type
 from pydantic import BaseModel, Field
 
@@ -11,25 +13,28 @@ class CodebaseQATool(BaseTool):
     name: str = "codebase_qa_tool"
     description: str = (
         "Use this tool to ask questions about the current codebase. "
-        "It performs a semantic search over the files in the workspace "
+        "It combines an exact identifier/keyword search with a semantic search over the files "
+        "in the workspace, so it is also the fastest way to find where a function or class is defined, "
         "and returns the most relevant code snippets. "
         "Input should be a clear, specific question about the code."
     )
     args_schema: Type[BaseModel] = CodebaseQAToolInput
     vectorstore_service: VectorStoreService
+    # How many chunks to retrieve and how many tokens of them to hand back to the LLM
+    candidate_chunks: int = config.QA_CANDIDATE_CHUNKS
+    token_budget: int = config.QA_CONTEXT_TOKEN_BUDGET
 
     def _run(self, query: str) -> str:
-        retriever = self.vectorstore_service.get_retriever()
-        if not retriever:
+        if not self.vectorstore_service.has_index():
             return "Vector store not available. The workspace might be empty or has not been indexed yet. Try using the 'ls' command to see files first."
 
         try:
-            results = retriever.invoke(query)
+            results = self.vectorstore_service.search(query, k=self.candidate_chunks)
             if not results:
                 return "I couldn't find any relevant code snippets for your question."
-            
-            # Format the results for the LLM
-            context = "\n---\n".join([doc.page_content for doc in results])
+
+            # Merge overlapping chunks, label them with file and lines, and fit them into the budget
+            context = ContextPacker(self.token_budget, config.AGENT_MODEL).pack(results)
             return f"Here are the most relevant code snippets I found:\n\n{context}"
         except Exception as e:
             return f"An error occurred while searching the codebase: {e}"
\ No newline at end of file
@@ -1,9 +1,48 @@
-from langchain_community.tools import ShellTool
+from typing import List, Optional, Type, Union
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from services.shell_sessions import ShellSessionPool, get_shell_pool
 import config
-def create_git_tool():
+
+class PersistentShellInput(BaseModel):
+    commands: Union[str, List[str]] = Field(description="The shell command(s) to run, as one string or a list run in order.")
+    timeout: Optional[int] = Field(default=None, description=f"Seconds to wait for the command (at most {config.SHELL_COMMAND_TIMEOUT_SECONDS}).")
+
+class PersistentShellTool(BaseTool):
+    """
+    Runs commands in a long-lived shell session of the pool, so `cd`, exported
+    variables and activated virtualenvs carry over between calls.
+    """
+    name: str = "shell"
+    description: str = (
+        "Run shell commands in a persistent bash session in the workspace. "
+        "The working directory, exported variables and activated virtualenvs are kept between calls, "
+        "so run setup commands (e.g. `source venv/bin/activate`) only once. "
+        "Commands have a timeout, and very long output is truncated with the full log saved to a file."
+    )
+    args_schema: Type[BaseModel] = PersistentShellInput
+    pool: ShellSessionPool
+    session_key: str
+
+    def _run(self, commands: Union[str, List[str]], timeout: Optional[int] = None) -> str:
+        command = "\n".join(commands) if isinstance(commands, list) else commands
+        try:
+            return self.pool.run(self.session_key, command, timeout).format()
+        except OSError as e:
+            return f"An error occurred while running the command: {e}"
+
+    def cancel(self):
+        """Stops this tool's running command (called when the agent's run is cancelled)."""
+        self.pool.cancel(self.session_key)
+
+def create_shell_tool(session_key: str, pool: ShellSessionPool = None):
+    """Creates the general `shell` tool for one agent's (or run's) session."""
+    return PersistentShellTool(pool=pool or get_shell_pool(), session_key=session_key)
+
+def create_git_tool(session_key: str = "single_agent", pool: ShellSessionPool = None):
     """
     Creates a specialized tool for Git operations.
-    This is a pre-configured ShellTool.
+    It shares the agent's shell session, so it sees the same working directory.
     """
     description = (
         "A tool for executing Git commands. Use this for version control tasks like:"
@@ -15,17 +54,18 @@ def create_git_tool():
         "\n- `git branch` to manage branches."
         "\nAlways run in the project's root directory."
     )
-    git_tool = ShellTool(
+    git_tool = PersistentShellTool(
         name="git_tool",
         description=description,
-        working_directory=config.WORKING_DIR
+        pool=pool or get_shell_pool(),
+        session_key=session_key,
     )
     return git_tool
 
-def create_docker_tool():
+def create_docker_tool(session_key: str = "single_agent", pool: ShellSessionPool = None):
     """
     Creates a specialized tool for Docker operations.
-    This is a pre-configured ShellTool.
+    It shares the agent's shell session, so it sees the same working directory.
     """
     description = (
         "A tool for executing Docker commands. Use this for containerization tasks like:"
@@ -35,9 +75,10 @@ def create_docker_tool():
         "\n- `docker ps` to list running containers."
         "\nEnsure Docker Desktop or Docker Engine is running on the system."
     )
-    docker_tool = ShellTool(
+    docker_tool = PersistentShellTool(
         name="docker_tool",
         description=description,
-        working_directory=config.WORKING_DIR
+        pool=pool or get_shell_pool(),
+        session_key=session_key,
     )
-    return docker_tool
\ No newline at end of file
+    return docker_tool
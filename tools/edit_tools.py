@@ -0,0 +1,349 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+import config
+
+_HUNK_HEADER_RE = re.compile(r"^@@\s*(?:-(\d+)(?:,(\d+))?\s+\+(\d+)(?:,(\d+))?)?\s*@@")
+_SEARCH_REPLACE_RE = re.compile(
+    r"^([^\n]+?)[ \t]*\n<{5,9} SEARCH[ \t]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+# Leading/trailing context lines of a hunk that may be ignored when the hunk doesn't match as given
+MAX_CONTEXT_FUZZ = 2
+# Line comparisons tried in order: exact, ignoring trailing whitespace, ignoring indentation too
+_LINE_MATCHERS: List[Callable[[str], str]] = [lambda line: line, str.rstrip, str.strip]
+
+
+class PatchError(Exception):
+    pass
+
+
+@dataclass
+class _Hunk:
+    old_start: Optional[int]  # 1-based line in the original file, None if the header had no numbers
+    lines: List[Tuple[str, str]] = field(default_factory=list)  # (" " | "-" | "+", text)
+
+    @property
+    def old(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+
+    @property
+    def new(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "-"]
+
+
+@dataclass
+class _FilePatch:
+    old_path: Optional[str]  # None for a new file
+    new_path: Optional[str]  # None for a deleted file
+    hunks: List[_Hunk] = field(default_factory=list)
+
+
+def _strip_prefix(path: str) -> Optional[str]:
+    path = path.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith(("a/", "b/")) else path
+
+
+def parse_unified_diff(patch: str) -> List[_FilePatch]:
+    files: List[_FilePatch] = []
+    lines = patch.splitlines()
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            files.append(_FilePatch(_strip_prefix(lines[i][4:]), _strip_prefix(lines[i + 1][4:])))
+            i += 2
+            continue
+        header = _HUNK_HEADER_RE.match(lines[i])
+        if header and files:
+            hunk = _Hunk(int(header.group(1)) if header.group(1) else None)
+            i += 1
+            while i < len(lines) and not _HUNK_HEADER_RE.match(lines[i]) and not (
+                    lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")):
+                line = lines[i]
+                if line.startswith("\\"):
+                    pass  # "\ No newline at end of file"
+                elif line[:1] in (" ", "-", "+"):
+                    hunk.lines.append((line[0], line[1:]))
+                elif line == "":
+                    hunk.lines.append((" ", ""))
+                else:
+                    break
+                i += 1
+            # Blank lines after the last hunk are separators, not context
+            while hunk.lines and hunk.lines[-1] == (" ", ""):
+                hunk.lines.pop()
+            files[-1].hunks.append(hunk)
+            continue
+        i += 1
+    return files
+
+
+def _find_block(lines: List[str], block: List[str], expected: Optional[int]) -> List[int]:
+    """Start indexes where `block` matches in `lines` with the strictest matcher that finds any, nearest `expected` first."""
+    for normalize in _LINE_MATCHERS:
+        wanted = [normalize(line) for line in block]
+        starts = [i for i in range(len(lines) - len(block) + 1)
+                  if all(normalize(lines[i + j]) == wanted[j] for j in range(len(block)))]
+        if starts:
+            if expected is not None:
+                starts.sort(key=lambda i: abs(i - expected))
+            return starts
+    return []
+
+
+def _apply_hunk(lines: List[str], hunk: _Hunk, offset: int) -> Tuple[List[str], int]:
+    if not hunk.old:
+        # Pure insertion: an empty old range means "after line old_start" (0 for the top of the
+        # file); without line numbers, at the end of the file
+        at = len(lines) if hunk.old_start is None else max(0, min(hunk.old_start + offset, len(lines)))
+        return lines[:at] + hunk.new + lines[at:], offset + len(hunk.new)
+    expected = hunk.old_start - 1 + offset if hunk.old_start else None
+    tags = hunk.lines
+    for fuzz in range(MAX_CONTEXT_FUZZ + 1):
+        head = min(fuzz, next((k for k, (tag, _) in enumerate(tags) if tag != " "), 0))
+        tail = min(fuzz, next((k for k, (tag, _) in enumerate(reversed(tags)) if tag != " "), 0))
+        if fuzz and not head and not tail:
+            break
+        trimmed = _Hunk(hunk.old_start, tags[head:len(tags) - tail])
+        old, new = trimmed.old, trimmed.new
+        if not old:
+            break  # trimmed down to no context at all: nothing left to locate the hunk by
+        starts = _find_block(lines, old, None if expected is None else expected + head)
+        if starts:
+            at = starts[0]
+            # Later hunks are assumed to have drifted by as much as this one did
+            drift = at - (expected + head) if expected is not None else 0
+            return lines[:at] + new + lines[at + len(old):], offset + drift + len(new) - len(old)
+    preview = "\n".join(f"{tag}{text}" for tag, text in hunk.lines[:12])
+    raise PatchError(f"could not find where this hunk applies:\n{preview}")
+
+
+def _apply_search_replace(text: str, search: str, replace: str, path: str) -> str:
+    if not search.strip():
+        raise PatchError(f"empty SEARCH block for existing file `{path}`")
+    count = text.count(search)
+    if count == 1:
+        return text.replace(search, replace, 1)
+    if count > 1:
+        raise PatchError(f"SEARCH block matches {count} places in `{path}`; include more surrounding lines")
+    lines, block = text.splitlines(), search.splitlines()
+    starts = _find_block(lines, block, None)
+    if not starts:
+        raise PatchError(f"SEARCH block not found in `{path}`:\n{search[:500]}")
+    if len(starts) > 1:
+        raise PatchError(f"SEARCH block matches {len(starts)} places in `{path}`; include more surrounding lines")
+    at = starts[0]
+    return "\n".join(lines[:at] + replace.splitlines() + lines[at + len(block):]) + ("\n" if text.endswith("\n") else "")
+
+
+class _Workspace:
+    """Path confinement and text I/O for the editing tools, rooted at one directory."""
+    def __init__(self, root_dir: str):
+        self.root = os.path.realpath(root_dir)
+
+    def resolve(self, path: str) -> str:
+        full = os.path.realpath(os.path.join(self.root, path.strip().strip("`")))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            raise PatchError(f"`{path}` is outside the workspace")
+        return full
+
+    def read(self, path: str) -> Optional[str]:
+        full = self.resolve(path)
+        if not os.path.exists(full):
+            return None
+        with open(full, encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def write(self, path: str, text: str):
+        full = self.resolve(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+
+def apply_patch(root_dir: str, patch: str) -> Dict[str, Optional[str]]:
+    """
+    Applies a unified diff or search/replace blocks to files under `root_dir`.
+    All edits are computed before anything is written, so a patch that fails
+    anywhere changes nothing. Returns the new content of every touched path
+    (None for a deleted one).
+    """
+    workspace = _Workspace(root_dir)
+    results: Dict[str, Optional[str]] = {}
+
+    def current(path: str) -> Optional[str]:
+        return results[path] if path in results else workspace.read(path)
+
+    blocks = _SEARCH_REPLACE_RE.findall(patch)
+    if blocks:
+        for path, search, replace in blocks:
+            path = path.strip().strip("`")
+            text = current(path)
+            if text is None:
+                if search.strip():
+                    raise PatchError(f"`{path}` does not exist")
+                results[path] = replace
+            else:
+                results[path] = _apply_search_replace(text, search, replace, path)
+        return _commit(workspace, results)
+
+    file_patches = parse_unified_diff(patch)
+    if not file_patches:
+        raise PatchError("no unified diff (---/+++ headers and @@ hunks) or SEARCH/REPLACE blocks found")
+    for file_patch in file_patches:
+        path = file_patch.new_path or file_patch.old_path
+        if path is None:
+            raise PatchError("a file header has /dev/null on both sides")
+        if file_patch.new_path is None:
+            results[path] = None
+            continue
+        text = current(file_patch.old_path) if file_patch.old_path else None
+        if file_patch.old_path and text is None:
+            raise PatchError(f"`{file_patch.old_path}` does not exist")
+        newline = "\r\n" if text and "\r\n" in text else "\n"
+        lines = text.splitlines() if text else []
+        offset = 0
+        for hunk in file_patch.hunks:
+            try:
+                lines, offset = _apply_hunk(lines, hunk, offset)
+            except PatchError as e:
+                raise PatchError(f"`{path}`: {e}")
+        ends_with_newline = text is None or text.endswith("\n") or not text
+        results[path] = newline.join(lines) + (newline if lines and ends_with_newline else "")
+        if file_patch.old_path and file_patch.old_path != path:
+            results[file_patch.old_path] = None  # renamed
+    return _commit(workspace, results)
+
+
+def _commit(workspace: _Workspace, results: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    for path in results:
+        workspace.resolve(path)  # validate every path before writing any
+    for path, text in results.items():
+        if text is None:
+            full = workspace.resolve(path)
+            if os.path.exists(full):
+                os.remove(full)
+        else:
+            workspace.write(path, text)
+    return results
+
+
+class ApplyPatchInput(BaseModel):
+    patch: str = Field(description=(
+        "Either a unified diff (`--- a/path`, `+++ b/path`, `@@ ... @@` hunks; use /dev/null for new or deleted files), "
+        "or one or more search/replace blocks, each being the file path on its own line followed by\n"
+        "<<<<<<< SEARCH\n<exact existing lines>\n=======\n<replacement lines>\n>>>>>>> REPLACE"
+    ))
+
+
+class ApplyPatchTool(BaseTool):
+    """A tool to edit files with a diff instead of rewriting them whole."""
+    name: str = "apply_patch"
+    description: str = (
+        "Use this tool to change existing files: send only the lines that change, as a unified diff or as "
+        "search/replace blocks, instead of rewriting the whole file. Several files can be patched at once. "
+        "Context lines are matched tolerantly (line numbers may be off, whitespace may differ), "
+        "and if any part of the patch can't be applied, no file is changed."
+    )
+    args_schema: Type[BaseModel] = ApplyPatchInput
+    root_dir: str
+
+    def _run(self, patch: str) -> str:
+        try:
+            results = apply_patch(self.root_dir, patch)
+        except PatchError as e:
+            return f"Patch not applied, no files were changed: {e}"
+        except OSError as e:
+            return f"An error occurred while applying the patch: {e}"
+        summary = [f"- {'deleted' if text is None else 'updated'} {path}" for path, text in results.items()]
+        return "Patch applied:\n" + "\n".join(summary)
+
+
+class ReadManyFilesInput(BaseModel):
+    paths: List[str] = Field(description="Workspace-relative paths of the files to read.")
+
+
+class ReadManyFilesTool(BaseTool):
+    """A tool to read several files in one call."""
+    name: str = "read_many_files"
+    description: str = (
+        "Use this tool to read several files in a single call instead of one `read_file` call per file. "
+        "Each file is returned under a `### path` header; very large files are truncated."
+    )
+    args_schema: Type[BaseModel] = ReadManyFilesInput
+    root_dir: str
+    max_file_chars: int = config.TOOL_READ_MAX_FILE_CHARS
+    max_total_chars: int = config.TOOL_READ_MAX_TOTAL_CHARS
+
+    def _run(self, paths: List[str]) -> str:
+        workspace = _Workspace(self.root_dir)
+        parts, used = [], 0
+        for path in paths:
+            if used >= self.max_total_chars:
+                parts.append(f"### {path}\n(not read: the {self.max_total_chars}-character limit of this call was reached)")
+                continue
+            try:
+                text = workspace.read(path)
+            except (PatchError, OSError, UnicodeDecodeError) as e:
+                parts.append(f"### {path}\n(error: {e})")
+                continue
+            if text is None:
+                parts.append(f"### {path}\n(error: file not found)")
+                continue
+            limit = min(self.max_file_chars, self.max_total_chars - used)
+            if len(text) > limit:
+                text = text[:limit] + f"\n... (truncated; {len(text)} characters in total)"
+            used += len(text)
+            parts.append(f"### {path}\n{text}")
+        return "\n\n".join(parts)
+
+
+class FileContent(BaseModel):
+    path: str = Field(description="Workspace-relative path of the file.")
+    content: str = Field(description="The complete new content of the file.")
+
+
+class WriteManyFilesInput(BaseModel):
+    files: List[FileContent] = Field(description="The files to create or overwrite.")
+
+
+class WriteManyFilesTool(BaseTool):
+    """A tool to create several files in one call."""
+    name: str = "write_many_files"
+    description: str = (
+        "Use this tool to create or overwrite several files in a single call, e.g. when scaffolding a project. "
+        "To change part of an existing file use `apply_patch` instead."
+    )
+    args_schema: Type[BaseModel] = WriteManyFilesInput
+    root_dir: str
+    max_total_chars: int = config.TOOL_WRITE_MAX_TOTAL_CHARS
+
+    def _run(self, files: List[FileContent]) -> str:
+        files = [f if isinstance(f, FileContent) else FileContent(**f) for f in files]
+        total = sum(len(f.content) for f in files)
+        if total > self.max_total_chars:
+            return (f"Nothing written: {total} characters exceeds the {self.max_total_chars}-character limit of one call. "
+                    f"Split the files over several calls.")
+        workspace = _Workspace(self.root_dir)
+        try:
+            for f in files:
+                workspace.resolve(f.path)
+            for f in files:
+                workspace.write(f.path, f.content)
+        except (PatchError, OSError) as e:
+            return f"An error occurred while writing the files: {e}"
+        return f"Wrote {len(files)} files: " + ", ".join(f.path for f in files)
+
+
+def create_edit_tools(root_dir: str) -> list:
+    """Creates the `apply_patch`, `read_many_files` and `write_many_files` tools, confined to `root_dir`."""
+    return [
+        ApplyPatchTool(root_dir=root_dir),
+        ReadManyFilesTool(root_dir=root_dir),
+        WriteManyFilesTool(root_dir=root_dir),
+    ]
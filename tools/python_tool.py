@@ -0,0 +1,34 @@
+import re
+from typing import Optional, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from services.python_workers import PythonWorkerPool, get_python_pool
+import config
+
+class PythonExecInput(BaseModel):
+    code: str = Field(description="Python code to run. Use print() to see values; the value of a final expression is echoed.")
+
+class PythonExecTool(BaseTool):
+    """A tool to run Python code in an isolated worker process with a persistent namespace."""
+    name: str = "python_repl"
+    description: str = (
+        "A Python shell. Use this to execute Python code. Variables, functions and imports persist between calls. "
+        f"Each call is limited to {config.PYTHON_WALL_SECONDS}s and {config.PYTHON_MEMORY_MB} MB, and long output is truncated. "
+        "Input should be valid Python code."
+    )
+    args_schema: Type[BaseModel] = PythonExecInput
+    pool: PythonWorkerPool
+    session_key: str
+
+    def _run(self, code: str) -> str:
+        # Models often wrap the code in a markdown fence
+        code = re.sub(r"^\s*```(?:python|py)?\s*\n|\n?```\s*$", "", code)
+        return self.pool.execute(self.session_key, code).format()
+
+    def cancel(self):
+        """Interrupts this tool's running code (called when the agent's run is cancelled)."""
+        self.pool.interrupt(self.session_key)
+
+def create_python_tool(session_key: str, pool: Optional[PythonWorkerPool] = None) -> PythonExecTool:
+    """Creates the `python_repl` tool for one session of the shared worker pool."""
+    return PythonExecTool(pool=pool or get_python_pool(), session_key=session_key)
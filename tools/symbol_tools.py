@@ -0,0 +1,68 @@
+from langchain.tools import BaseTool
+from services.vectorstore_service import VectorStoreService
+from typing import Type
+from pydantic import BaseModel, Field
+
+MAX_LISTED_LOCATIONS = 50
+
+class SymbolLookupInput(BaseModel):
+    symbol: str = Field(description="The exact name of a function, class, method, type or variable, e.g. `create_team_supervisor` or `VectorStoreService.reindex`.")
+
+class FindDefinitionTool(BaseTool):
+    """A tool to jump to where a symbol is defined, using the workspace symbol index."""
+    name: str = "find_definition"
+    description: str = (
+        "Use this tool to find where a function, class, method, type or variable is defined in the workspace. "
+        "It is an instant exact lookup, much faster than searching or reading files. "
+        "Input should be the symbol name (use `ClassName.method` for methods)."
+    )
+    args_schema: Type[BaseModel] = SymbolLookupInput
+    vectorstore_service: VectorStoreService
+
+    def _run(self, symbol: str) -> str:
+        try:
+            definitions = self.vectorstore_service.get_symbol_index().find_definition(symbol.strip().strip("`"))
+        except Exception as e:
+            return f"An error occurred while looking up the symbol: {e}"
+        if not definitions:
+            return f"No definition of `{symbol}` found in the workspace. Try `codebase_qa_tool` for a fuzzier search."
+
+        lines = [f"Definitions of `{symbol}`:"]
+        for d in definitions[:MAX_LISTED_LOCATIONS]:
+            owner = f" (in {d.container})" if d.container else ""
+            lines.append(f"- {d.path}:{d.line} {d.kind}{owner}")
+        if len(definitions) > MAX_LISTED_LOCATIONS:
+            lines.append(f"... and {len(definitions) - MAX_LISTED_LOCATIONS} more.")
+        return "\n".join(lines)
+
+class FindReferencesTool(BaseTool):
+    """A tool to list where a symbol is used, using the workspace symbol index."""
+    name: str = "find_references"
+    description: str = (
+        "Use this tool to find every place in the workspace where a function, class, method, type or variable "
+        "is used or imported, e.g. before renaming or changing its signature. "
+        "It is an instant exact lookup, much faster than grep. Input should be the symbol name."
+    )
+    args_schema: Type[BaseModel] = SymbolLookupInput
+    vectorstore_service: VectorStoreService
+
+    def _run(self, symbol: str) -> str:
+        try:
+            references = self.vectorstore_service.get_symbol_index().find_references(symbol.strip().strip("`"))
+        except Exception as e:
+            return f"An error occurred while looking up the symbol: {e}"
+        if not references:
+            return f"No references to `{symbol}` found in the workspace."
+
+        lines = [f"{len(references)} references to `{symbol}`:"]
+        lines.extend(f"- {path}:{line}" for path, line in references[:MAX_LISTED_LOCATIONS])
+        if len(references) > MAX_LISTED_LOCATIONS:
+            lines.append(f"... and {len(references) - MAX_LISTED_LOCATIONS} more.")
+        return "\n".join(lines)
+
+def create_symbol_tools(vectorstore_service: VectorStoreService) -> list:
+    """Creates the `find_definition` and `find_references` tools."""
+    return [
+        FindDefinitionTool(vectorstore_service=vectorstore_service),
+        FindReferencesTool(vectorstore_service=vectorstore_service),
+    ]
@@ -1,5 +1,6 @@
 # ui.py
 import ast
+from datetime import datetime
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
@@ -8,6 +9,65 @@ from rich.table import Table
 from prompt_toolkit import PromptSession
 from prompt_toolkit.history import FileHistory
 import os
+import time
+from rich.live import Live
+
+class TokenStream:
+    """
+    Renders an answer incrementally as its tokens arrive. A spinner shows
+    while waiting for the first token; after that the answer panel is redrawn
+    at most `refresh_per_second` times a second, however fast tokens come.
+    Call `pause()` before printing anything else (e.g. a tool call): the text
+    so far stays on screen and later tokens start a new panel.
+    """
+    def __init__(self, console: Console, agent_name: str, refresh_per_second: float = 8):
+        self.console = console
+        self.agent_name = agent_name
+        self.min_interval = 1.0 / refresh_per_second
+        self.segment = ""  # text of the current panel
+        self._live = None
+        self._status = None
+        self._last_refresh = 0.0
+
+    def _panel(self) -> Panel:
+        return Panel(Markdown(self.segment, style="default"), title=f"[bold blue]🤖 {self.agent_name}[/bold blue]", border_style="blue")
+
+    def wait(self, message: str = "[bold green]Agent is thinking..."):
+        """Shows the spinner until the next token."""
+        if self._live is None:
+            self.segment = ""
+        if self._live is None and self._status is None:
+            self._status = self.console.status(message, spinner="dots")
+            self._status.start()
+
+    def add(self, token: str):
+        if not token:
+            return
+        if self._status is not None:
+            self._status.stop()
+            self._status = None
+        if self._live is None:
+            self.segment = ""
+            self._live = Live(console=self.console, auto_refresh=False, vertical_overflow="visible")
+            self._live.start()
+        self.segment += token
+        now = time.monotonic()
+        if now - self._last_refresh >= self.min_interval:
+            self._live.update(self._panel(), refresh=True)
+            self._last_refresh = now
+
+    def pause(self):
+        """Finishes the current panel (and spinner) so other output can be printed."""
+        if self._status is not None:
+            self._status.stop()
+            self._status = None
+        if self._live is not None:
+            self._live.update(self._panel(), refresh=True)
+            self._live.stop()
+            self._live = None
+
+    def stop(self):
+        self.pause()
 
 class UI:
     """
@@ -35,6 +95,10 @@ class UI:
         panel = Panel(Markdown(response, style="default"), title=f"[bold blue]🤖 {agent_name}[/bold blue]", border_style="blue")
         self.console.print(panel)
 
+    def stream_response(self, agent_name: str, refresh_per_second: float = 8) -> "TokenStream":
+        """Returns a TokenStream that renders `agent_name`'s answer token by token (see TokenStream)."""
+        return TokenStream(self.console, agent_name, refresh_per_second)
+
     def stream_final_answer(self, agent_name: str):
         """Prepares the console to stream the final answer."""
         self.console.print(f"[bold blue]🤖 {agent_name}:[/bold blue] ", end="")
@@ -90,6 +154,103 @@ class UI:
         self.console.print(table)
 
 
+    def display_cache_stats(self, stats: dict):
+        """Displays hit/miss counters of the codebase QA caches."""
+        table = Table(title=f"🗄️ Codebase QA Caches (index generation {stats.get('index_generation', 0)})", border_style="cyan")
+        table.add_column("Cache", style="cyan")
+        table.add_column("Entries", justify="right")
+        table.add_column("Hits", justify="right", style="green")
+        table.add_column("Misses", justify="right", style="red")
+        table.add_column("Hit rate", justify="right")
+        for name, counters in stats.items():
+            if not isinstance(counters, dict):
+                continue
+            total = counters.get("hits", 0) + counters.get("misses", 0)
+            hit_rate = counters.get("hit_rate", counters.get("hits", 0) / total if total else 0.0)
+            table.add_row(
+                name.replace("_", " "),
+                str(counters.get("size", "-")),
+                str(counters.get("hits", 0)),
+                str(counters.get("misses", 0)),
+                f"{hit_rate:.0%}",
+            )
+        self.console.print(table)
+
+    def display_team_runs(self, runs: list):
+        """Displays recent team runs (see team/runs.py)."""
+        table = Table(title="🧑‍🤝‍🧑 Team Runs", border_style="magenta")
+        table.add_column("Run", style="magenta")
+        table.add_column("Status")
+        table.add_column("Updated")
+        table.add_column("Task", style="default")
+        styles = {"done": "green", "running": "yellow", "interrupted": "yellow", "failed": "red"}
+        for run in runs:
+            status = run.status + (f" (fork of {run.parent_run_id})" if run.parent_run_id else "")
+            style = styles.get(run.status, "default")
+            updated = datetime.fromtimestamp(run.updated_at).strftime("%Y-%m-%d %H:%M")
+            task = run.task if len(run.task) <= 60 else run.task[:57] + "..."
+            table.add_row(run.run_id, f"[{style}]{status}[/{style}]", updated, task)
+        self.console.print(table)
+
+    def display_chat_sessions(self, sessions: list):
+        """Displays saved chat sessions (see services/chat_memory.py)."""
+        table = Table(title="💬 Chat Sessions", border_style="blue")
+        table.add_column("Session", style="blue")
+        table.add_column("Turns", justify="right")
+        table.add_column("Updated")
+        table.add_column("First request", style="default")
+        for session in sessions:
+            updated = datetime.fromtimestamp(session.updated_at).strftime("%Y-%m-%d %H:%M")
+            title = session.title if len(session.title) <= 60 else session.title[:57] + "..."
+            table.add_row(session.session_id, str(session.turns), updated, title)
+        self.console.print(table)
+
+    def display_chat_memory(self, memory):
+        """Displays the per-turn token counts of the current chat session."""
+        table = Table(title=f"🧠 Chat Session {memory.session_id} (history {memory.history_tokens():,} of "
+                            f"{memory.token_budget:,} tokens)", border_style="blue")
+        table.add_column("Turn", justify="right", style="blue")
+        table.add_column("Request", style="default")
+        table.add_column("Prompt tokens", justify="right")
+        table.add_column("Total tokens", justify="right")
+        table.add_column("In history")
+        summarized = len(memory.summarized_turns)
+        for number, turn in enumerate(memory.all_turns, start=1):
+            request = turn.human if len(turn.human) <= 50 else turn.human[:47] + "..."
+            table.add_row(
+                str(number),
+                request,
+                "-" if turn.prompt_tokens is None else f"{turn.prompt_tokens:,}",
+                "-" if turn.total_tokens is None else f"{turn.total_tokens:,}",
+                "summarized" if number <= summarized else "verbatim",
+            )
+        self.console.print(table)
+
+    def display_telemetry_stats(self, stats: list):
+        """Displays latency percentiles, errors and token counts per model, tool, team node and request route."""
+        table = Table(title="⏱️ Telemetry (this session)", border_style="cyan")
+        table.add_column("Kind", style="cyan")
+        table.add_column("Name", style="default")
+        table.add_column("Calls", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("Errors", justify="right", style="red")
+        table.add_column("Tokens (prompt/completion)", justify="right")
+        table.add_column("Cache hits", justify="right", style="green")
+        for row in stats:
+            tokens = f"{row['prompt_tokens']:,}/{row['completion_tokens']:,}" if row["kind"] == "llm" else "-"
+            table.add_row(
+                row["kind"],
+                row["name"],
+                str(row["count"]),
+                f"{row['p50']:.2f}s",
+                f"{row['p95']:.2f}s",
+                str(row["errors"]),
+                tokens,
+                str(row["cache_hits"]) if row["kind"] == "llm" else "-",
+            )
+        self.console.print(table)
+
     def display_system_message(self, message: str, style="yellow"):
         """Displays a system message."""
         self.console.print(f"[{style}]⚙️ {message}[/{style}]")